@@ -1,4 +1,9 @@
 from autoqubo.binarization import Binarization
+from autoqubo.cache import QuboCache
+from autoqubo.executors import FuturesExecutor, ProcessExecutor, SerialExecutor, ThreadExecutor
+from autoqubo.instrumentation import Instrumentation
+from autoqubo.memo import EvaluationMemo
+from autoqubo.qubo_io import read_qubo, write_qubo
 from autoqubo.sampling_compiler import SamplingCompiler
 from autoqubo.search_space import SearchSpace
 from autoqubo.utils import Utils
@@ -2,40 +2,198 @@ from collections import namedtuple
 import numpy as np
 
 
-Type = namedtuple('Type', 'decode encode')
+# decode(bitstring) and encode(value, binary_size) convert single values.
+# Optional batch support:
+#   affine(binary_size) -> (weights, offset) such that decode(x) == x @ weights + offset, where weights has shape
+#       (binary_size,) for scalar types or (binary_size, k) for vector types with k elements
+#   encode_batch(values, binary_size) -> 2-D array of bitstrings, one row per value
+#   size: number of bits used by the type, None if it is chosen when the variable is added to a SearchSpace
+Type = namedtuple('Type', 'decode encode affine encode_batch size', defaults=(None, None, None))
+
+
+# beyond this size the weights do not fit into int64
+MAX_AFFINE_BITS = 62
 
 
 def uint_decode(bitstring):
-    return sum(v * 2 ** i for (i, v) in enumerate(bitstring))
+    if len(bitstring) > MAX_AFFINE_BITS:
+        return sum(v * 2 ** i for (i, v) in enumerate(bitstring))
+    return int(np.asarray(bitstring, dtype=np.int64) @ uint_weights(len(bitstring)))
 
 
 def uint_encode(value, binary_size):
     return [(1 if value & 2 ** i else 0) for i in range(binary_size)]
 
 
+def uint_weights(binary_size):
+    return 2 ** np.arange(binary_size, dtype=np.int64)
+
+
+def uint_affine(binary_size):
+    return uint_weights(binary_size), 0
+
+
+def uint_encode_batch(values, binary_size):
+    values = np.asarray(values, dtype=np.int64)
+    return ((values[..., None] >> np.arange(binary_size)) & 1).astype(np.int8)
+
+
+def sint_weights(binary_size):
+    # two's complement, the top bit counts negative
+    weights = uint_weights(binary_size)
+    if binary_size:
+        weights[-1] = -weights[-1]
+    return weights
+
+
+def sint_decode(bitstring):
+    return int(np.asarray(bitstring, dtype=np.int64) @ sint_weights(len(bitstring)))
+
+
+def sint_encode(value, binary_size):
+    return sint_encode_batch([value], binary_size)[0].tolist()
+
+
+def sint_affine(binary_size):
+    return sint_weights(binary_size), 0
+
+
+def sint_encode_batch(values, binary_size):
+    values = np.asarray(values, dtype=np.int64)
+    if np.any(values < -2 ** (binary_size - 1)) or np.any(values >= 2 ** (binary_size - 1)):
+        raise ValueError(f"Values out of range for a {binary_size} bit signed integer")
+    return uint_encode_batch(values % 2 ** binary_size, binary_size)
+
+
+def _range_check(values, lower, upper):
+    if np.any(values < lower) or np.any(values > upper):
+        raise ValueError(f"Values out of range [{lower}, {upper}]")
+
+
+def _affine_type(weights, offset, encode_batch, integer=True):
+    """
+    Type with a fixed number of bits whose value is bitstring @ weights + offset.
+    """
+    weights = np.asarray(weights)
+    cast = int if integer else float
+
+    def decode(bitstring):
+        return cast(np.asarray(bitstring) @ weights + offset)
+
+    def encode(value, binary_size):
+        return encode_batch([value], binary_size)[0].tolist()
+
+    def affine(binary_size):
+        return weights, offset
+
+    return Type(decode, encode, affine, encode_batch, len(weights))
+
+
 class Binarization:
     """
     Provides a namespace containing objects describing various types of decision variables that can be transformed into
     binary.
-    Contains: `uint`.
+    Contains: `uint`, `sint` and factories for vectors of uints, bounded integers, one-hot, domain-wall and
+    fixed-point encodings. Factory types know their number of bits (`Type.size`).
     """
-    uint = Type(uint_decode, uint_encode)
+    uint = Type(uint_decode, uint_encode, uint_affine, uint_encode_batch)
+    sint = Type(sint_decode, sint_encode, sint_affine, sint_encode_batch)
+
+    @staticmethod
+    def get_int_type(lower, upper):
+        """
+        Integers in [lower, upper] with a logarithmic number of bits. The top coefficient is clipped so that every
+        bitstring decodes into the range and no constraint is needed to exclude out-of-range values.
+        """
+        span = upper - lower
+        if span < 0:
+            raise ValueError(f"Empty range [{lower}, {upper}]")
+        size = int(span).bit_length()
+        weights = uint_weights(size)
+        if size:
+            weights[-1] = span - (2 ** (size - 1) - 1)
+
+        def encode_batch(values, binary_size):
+            values = np.asarray(values, dtype=np.int64)
+            _range_check(values, lower, upper)
+            remainder = values - lower
+            if size == 0:
+                return np.zeros(remainder.shape + (0,), dtype=np.int8)
+            top = remainder > 2 ** (size - 1) - 1
+            low = uint_encode_batch(np.where(top, remainder - weights[-1], remainder), size - 1)
+            return np.concatenate([low, top[..., None].astype(np.int8)], axis=-1)
+
+        return _affine_type(weights, lower, encode_batch)
+
+    @staticmethod
+    def get_one_hot_type(values):
+        """
+        One bit per value, exactly one bit is set. Bitstrings with other than one bit set are not valid; the objective
+        needs a one-hot penalty, e.g. (sum(bits) - 1) ** 2.
+        """
+        values = np.asarray(values)
+
+        def encode_batch(chosen, binary_size):
+            chosen = np.asarray(chosen)
+            matches = chosen[..., None] == values
+            if not np.all(matches.any(axis=-1)):
+                raise ValueError("Values not in the one-hot domain")
+            return matches.astype(np.int8)
+
+        return _affine_type(values, 0, encode_batch, integer=np.issubdtype(values.dtype, np.integer))
+
+    @staticmethod
+    def get_domain_wall_type(lower, upper):
+        """
+        Integers in [lower, upper] with upper - lower bits; value v sets the first v - lower bits. Only bitstrings of
+        the form 1..10..0 are valid; the objective needs a domain-wall penalty, e.g. sum(x[i + 1] * (1 - x[i])).
+        """
+        size = upper - lower
+
+        def encode_batch(values, binary_size):
+            values = np.asarray(values, dtype=np.int64)
+            _range_check(values, lower, upper)
+            return (np.arange(size) < (values - lower)[..., None]).astype(np.int8)
+
+        return _affine_type(np.ones(size, dtype=np.int64), lower, encode_batch)
+
+    @staticmethod
+    def get_fixed_point_type(integer_bits, fractional_bits, signed=False):
+        """
+        Reals with a resolution of 2 ** -fractional_bits, unsigned or in two's complement. Values are rounded to the
+        nearest representable number when encoding.
+        """
+        size = integer_bits + fractional_bits
+        weights = (sint_weights(size) if signed else uint_weights(size)) / 2.0 ** fractional_bits
+
+        def encode_batch(values, binary_size):
+            scaled = np.rint(np.asarray(values, dtype=np.float64) * 2 ** fractional_bits).astype(np.int64)
+            if signed:
+                return sint_encode_batch(scaled, size)
+            _range_check(scaled, 0, 2 ** size - 1)
+            return uint_encode_batch(scaled, size)
+
+        return _affine_type(weights, 0, encode_batch, integer=False)
 
     @staticmethod
     def get_uint_vector_type(uint_size, n):
+        # element i is read from bits i * uint_size ... (i + 1) * uint_size - 1
+        weights = np.zeros((uint_size * n, n), dtype=np.int64)
+        for i in range(n):
+            weights[i * uint_size:(i + 1) * uint_size, i] = uint_weights(uint_size)
 
         def encode(value, binary_size):
-            bitstring = []
-            for i in range(n):
-                bitstring += uint_encode(value[i], uint_size)
-            return bitstring
+            return encode_batch([value], binary_size)[0].tolist()
 
         def decode(bitstring):
-            elems = []
-            p = 0
-            for i in range(n):
-                elems.append(uint_decode(bitstring[p:p+uint_size]))
-                p += uint_size
-            return np.array(elems)
-        t = Type(decode, encode)
+            return np.asarray(bitstring, dtype=np.int64) @ weights
+
+        def affine(binary_size):
+            return weights, 0
+
+        def encode_batch(values, binary_size):
+            values = np.asarray(values, dtype=np.int64).reshape(-1, n)
+            return uint_encode_batch(values, uint_size).reshape(len(values), n * uint_size)
+
+        t = Type(decode, encode, affine, encode_batch, uint_size * n)
         return t
@@ -0,0 +1,262 @@
+"""
+provides a persistent, content-addressed cache of
+compiled QUBOs that can be shared by several processes
+"""
+
+import hashlib
+import json
+import os
+import pickle
+import shutil
+import tempfile
+import time
+import types
+import uuid
+import functools
+import numpy as np
+from typing import Optional, Tuple, Union
+from autoqubo.utils import issparse
+
+
+def _code_names(code):
+    """global names referenced by a code object and all code objects nested in it"""
+    names = set(code.co_names)
+    for const in code.co_consts:
+        if isinstance(const, types.CodeType):
+            names |= _code_names(const)
+    return names
+
+
+def _update_hash(h, obj, seen):
+    """feeds a deterministic description of obj into the hash object h"""
+    h.update(type(obj).__qualname__.encode())
+    if obj is None or isinstance(obj, (bool, int, float, complex, str, bytes, np.generic)):
+        h.update(repr(obj).encode())
+        return
+    if id(obj) in seen:
+        h.update(b"<cycle>")
+        return
+    # keep obj alive, so the id of a temporary object is not reused while hashing
+    seen[id(obj)] = obj
+    if isinstance(obj, np.ndarray):
+        h.update(f"{obj.dtype.str}{obj.shape}".encode())
+        if obj.dtype == object:
+            for value in obj.flat:
+                _update_hash(h, value, seen)
+        else:
+            h.update(np.ascontiguousarray(obj).tobytes())
+    elif isinstance(obj, (list, tuple)):
+        for value in obj:
+            _update_hash(h, value, seen)
+    elif isinstance(obj, (set, frozenset)):
+        for value in sorted(obj, key=repr):
+            _update_hash(h, value, seen)
+    elif isinstance(obj, dict):
+        for key in sorted(obj, key=repr):
+            _update_hash(h, key, seen)
+            _update_hash(h, obj[key], seen)
+    elif isinstance(obj, types.CodeType):
+        h.update(obj.co_code)
+        _update_hash(h, obj.co_consts, seen)
+        _update_hash(h, obj.co_names, seen)
+        _update_hash(h, obj.co_varnames, seen)
+    elif isinstance(obj, types.FunctionType):
+        _update_hash(h, obj.__code__, seen)
+        _update_hash(h, obj.__defaults__, seen)
+        _update_hash(h, obj.__kwdefaults__, seen)
+        if obj.__closure__:
+            _update_hash(h, [cell.cell_contents for cell in obj.__closure__], seen)
+        # module level data and helper functions the function depends on
+        referenced = {
+            name: obj.__globals__[name] for name in _code_names(obj.__code__) if name in obj.__globals__
+        }
+        _update_hash(h, referenced, seen)
+    elif isinstance(obj, types.MethodType):
+        _update_hash(h, obj.__func__, seen)
+        _update_hash(h, obj.__self__, seen)
+    elif isinstance(obj, functools.partial):
+        _update_hash(h, (obj.func, obj.args, obj.keywords), seen)
+    elif isinstance(obj, types.ModuleType):
+        h.update(obj.__name__.encode())
+    elif isinstance(obj, (type, types.BuiltinFunctionType, np.ufunc)):
+        name = getattr(obj, "__qualname__", getattr(obj, "__name__", ""))
+        h.update(f"{getattr(obj, '__module__', '')}.{name}".encode())
+    elif isinstance(getattr(type(obj), "__call__", None), types.FunctionType):
+        # callable instances: pickle would describe the class by reference only
+        _update_hash(h, type(obj).__call__, seen)
+        methods = {
+            name: value for cls in type(obj).__mro__[:-1] for name, value in vars(cls).items()
+            if isinstance(value, types.FunctionType)
+        }
+        _update_hash(h, methods, seen)
+        if hasattr(obj, "__dict__"):
+            _update_hash(h, vars(obj), seen)
+        else:
+            _update_pickled(h, obj)
+    elif hasattr(obj, "__dict__") and not callable(obj):
+        _update_hash(h, vars(obj), seen)
+    else:
+        _update_pickled(h, obj)
+
+
+def _update_pickled(h, obj):
+    try:
+        h.update(pickle.dumps(obj, protocol=4))
+    except Exception:
+        h.update(repr(obj).encode())
+
+
+def fingerprint(*objs) -> str:
+    """
+    Computes a content hash of the given objects. Functions are described by their code, defaults, closure cells
+    and the module level objects they reference, so the hash changes whenever the code or its data changes.
+    :param objs:
+        functions, arrays, SearchSpace objects or plain values
+    :return:
+        hexadecimal sha256 digest
+    """
+    h = hashlib.sha256()
+    seen = {}
+    for obj in objs:
+        _update_hash(h, obj, seen)
+    return h.hexdigest()
+
+
+class QuboCache:
+    """
+    Content-addressed on-disk cache of QUBO matrices and offsets.
+    Entries are published by an atomic rename of a completely written directory, so several worker processes
+    can share one cache directory. Hits are memory-mapped read-only. If max_size (bytes) is given, the least
+    recently used entries are evicted after every insertion.
+    """
+    META = "meta.json"
+
+    def __init__(self, directory: str, max_size: Optional[int] = None):
+        self.directory = directory
+        self.max_size = max_size
+        os.makedirs(directory, exist_ok=True)
+
+    @classmethod
+    def from_argument(cls, cache: Union[None, str, "QuboCache"]) -> Optional["QuboCache"]:
+        """
+        Accepts a QuboCache, a cache directory path or None.
+        """
+        if cache is None or isinstance(cache, QuboCache):
+            return cache
+        return cls(cache)
+
+    @staticmethod
+    def key(*parts) -> str:
+        """
+        Returns the cache key of a compilation described by parts, see fingerprint.
+        """
+        return fingerprint(*parts)
+
+    def _path(self, key):
+        return os.path.join(self.directory, key)
+
+    def get(self, key: str) -> Optional[Tuple[np.ndarray, float]]:
+        """
+        Returns the stored (Q, offset) for key, or None on a miss.
+        """
+        path = self._path(key)
+        try:
+            with open(os.path.join(path, self.META)) as f:
+                meta = json.load(f)
+            if meta["format"] == "sparse":
+                from scipy.sparse import csr_matrix
+
+                arrays = [np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r") for name in ("data", "indices", "indptr")]
+                qubo = csr_matrix(tuple(arrays), shape=tuple(meta["shape"]), copy=False)
+            else:
+                qubo = np.load(os.path.join(path, "qubo.npy"), mmap_mode="r")
+            # the modification time of the metadata file records the last use
+            os.utime(os.path.join(path, self.META))
+        except (FileNotFoundError, NotADirectoryError):
+            # missing, or evicted by another process while reading
+            return None
+        return qubo, meta["offset"]
+
+    def put(self, key: str, qubo, offset) -> bool:
+        """
+        Stores (Q, offset) under key. Symbolic QUBOs are not cached.
+        :return:
+            True if the entry was stored, False if it is not cacheable or another process stored it first
+        """
+        if not issparse(qubo) and qubo.dtype == object:
+            return False
+        try:
+            offset = float(offset)
+        except TypeError:
+            return False
+
+        tmp = tempfile.mkdtemp(prefix=".tmp-", dir=self.directory)
+        try:
+            if issparse(qubo):
+                qubo = qubo.tocsr()
+                for name in ("data", "indices", "indptr"):
+                    np.save(os.path.join(tmp, f"{name}.npy"), getattr(qubo, name))
+                fmt = "sparse"
+            else:
+                np.save(os.path.join(tmp, "qubo.npy"), np.asarray(qubo))
+                fmt = "dense"
+            with open(os.path.join(tmp, self.META), "w") as f:
+                json.dump({"format": fmt, "shape": list(qubo.shape), "offset": offset, "created": time.time()}, f)
+            os.rename(tmp, self._path(key))
+        except OSError:
+            # an entry with this key was published concurrently
+            shutil.rmtree(tmp, ignore_errors=True)
+            return False
+        if self.max_size is not None:
+            self.evict(self.max_size, keep=key)
+        return True
+
+    def _entries(self):
+        entries = []
+        for name in os.listdir(self.directory):
+            if name.startswith("."):
+                continue
+            path = self._path(name)
+            try:
+                last_used = os.stat(os.path.join(path, self.META)).st_mtime
+                size = sum(entry.stat().st_size for entry in os.scandir(path))
+            except (FileNotFoundError, NotADirectoryError):
+                continue
+            entries.append((last_used, size, name))
+        return entries
+
+    def size(self) -> int:
+        """
+        Total size of the cached entries in bytes.
+        """
+        return sum(size for _, size, _ in self._entries())
+
+    def _remove(self, key):
+        trash = os.path.join(self.directory, f".trash-{uuid.uuid4().hex}")
+        try:
+            os.rename(self._path(key), trash)
+        except FileNotFoundError:
+            return
+        shutil.rmtree(trash, ignore_errors=True)
+
+    def evict(self, max_size: int, keep: Optional[str] = None):
+        """
+        Removes least recently used entries until the cache holds at most max_size bytes.
+        :param keep: key that is never evicted
+        """
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _ in entries)
+        for _, size, name in entries:
+            if total <= max_size:
+                break
+            if name == keep:
+                continue
+            self._remove(name)
+            total -= size
+
+    def clear(self):
+        """
+        Removes all entries.
+        """
+        for _, _, name in self._entries():
+            self._remove(name)
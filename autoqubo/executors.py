@@ -0,0 +1,282 @@
+"""
+executor backends that evaluate fitness functions for the sampling compiler:
+serial, thread pool, process pool and user-supplied concurrent.futures executors
+"""
+
+import hashlib
+import os
+import pickle
+import sys
+import warnings
+from collections import OrderedDict, deque
+from concurrent.futures import Executor as FuturesExecutorBase, ProcessPoolExecutor, ThreadPoolExecutor
+from itertools import islice
+from typing import Callable, Iterable, Iterator, Optional
+
+# functions deserialized in a worker process, by digest of their serialization
+_FUNCTIONS = OrderedDict()
+_MAX_FUNCTIONS = 8
+
+
+class _Serialized:
+    """
+    A function serialized with cloudpickle (or pickle), deserialized once per worker process and digest.
+    """
+
+    def __init__(self, payload):
+        self.payload = payload
+        self.digest = hashlib.sha1(payload).digest()
+
+    def __call__(self, item):
+        function = _FUNCTIONS.get(self.digest)
+        if function is None:
+            function = _FUNCTIONS[self.digest] = pickle.loads(self.payload)
+            if len(_FUNCTIONS) > _MAX_FUNCTIONS:
+                _FUNCTIONS.popitem(last=False)
+        return function(item)
+
+
+class _Chunk:
+    """
+    Applies a function to every item of a chunk, picklable for process pools.
+    """
+
+    def __init__(self, function):
+        self.function = function
+
+    def __call__(self, items):
+        return [self.function(item) for item in items]
+
+
+def _cloudpickle():
+    try:
+        import cloudpickle
+    except ImportError:
+        return None
+    return cloudpickle
+
+
+def serialize(function: Callable, serializer: str = "cloudpickle") -> _Serialized:
+    """
+    Serializes a function for worker processes. With serializer="cloudpickle" (and cloudpickle installed)
+    lambdas, closures and functions defined in __main__ or notebooks are serialized by value.
+    :raises TypeError: if the function cannot be serialized
+    """
+    cloudpickle = _cloudpickle() if serializer == "cloudpickle" else None
+    try:
+        if cloudpickle is not None:
+            return _Serialized(cloudpickle.dumps(function))
+        return _Serialized(pickle.dumps(function))
+    except (pickle.PicklingError, AttributeError, TypeError) as e:
+        hint = "use a module-level function" if cloudpickle is not None else "install cloudpickle"
+        raise TypeError(f"{function!r} cannot be sent to worker processes, {hint}") from e
+
+
+class Executor:
+    """
+    Evaluates a function on a lazily generated sequence of items, returning the values in order.
+    Executors keep their workers alive until close() is called, so they can be reused across compilations.
+    """
+
+    #: number of items sent to a worker at a time, None lets the caller decide
+    chunksize = None
+
+    @property
+    def workers(self) -> Optional[int]:
+        """
+        Number of concurrent workers, None if the items are evaluated in the calling thread.
+        """
+        return None
+
+    def map(self, function: Callable, items: Iterable, chunksize: Optional[int] = None) -> Iterator:
+        """
+        :param chunksize: int, optional
+            Suggested number of items per task, self.chunksize takes precedence.
+        :return: iterator over the function values, in the order of the items
+        """
+        raise NotImplementedError
+
+    def close(self):
+        """
+        Shuts the workers down.
+        """
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class SerialExecutor(Executor):
+    """
+    Evaluates the function in the calling thread.
+    """
+
+    def map(self, function, items, chunksize=None):
+        return map(function, items)
+
+
+class FuturesExecutor(Executor):
+    """
+    Evaluates the function on a concurrent.futures executor supplied by the user, which is not shut down by close().
+    Chunks of items are submitted as tasks, with a bounded number of tasks in flight, so the items are
+    generated lazily.
+    """
+
+    def __init__(
+        self,
+        executor: FuturesExecutorBase,
+        max_workers: Optional[int] = None,
+        chunksize: Optional[int] = None,
+        serializer: str = "cloudpickle",
+        tasks_per_worker: int = 4,
+    ):
+        """
+        :param executor: concurrent.futures.Executor
+        :param max_workers: int, optional
+            number of workers of the executor, read from the executor if not given
+        :param chunksize: int, optional
+            number of items per task, chosen by the compiler if not given
+        :param serializer: str
+            "cloudpickle" or "pickle", used to send the function to a ProcessPoolExecutor
+        :param tasks_per_worker: int
+            number of tasks in flight per worker
+        """
+        self._executor = executor
+        self.max_workers = max_workers
+        self.chunksize = chunksize
+        self.serializer = serializer
+        self.tasks_per_worker = tasks_per_worker
+
+    @property
+    def executor(self) -> FuturesExecutorBase:
+        return self._executor
+
+    @property
+    def workers(self):
+        if self.max_workers is not None:
+            return self.max_workers
+        return getattr(self._executor, "_max_workers", None) or os.cpu_count() or 1
+
+    def map(self, function, items, chunksize=None):
+        executor = self.executor
+        if isinstance(executor, ProcessPoolExecutor):
+            function = serialize(function, self.serializer)
+        task = _Chunk(function)
+        chunksize = self.chunksize or chunksize or 1
+        max_tasks = self.workers * self.tasks_per_worker
+        items = iter(items)
+        pending = deque()
+        try:
+            while True:
+                chunk = list(islice(items, chunksize))
+                if chunk:
+                    pending.append(executor.submit(task, chunk))
+                if pending and (len(pending) >= max_tasks or not chunk):
+                    yield from pending.popleft().result()
+                elif not chunk:
+                    return
+        finally:
+            for future in pending:
+                future.cancel()
+
+
+class ThreadExecutor(FuturesExecutor):
+    """
+    Evaluates the function on a persistent thread pool, suited for functions that release the GIL
+    (numpy, I/O, native simulators).
+    """
+
+    def __init__(self, max_workers: Optional[int] = None, chunksize: Optional[int] = None, tasks_per_worker: int = 4):
+        super().__init__(None, max_workers or os.cpu_count() or 1, chunksize, tasks_per_worker=tasks_per_worker)
+
+    @property
+    def executor(self):
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(self.max_workers)
+        return self._executor
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+
+class ProcessExecutor(FuturesExecutor):
+    """
+    Evaluates the function on a persistent process pool. The function is serialized with cloudpickle if it is
+    installed, so lambdas and closures (e.g. SearchSpace types) can be evaluated, and deserialized only once per
+    worker. The pool is started on first use.
+    """
+
+    def __init__(
+        self,
+        max_workers: Optional[int] = None,
+        chunksize: Optional[int] = None,
+        serializer: str = "cloudpickle",
+        tasks_per_worker: int = 4,
+    ):
+        super().__init__(None, max_workers or os.cpu_count() or 1, chunksize, serializer, tasks_per_worker)
+
+    @property
+    def executor(self):
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(self.max_workers)
+        return self._executor
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+
+SERIAL = SerialExecutor()
+
+# executors created by name (or use_multiprocessing=True), shared by all compilations of this process
+_SHARED = {}
+_BACKENDS = {"serial": SerialExecutor, "thread": ThreadExecutor, "process": ProcessExecutor}
+
+
+def shared_executor(name: str) -> Executor:
+    """
+    The executor of the given backend ("serial", "thread" or "process") shared by all compilations.
+    """
+    if name not in _BACKENDS:
+        raise ValueError(f"Unknown executor {name}, expected one of {', '.join(_BACKENDS)}")
+    if name not in _SHARED:
+        _SHARED[name] = _BACKENDS[name]()
+    return _SHARED[name]
+
+
+def get_executor(executor) -> Executor:
+    """
+    Resolves the executor argument of the compiler.
+    :param executor:
+        False or None (serial), True (the shared process pool), "serial", "thread", "process",
+        an Executor or a concurrent.futures.Executor
+    """
+    if executor is None or executor is False:
+        return SERIAL
+    if executor is True:
+        if "ipykernel" in sys.modules and _cloudpickle() is None:
+            msg = "Multiprocessing is enabled by default, but functions defined in interactive sessions such as jupyter notebooks can only be sent to worker processes with cloudpickle. Sampling is done without multiprocessing."
+            warnings.warn(msg, UserWarning)
+            return SERIAL
+        return shared_executor("process")
+    if isinstance(executor, str):
+        return shared_executor(executor)
+    if isinstance(executor, Executor):
+        return executor
+    if isinstance(executor, FuturesExecutorBase):
+        return FuturesExecutor(executor)
+    raise TypeError(f"Unsupported executor {executor!r}")
+
+
+def close_shared_executors():
+    """
+    Shuts down the shared executors, they are restarted on next use.
+    """
+    for executor in _SHARED.values():
+        executor.close()
+    _SHARED.clear()
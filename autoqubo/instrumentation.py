@@ -0,0 +1,233 @@
+"""
+progress reporting, evaluation counters, timing breakdown and
+trace/profile output for long-running compilations
+"""
+
+import cProfile
+import json
+import os
+import threading
+import time
+from collections import namedtuple
+from contextlib import contextmanager
+from typing import Callable, Optional
+import numpy as np
+
+Progress = namedtuple('Progress', 'done total elapsed eta')
+
+PHASES = ("sample_generation", "evaluation", "ipc", "assembly")
+
+
+class _Timed:
+    """
+    Calls a function and returns (value, start, duration, number of samples, pid), picklable for multiprocessing.
+    """
+
+    def __init__(self, function):
+        self.function = function
+
+    def __call__(self, item):
+        start = time.perf_counter()
+        value = self.function(item)
+        duration = time.perf_counter() - start
+        return value, start, duration, len(value) if np.ndim(value) else 1, os.getpid()
+
+
+class Instrumentation:
+    """
+    Collects statistics of the sampling compiler, pass it as instrumentation= to generate_qubo_matrix,
+    generate_qubo, integer_qubo_matrix or verify_qubo_matrix. One object may be used for several calls,
+    the counters and timings accumulate.
+
+    Timings (seconds, in self.timings):
+        sample_generation: building the training/test samples
+        evaluation: calls of the fitness function, summed over the worker processes
+        ipc: time waiting for the process pool beyond the evaluation time per worker, an estimate of the
+            pickling and inter-process communication overhead
+        assembly: building the QUBO matrix from the function values
+    """
+
+    def __init__(
+        self,
+        progress: Optional[Callable[[Progress], None]] = None,
+        progress_interval: float = 1.0,
+        trace: Optional[str] = None,
+        profile: Optional[str] = None,
+        max_trace_events: int = 100000,
+    ):
+        """
+        :param progress:
+            called with Progress(done, total, elapsed, eta) at most every progress_interval seconds and when a
+            call finishes; eta is None while no sample has been evaluated
+        :param progress_interval:
+            seconds between progress calls
+        :param trace:
+            path of a Chrome trace file (chrome://tracing, Perfetto) with one span per phase and per evaluation
+            task, including the worker processes
+        :param profile:
+            path of a cProfile statistics file of the main process, see pstats
+        :param max_trace_events:
+            the trace stops recording after this many events
+        """
+        self.progress = progress
+        self.progress_interval = progress_interval
+        self.trace = trace
+        self.profile = profile
+        self.max_trace_events = max_trace_events
+
+        self.evaluations = 0
+        self.calls = 0
+        self.done = 0
+        self.total = 0
+        self.timings = dict.fromkeys(PHASES, 0.0)
+        self.events = []
+
+        self._origin = time.perf_counter()
+        # time spent in finished measured calls, and the start of the current outermost call
+        self._elapsed = 0.0
+        self._start = None
+        self._last_report = None
+        # wall-clock time covered by measurements, used to make phases exclusive of nested measurements
+        self._wall = 0.0
+        self._depth = 0
+        self._profiler = None
+        self._lock = threading.Lock()
+
+    @property
+    def elapsed(self) -> float:
+        """
+        Seconds spent in measured calls.
+        """
+        if self._start is None:
+            return self._elapsed
+        return self._elapsed + time.perf_counter() - self._start
+
+    def summary(self) -> dict:
+        """
+        Counters and timings as a dict, e.g. for logging.
+        """
+        elapsed = self.elapsed
+        return {
+            "evaluations": self.evaluations,
+            "calls": self.calls,
+            "elapsed": elapsed,
+            "evaluations_per_second": self.evaluations / elapsed if elapsed > 0 else None,
+            **self.timings,
+        }
+
+    def begin(self, total: int):
+        """
+        Starts (or continues) a measured call that evaluates total samples.
+        """
+        self.total += total
+        if self._depth == 0:
+            self._start = time.perf_counter()
+            if self.profile is not None:
+                self._profiler = cProfile.Profile()
+                self._profiler.enable()
+        self._depth += 1
+
+    def end(self):
+        """
+        Finishes a measured call; the outermost call reports the progress and writes the trace and profile.
+        """
+        self._depth -= 1
+        if self._depth > 0:
+            return
+        if self._profiler is not None:
+            self._profiler.disable()
+            self._profiler.dump_stats(self.profile)
+            self._profiler = None
+        self._report(force=True)
+        self._elapsed += time.perf_counter() - self._start
+        self._start = None
+        if self.trace is not None:
+            with open(self.trace, "w") as f:
+                json.dump({"traceEvents": self.events, "displayTimeUnit": "ms"}, f)
+
+    def advance(self, done: int):
+        """
+        Counts samples as done without evaluating them, e.g. when resuming from a checkpoint.
+        """
+        self.done += done
+
+    def _add(self, phase, start, duration, wall=None, pid=None):
+        with self._lock:
+            self.timings[phase] += duration
+            self._wall += duration if wall is None else wall
+            if self.trace is not None and len(self.events) < self.max_trace_events:
+                self.events.append({
+                    "name": phase, "ph": "X", "pid": pid or os.getpid(), "tid": threading.get_ident() if pid is None else 0,
+                    "ts": (start - self._origin) * 1e6, "dur": duration * 1e6,
+                })
+
+    def _report(self, force=False):
+        if self.progress is None:
+            return
+        now = time.perf_counter()
+        if not force and self._last_report is not None and now - self._last_report < self.progress_interval:
+            return
+        self._last_report = now
+        elapsed = self.elapsed
+        remaining = max(self.total - self.done, 0)
+        eta = elapsed / self.done * remaining if self.done else None
+        self.progress(Progress(self.done, self.total, elapsed, eta))
+
+    @contextmanager
+    def phase(self, name: str):
+        """
+        Measures the enclosed code as phase name, excluding the time of measurements nested in it.
+        """
+        start = time.perf_counter()
+        wall = self._wall
+        try:
+            yield
+        finally:
+            nested = self._wall - wall
+            self._add(name, start, max(time.perf_counter() - start - nested, 0.0))
+
+    def samples(self, items, concurrent=False):
+        """
+        Wraps an iterable of samples or batches, measuring the time to generate them.
+        :param concurrent:
+            True if the items are consumed by the feeder thread of a process pool
+        """
+        items = iter(items)
+        while True:
+            start = time.perf_counter()
+            try:
+                item = next(items)
+            except StopIteration:
+                return
+            duration = time.perf_counter() - start
+            self._add("sample_generation", start, duration, wall=0.0 if concurrent else None)
+            yield item
+
+    def call(self, start: float, duration: float, count: int, wall: Optional[float] = None, pid=None):
+        """
+        Counts a call of the fitness function that evaluated count samples, and reports the progress.
+        :param wall:
+            wall-clock time of the call in this process, 0 for calls overlapping other measurements
+        """
+        self._add("evaluation", start, duration, wall, pid)
+        self.calls += 1
+        self.evaluations += count
+        self.done += count
+        self._report()
+
+    def results(self, timed_results, workers=None):
+        """
+        Unwraps the results of a _Timed function, counting evaluations and reporting progress.
+        :param workers:
+            number of worker processes, None if the function is called in this process
+        """
+        start = time.perf_counter()
+        evaluation = 0.0
+        for value, task_start, duration, count, pid in timed_results:
+            self.call(task_start, duration, count, wall=0.0 if workers else None, pid=pid if workers else None)
+            evaluation += duration
+            yield value
+        if workers:
+            wall = time.perf_counter() - start
+            ipc = max(wall - evaluation / workers, 0.0)
+            self._add("ipc", start, ipc, wall=wall)
@@ -0,0 +1,236 @@
+"""
+in-memory memoization of fitness function values keyed by packed bitstrings,
+shared by the entry points of the sampling compiler
+"""
+
+import inspect
+import threading
+from collections import OrderedDict, namedtuple
+from itertools import islice
+from typing import Callable, Iterable, Optional
+import numpy as np
+
+from autoqubo.executors import Executor
+
+MemoInfo = namedtuple('MemoInfo', 'hits misses size maxsize')
+
+_MISSING = object()
+
+
+def memo_key(function):
+    """
+    Identifies the values of a function in a memo; wrappers (e.g. SearchSpace.wrap_binary) provide the key of the
+    function they wrap through a memo_key attribute, so wrappers of the same function share their values.
+    """
+    key = getattr(function, "memo_key", function)
+    try:
+        hash(key)
+    except TypeError:
+        key = id(key)
+    return key
+
+
+def _is_batch(item):
+    return isinstance(item, np.ndarray) and item.ndim == 2
+
+
+class EvaluationMemo:
+    """
+    Bounded LRU memo of function values, keyed by the function and the packed bitstring of each sample.
+    Pass it as memo= to the SamplingCompiler methods or to SearchSpace.wrap_binary; the functions must be
+    deterministic. A memo is thread-safe, worker processes use their own copy.
+    """
+
+    def __init__(self, maxsize: Optional[int] = 1 << 20):
+        """
+        :param maxsize: int, optional
+            maximum number of stored values, None for no limit
+        """
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._values = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state["_lock"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._values)
+
+    def info(self) -> MemoInfo:
+        return MemoInfo(self.hits, self.misses, len(self._values), self.maxsize)
+
+    def clear(self):
+        """
+        Removes all values and resets the counters.
+        """
+        with self._lock:
+            self._values.clear()
+            self.hits = self.misses = 0
+
+    @staticmethod
+    def keys(samples) -> list:
+        """
+        Packed bitstrings of a 2-D array (or sequence) of samples, one bytes object per row.
+        """
+        samples = np.asarray(samples, dtype=np.uint8)
+        length = samples.shape[1].to_bytes(4, "little")
+        return [length + row.tobytes() for row in np.packbits(samples, axis=1)]
+
+    def lookup(self, function_key, keys) -> list:
+        """
+        The stored values of the keys, _MISSING where there is none.
+        """
+        values = []
+        with self._lock:
+            for key in keys:
+                key = (function_key, key)
+                value = self._values.get(key, _MISSING)
+                if value is _MISSING:
+                    self.misses += 1
+                else:
+                    self._values.move_to_end(key)
+                    self.hits += 1
+                values.append(value)
+        return values
+
+    def store(self, function_key, keys, values):
+        with self._lock:
+            for key, value in zip(keys, values):
+                self._values[(function_key, key)] = value
+                self._values.move_to_end((function_key, key))
+            if self.maxsize is not None:
+                while len(self._values) > self.maxsize:
+                    self._values.popitem(last=False)
+
+    def map(
+        self,
+        function: Callable,
+        items: Iterable,
+        evaluate: Callable,
+        window: int = 1024,
+        advance: Optional[Callable[[int], None]] = None,
+    ):
+        """
+        Lazily applies function to the items (samples or 2-D batches of samples) in order, passing only the
+        samples without a stored value to evaluate(function, items), window items at a time.
+        :param advance: called with the number of samples taken from the memo
+        :return: generator of the function values
+        """
+        function_key = memo_key(function)
+        items = iter(items)
+        while True:
+            chunk = list(islice(items, window))
+            if not chunk:
+                return
+            plans, missing, cached = [], [], 0
+            for item in chunk:
+                batch = _is_batch(item)
+                keys = self.keys(item if batch else [item])
+                values = self.lookup(function_key, keys)
+                todo = [row for row, value in enumerate(values) if value is _MISSING]
+                if len(todo) == len(values):
+                    missing.append(item)
+                elif todo:
+                    missing.append(item[todo])
+                cached += len(values) - len(todo)
+                plans.append((batch, keys, values, todo))
+            if advance is not None and cached:
+                advance(cached)
+            results = iter(evaluate(function, missing)) if missing else iter(())
+            for batch, keys, values, todo in plans:
+                if todo:
+                    result = next(results)
+                    new = list(np.asarray(result).reshape(-1)) if batch else [result]
+                    for row, value in zip(todo, new):
+                        values[row] = value
+                    self.store(function_key, [keys[row] for row in todo], new)
+                yield np.asarray(values) if batch else values[0]
+
+    def wrap(self, function: Callable, vectorized: bool = False) -> "_Memoized":
+        """
+        Memoized version of a function of one sample, or of a 2-D batch of samples if vectorized.
+        """
+        return _Memoized(self, function, vectorized)
+
+    def wrap_async(
+        self, function: Callable, vectorized: bool = False, advance: Optional[Callable[[int], None]] = None
+    ) -> "_AsyncMemoized":
+        """
+        Memoized version of a coroutine function (or a function returning awaitables) for the async entry points,
+        only the samples without a stored value are passed to the function.
+        :param advance: called with the number of samples taken from the memo
+        """
+        return _AsyncMemoized(self, function, vectorized, advance)
+
+
+class _Memoized:
+    """
+    Looks the samples up in the memo before calling the function, picklable for multiprocessing.
+    """
+
+    def __init__(self, memo, function, vectorized):
+        self.memo = memo
+        self.function = function
+        self.vectorized = vectorized
+
+    @property
+    def memo_key(self):
+        return memo_key(self.function)
+
+    def __call__(self, x):
+        item = np.asarray(x) if self.vectorized else x
+        return next(self.memo.map(self.function, [item], lambda function, items: map(function, items)))
+
+
+class _AsyncMemoized(_Memoized):
+    """
+    Looks the samples up in the memo before calling and awaiting the function.
+    """
+
+    def __init__(self, memo, function, vectorized, advance=None):
+        super().__init__(memo, function, vectorized)
+        self.advance = advance
+
+    async def __call__(self, x):
+        item = np.asarray(x) if self.vectorized else x
+        function_key = memo_key(self.function)
+        keys = self.memo.keys(item if self.vectorized else [item])
+        values = self.memo.lookup(function_key, keys)
+        todo = [row for row, value in enumerate(values) if value is _MISSING]
+        if self.advance is not None and len(todo) < len(values):
+            self.advance(len(values) - len(todo))
+        if todo:
+            result = self.function(item[todo] if self.vectorized and len(todo) < len(values) else item)
+            if inspect.isawaitable(result):
+                result = await result
+            new = list(np.asarray(result).reshape(-1)) if self.vectorized else [result]
+            for row, value in zip(todo, new):
+                values[row] = value
+            self.memo.store(function_key, [keys[row] for row in todo], new)
+        return np.asarray(values) if self.vectorized else values[0]
+
+
+class MemoizedExecutor(Executor):
+    """
+    Evaluates the samples without a value in the memo on another executor.
+    """
+
+    def __init__(self, executor: Executor, memo: EvaluationMemo):
+        self.executor = executor
+        self.memo = memo
+        self.chunksize = executor.chunksize
+
+    @property
+    def workers(self):
+        return self.executor.workers
+
+    def map(self, function, items, chunksize=None):
+        return self.memo.map(function, items, lambda f, missing: self.executor.map(f, missing, chunksize))
@@ -7,81 +7,120 @@ import numpy as np
 import sympy
 from typing_extensions import Literal
 from typing import Union
+from autoqubo.utils import issparse
+
+
+def _sign_mask(values, sign):
+    """
+    elementwise values > 0 (sign=1) or values < 0 (sign=-1) as a bool array,
+    for sympy expressions the sign must follow from the symbol assumptions
+    """
+    try:
+        return np.asarray(values > 0 if sign > 0 else values < 0, dtype=bool)
+    except TypeError as e:
+        raise TypeError(
+            "The sign of a symbolic coefficient cannot be determined, create the symbols with positive=True"
+        ) from e
+
+
+def _upper_sums(C, sign, axis):
+    """
+    sums of the strictly upper-triangular entries of C with the given sign,
+    per column (axis=0) or per row (axis=1)
+    """
+    n = C.shape[0]
+    if issparse(C):
+        coo = C.tocoo()
+        upper = coo.row < coo.col
+        values = coo.data[upper]
+        index = (coo.col if axis == 0 else coo.row)[upper]
+        keep = _sign_mask(values, sign)
+        return np.bincount(index[keep], weights=values[keep], minlength=n)
+    part = np.triu(C, 1)
+    part[~_sign_mask(part, sign)] = 0
+    return part.sum(axis=axis)
+
+
+def _as_weight(value):
+    """float for numeric weights, sympy expression for symbolic ones"""
+    try:
+        return float(value)
+    except TypeError:
+        return value
 
 
 def sum_penalty(cost_qubo: np.ndarray) -> Union[float, sympy.core.add.Add]:
     """
     maximimum difference in positive/negative rowsums
-    :param cost_qubo: np.ndarray
+    :param cost_qubo: np.ndarray or scipy.sparse matrix
         qubo matrix only representing the cost function
     :return:
         weight: float or sympy expression
     """
-    pos_sum = cost_qubo[cost_qubo > 0].sum()
-    neg_sum = cost_qubo[cost_qubo < 0].sum()
+    if issparse(cost_qubo):
+        cost_qubo = cost_qubo.tocsr().data
+    pos_sum = cost_qubo[_sign_mask(cost_qubo, 1)].sum()
+    neg_sum = cost_qubo[_sign_mask(cost_qubo, -1)].sum()
     return pos_sum - neg_sum
 
 
-def pos_neg_penalty(C: np.ndarray) -> float:
+def pos_neg_penalty(C: np.ndarray) -> Union[float, sympy.Expr]:
     """
     use constants from posi-and negaform represenation of the cost
     following [Boros, Endre & Hammer, Peter & Tavares, Gabriel. (2006).
     Preprocessing of unconstrained quadratic binary optimization]
-    :param C: np.ndarray
-        cost qubo matrix only representing the cost function
+    :param C: np.ndarray or scipy.sparse matrix
+        cost qubo matrix only representing the cost function, symbolic (object dtype) matrices are supported
     :return:
-        weight: float
+        weight: float or sympy expression
     """
-    # TODO support symbolic cost matrices
-    n = C.shape[0]
+    diagonal = C.diagonal()
     # positive form
     # c_j' = c_j + \sum_{c_ij<0} c_{ij}
-    pos_cj = np.array([C[j][j] + C[:j, j][C[:j, j] < 0].sum() for j in range(n)])
+    pos_cj = diagonal + _upper_sums(C, -1, axis=0)
     # c_0' = c_0 + \sum_{c_j'<0} c_j'
-    pos_c0 = pos_cj[pos_cj < 0].sum()
+    pos_c0 = pos_cj[_sign_mask(pos_cj, -1)].sum()
     # negative form
-    neg_cj = np.array([C[j][j] + C[:j, j][C[:j, j] > 0].sum() for j in range(n)])
-    neg_c0 = neg_cj[neg_cj > 0].sum()
-    return float(neg_c0 - pos_c0)
+    neg_cj = diagonal + _upper_sums(C, 1, axis=0)
+    neg_c0 = neg_cj[_sign_mask(neg_cj, 1)].sum()
+    return _as_weight(neg_c0 - pos_c0)
 
 
-def verma_lewis(C: np.ndarray) -> float:
+def verma_lewis(C: np.ndarray) -> Union[float, sympy.Expr]:
     """
     maximum sum of positive/negative row entries
     linear terms are always added, just with different sign
-    :param C: np.ndarray
-        cost qubo matrix only representing the cost function
+    :param C: np.ndarray or scipy.sparse matrix
+        cost qubo matrix only representing the cost function, symbolic (object dtype) matrices are supported
     :return:
-        weight: float
+        weight: float or sympy expression
     """
-    # TODO support symbolic cost matrices
-    n = C.shape[0]
+    diagonal = C.diagonal()
     # positive entries: c_ii + \sum c_ij (c_ij>0)
-    pos_sum = np.array(
-        [C[i][i] + C[i, i + 1 :][C[i, i + 1 :] > 0].sum() for i in range(n)]
-    )
+    pos_sum = diagonal + _upper_sums(C, 1, axis=1)
     # negative entries: -c_ii - \sum c_ij (c_ij<0)
-    neg_sum = np.array(
-        [-C[i][i] - C[i, i + 1 :][C[i, i + 1 :] < 0].sum() for i in range(n)]
-    )
-    return float(np.max([pos_sum, neg_sum]))
+    neg_sum = -diagonal - _upper_sums(C, -1, axis=1)
+    sums = np.concatenate([pos_sum, neg_sum])
+    if sums.dtype == object:
+        return _as_weight(sympy.Max(*sums))
+    return float(np.max(sums))
 
 
 def generate_penalty(
     penalty_method: Literal["sum", "pnform", "verma_lewis"],
     cost_qubo: np.ndarray,
     constraint_qubo: np.ndarray,
-) -> float:
+) -> Union[float, sympy.Expr]:
     """
     performs any given penalty method and returns the weight
-    :param cost_qubo: np.ndarray
+    :param cost_qubo: np.ndarray or scipy.sparse matrix
         qubo matrix only representing the cost function
-    :param constraint_qubo: np.ndarray
+    :param constraint_qubo: np.ndarray or scipy.sparse matrix
         qubo matrix only representing the constraint functions
     :param penalty_method: Literal
         how to generate penalty weight
     :return:
-        weight: float
+        weight: float or sympy expression
     """
     if penalty_method == "sum":
         return sum_penalty(cost_qubo)
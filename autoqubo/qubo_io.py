@@ -0,0 +1,368 @@
+"""
+reads and writes QUBO matrices with their offset, variable labels
+and SearchSpace metadata in the qbsolv, MatrixMarket, npz and a
+raw memory-mappable format
+"""
+
+import json
+import os
+import struct
+import warnings
+import zipfile
+from collections import namedtuple
+from typing import Optional, Sequence
+import numpy as np
+from autoqubo.binarization import Binarization, Type
+from autoqubo.search_space import SearchSpace
+from autoqubo.utils import issparse, nonzero_entries
+
+# number of matrix entries (dense) or non-zeros (sparse) processed per chunk
+DEFAULT_CHUNK_SIZE = 1 << 22
+
+QuboData = namedtuple('QuboData', 'qubo offset labels searchspace')
+
+FORMATS = {".qubo": "qbsolv", ".mtx": "matrixmarket", ".npz": "npz", ".aqubo": "raw"}
+
+# raw layout: MAGIC, little-endian uint64 header length, JSON header, padding to ALIGNMENT, arrays
+MAGIC = b"AQUBO\x00\x00\x01"
+ALIGNMENT = 64
+
+
+def _format(path, fmt):
+    if fmt is None:
+        fmt = FORMATS.get(os.path.splitext(path)[1].lower())
+        if fmt is None:
+            raise ValueError(f"Cannot infer the QUBO format of {path}, pass one of {sorted(FORMATS.values())}")
+    if fmt not in FORMATS.values():
+        raise ValueError(f"Unknown QUBO format {fmt}")
+    return fmt
+
+
+def _check_numeric(q):
+    if not issparse(q) and np.asarray(q[:0]).dtype == object:
+        raise TypeError("Symbolic QUBO matrices cannot be written, insert values first")
+
+
+def _iter_chunks(q, chunk_size):
+    """yields (rows, columns, values) of the non-zero entries, a block of rows at a time"""
+    n = q.shape[0]
+    if issparse(q):
+        q = q.tocsr()
+        per_row = max(1, q.nnz // max(n, 1))
+    else:
+        per_row = max(n, 1)
+    step = max(1, chunk_size // per_row)
+    for start in range(0, n, step):
+        yield nonzero_entries(q, start, min(start + step, n))
+
+
+def _format_entries(fmt, rows, cols, values):
+    """formats all entries of a chunk with a single string formatting call"""
+    flat = [v for entry in zip(rows.tolist(), cols.tolist(), values.tolist()) for v in entry]
+    return (fmt * len(rows)) % tuple(flat)
+
+
+def _type_name(var_type):
+    for name in ("uint", "sint"):
+        if var_type is getattr(Binarization, name):
+            return name
+    return None
+
+
+def searchspace_metadata(searchspace: SearchSpace) -> list:
+    """
+    Describes the variables of a searchspace in JSON serializable form: label, first bit, number of bits, the name
+    of built-in types and, for affine types, the weights and offset of the decoding.
+    """
+    variables = []
+    for (label, var_type, size), (start, weights, offset) in zip(searchspace.desc, searchspace._plan):
+        entry = {"label": label, "start": start, "size": size, "type": _type_name(var_type)}
+        if weights is not None:
+            entry["weights"] = np.asarray(weights).tolist()
+            entry["offset"] = np.asarray(offset).tolist()
+        variables.append(entry)
+    return variables
+
+
+def searchspace_from_metadata(variables: list) -> SearchSpace:
+    """
+    Rebuilds a searchspace from searchspace_metadata. Built-in types are restored, other affine types can only
+    decode; variables of other types raise ValueError.
+    """
+    searchspace = SearchSpace()
+    for entry in variables:
+        if entry.get("type") is not None:
+            var_type = getattr(Binarization, entry["type"])
+        elif "weights" in entry:
+            weights, offset = np.asarray(entry["weights"]), entry["offset"]
+
+            def decode(bitstring, weights=weights, offset=offset):
+                return np.asarray(bitstring) @ weights + offset
+
+            def affine(binary_size, weights=weights, offset=offset):
+                return weights, offset
+
+            var_type = Type(decode, None, affine, None, entry["size"])
+        else:
+            raise ValueError(f"Variable {entry['label']} has no serializable type")
+        searchspace.add(entry["label"], var_type, entry["size"])
+    return searchspace
+
+
+def _metadata(offset, labels, searchspace):
+    return {
+        "offset": float(offset),
+        "labels": None if labels is None else list(labels),
+        "searchspace": None if searchspace is None else searchspace_metadata(searchspace),
+    }
+
+
+def _count_nonzeros(q, chunk_size):
+    diagonal = total = 0
+    for rows, cols, _ in _iter_chunks(q, chunk_size):
+        diagonal += np.count_nonzero(rows == cols)
+        total += len(rows)
+    return diagonal, total
+
+
+def _write_text(path, q, meta, banner, comment, header, base, chunk_size, diagonal_first):
+    """
+    Writes the banner, one comment line per metadata item, the header and the entries with indices starting at base.
+    If diagonal_first, all diagonal entries are written before the off-diagonal ones.
+    """
+    with open(path, "w") as f:
+        f.write(banner)
+        for key, value in meta.items():
+            f.write(f"{comment} {key} {json.dumps(value, default=str)}\n")
+        f.write(header)
+        for diagonal in ([True, False] if diagonal_first else [None]):
+            for rows, cols, values in _iter_chunks(q, chunk_size):
+                if diagonal is not None:
+                    keep = (rows == cols) == diagonal
+                    rows, cols, values = rows[keep], cols[keep], values[keep]
+                f.write(_format_entries("%d %d %r\n", rows + base, cols + base, values))
+
+
+def _write_qbsolv(path, q, meta, chunk_size):
+    n = q.shape[0]
+    diagonal, total = _count_nonzeros(q, chunk_size)
+    header = f"p qubo 0 {n} {diagonal} {total - diagonal}\n"
+    _write_text(path, q, meta, "", "c", header, 0, chunk_size, diagonal_first=True)
+
+
+def _write_matrixmarket(path, q, meta, chunk_size):
+    _, total = _count_nonzeros(q, chunk_size)
+    banner = "%%MatrixMarket matrix coordinate real general\n"
+    header = f"{q.shape[0]} {q.shape[1]} {total}\n"
+    _write_text(path, q, meta, banner, "%", header, 1, chunk_size, diagonal_first=False)
+
+
+def _write_npz(path, q, meta, chunk_size):
+    """
+    Writes the same archive as np.savez_compressed, but the entries are streamed into the rows, cols and values
+    members one chunk at a time (one pass over the matrix per member).
+    """
+    _, total = _count_nonzeros(q, chunk_size)
+    with zipfile.ZipFile(path, "w", compression=zipfile.ZIP_DEFLATED, allowZip64=True) as archive:
+        for k, (name, dtype) in enumerate([("rows", "<i8"), ("cols", "<i8"), ("values", "<f8")]):
+            with archive.open(f"{name}.npy", "w", force_zip64=True) as f:
+                header = {"descr": dtype, "fortran_order": False, "shape": (total,)}
+                np.lib.format.write_array_header_1_0(f, header)
+                for chunk in _iter_chunks(q, chunk_size):
+                    f.write(np.asarray(chunk[k], dtype=dtype).tobytes())
+        small = {
+            "shape": np.array(q.shape), "dense": np.array(not issparse(q)),
+            "meta": np.array(json.dumps(meta, default=str)),
+        }
+        for name, array in small.items():
+            with archive.open(f"{name}.npy", "w") as f:
+                np.lib.format.write_array(f, array)
+
+
+def _write_raw(path, q, meta, chunk_size):
+    if issparse(q):
+        coo = q.tocoo()
+        arrays = [coo.row.astype("<i8"), coo.col.astype("<i8"), coo.data.astype("<f8")]
+        layout = {"layout": "coo", "nnz": int(coo.nnz)}
+    else:
+        arrays = None
+        layout = {"layout": "dense"}
+    header = dict(meta, shape=list(q.shape), dtype="<f8", **layout)
+    header = json.dumps(header, default=str).encode()
+    start = len(MAGIC) + 8 + len(header)
+    padding = -start % ALIGNMENT
+    with open(path, "wb") as f:
+        f.write(MAGIC)
+        f.write(struct.pack("<Q", len(header) + padding))
+        f.write(header + b" " * padding)
+        if arrays is not None:
+            for array in arrays:
+                f.write(array.tobytes())
+        else:
+            step = max(1, chunk_size // max(q.shape[1], 1))
+            for start in range(0, q.shape[0], step):
+                f.write(np.asarray(q[start:start + step], dtype="<f8").tobytes())
+
+
+def write_qubo(
+    path: str,
+    q,
+    offset: float = 0,
+    fmt: Optional[str] = None,
+    labels: Optional[Sequence] = None,
+    searchspace: Optional[SearchSpace] = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+):
+    """
+    Writes a QUBO matrix, its offset and optional labels and searchspace metadata to a file. Non-zero entries are
+    extracted with vectorized operations, a block of rows at a time, so the matrix may be a memory-mapped array
+    or a scipy.sparse matrix larger than the available memory for intermediate copies.
+    :param path:
+        file name, the format is inferred from the extension if fmt is None: .qubo (qbsolv), .mtx (MatrixMarket),
+        .npz (compressed numpy) or .aqubo (raw memory-mappable layout)
+    :param q:
+        QUBO matrix, dense, memory-mapped or scipy.sparse
+    :param offset:
+    :param fmt:
+        one of "qbsolv", "matrixmarket", "npz", "raw"
+    :param labels:
+        one label per binary variable
+    :param searchspace:
+        stored as metadata, see searchspace_metadata
+    :param chunk_size:
+        number of matrix entries per chunk
+    """
+    fmt = _format(path, fmt)
+    _check_numeric(q)
+    meta = _metadata(offset, labels, searchspace)
+    writer = {"qbsolv": _write_qbsolv, "matrixmarket": _write_matrixmarket, "npz": _write_npz, "raw": _write_raw}
+    writer[fmt](path, q, meta, chunk_size)
+
+
+def _read_text_meta(path, comment):
+    meta = {}
+    with open(path) as f:
+        for line in f:
+            if line.startswith("%%"):
+                continue
+            if not line.startswith(comment):
+                break
+            key, _, value = line[len(comment):].strip().partition(" ")
+            try:
+                meta[key] = json.loads(value)
+            except json.JSONDecodeError:
+                # comments written by other tools
+                pass
+    return meta
+
+
+def _assemble(rows, cols, values, shape, sparse):
+    if sparse:
+        from scipy.sparse import coo_matrix
+
+        return coo_matrix((values, (rows, cols)), shape=shape).tocsr()
+    q = np.zeros(shape)
+    np.add.at(q, (rows, cols), values)
+    return q
+
+
+def _read_entries(path, comments, skip, pattern=False):
+    """rows, columns and values of the entry lines, the value of an entry without one (pattern) is 1"""
+    with warnings.catch_warnings():
+        # an all-zero matrix is written without entries
+        warnings.simplefilter("ignore", UserWarning)
+        entries = np.loadtxt(path, comments=comments, skiprows=skip, ndmin=2)
+    entries = entries.reshape(-1, 2 if pattern else 3)
+    values = np.ones(len(entries)) if pattern else entries[:, 2]
+    return entries[:, 0].astype(np.int64), entries[:, 1].astype(np.int64), values
+
+
+def _read_qbsolv(path, sparse):
+    n = None
+    with open(path) as f:
+        for line in f:
+            if line.startswith("p"):
+                n = int(line.split()[3])
+                break
+    if n is None:
+        raise ValueError(f"{path} has no qbsolv problem line")
+    rows, cols, values = _read_entries(path, ["c", "p"], 0)
+    meta = _read_text_meta(path, "c")
+    return _assemble(rows, cols, values, (n, n), True if sparse is None else sparse), meta
+
+
+def _read_matrixmarket(path, sparse):
+    meta = _read_text_meta(path, "%")
+    banner = ["%%matrixmarket", "matrix", "coordinate", "real", "general"]
+    with open(path) as f:
+        for skip, line in enumerate(f, 1):
+            if skip == 1 and line.startswith("%%"):
+                banner = line.lower().split()
+            if not line.startswith("%"):
+                shape = tuple(int(v) for v in line.split()[:2])
+                break
+    if len(banner) != 5 or banner[:3] != ["%%matrixmarket", "matrix", "coordinate"]:
+        raise ValueError(f"{path} is not a MatrixMarket coordinate matrix")
+    field, symmetry = banner[3:]
+    if field not in ("real", "integer", "pattern") or symmetry not in ("general", "symmetric", "skew-symmetric"):
+        raise ValueError(f"MatrixMarket {field} {symmetry} matrices are not supported")
+    # the size line is not a comment
+    rows, cols, values = _read_entries(path, "%", skip, pattern=field == "pattern")
+    if symmetry != "general":
+        # only one triangle is stored
+        mirrored = rows != cols
+        sign = 1 if symmetry == "symmetric" else -1
+        rows, cols = np.concatenate([rows, cols[mirrored]]), np.concatenate([cols, rows[mirrored]])
+        values = np.concatenate([values, sign * values[mirrored]])
+    return _assemble(rows - 1, cols - 1, values, shape, True if sparse is None else sparse), meta
+
+
+def _read_npz(path, sparse):
+    with np.load(path) as data:
+        meta = json.loads(data["meta"].item())
+        sparse = not data["dense"].item() if sparse is None else sparse
+        q = _assemble(data["rows"], data["cols"], data["values"], tuple(data["shape"].tolist()), sparse)
+    return q, meta
+
+
+def _read_raw(path, sparse):
+    with open(path, "rb") as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path} is not a raw QUBO file")
+        (length,) = struct.unpack("<Q", f.read(8))
+        meta = json.loads(f.read(length))
+    start = len(MAGIC) + 8 + length
+    shape = tuple(meta.pop("shape"))
+    dtype = np.dtype(meta.pop("dtype"))
+    layout = meta.pop("layout")
+    if layout == "dense":
+        q = np.memmap(path, dtype=dtype, mode="r", offset=start, shape=shape)
+        if sparse:
+            from scipy.sparse import csr_matrix
+
+            q = csr_matrix(q)
+        return q, meta
+    nnz = meta.pop("nnz")
+    rows = np.memmap(path, dtype="<i8", mode="r", offset=start, shape=(nnz,))
+    cols = np.memmap(path, dtype="<i8", mode="r", offset=start + 8 * nnz, shape=(nnz,))
+    values = np.memmap(path, dtype=dtype, mode="r", offset=start + 16 * nnz, shape=(nnz,))
+    return _assemble(rows, cols, values, shape, True if sparse is None else sparse), meta
+
+
+def read_qubo(path: str, fmt: Optional[str] = None, sparse: Optional[bool] = None) -> QuboData:
+    """
+    Reads a QUBO written by write_qubo, or a qbsolv or MatrixMarket file written by other tools.
+    Dense raw files are memory-mapped read-only.
+    :param path:
+    :param fmt:
+        see write_qubo
+    :param sparse:
+        True for a scipy.sparse CSR matrix, False for a dense array; None keeps the layout stored in npz and raw
+        files and returns CSR matrices for the text formats
+    :return: QuboData(qubo, offset, labels, searchspace)
+        searchspace is the metadata list of searchspace_metadata, see searchspace_from_metadata
+    """
+    fmt = _format(path, fmt)
+    reader = {"qbsolv": _read_qbsolv, "matrixmarket": _read_matrixmarket, "npz": _read_npz, "raw": _read_raw}
+    q, meta = reader[fmt](path, sparse)
+    return QuboData(q, meta.get("offset", 0), meta.get("labels"), meta.get("searchspace"))
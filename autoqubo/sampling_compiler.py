@@ -1,10 +1,133 @@
+import asyncio
+import inspect
+import json
 import numpy as np
-import sys
+import os
+import time
+from collections import namedtuple
 import warnings
-from multiprocessing import Pool
-from typing import Callable, Optional, Tuple
+from contextlib import nullcontext
+from typing import Callable, Iterable, Optional, Tuple, Union
 from typing_extensions import Literal
+from concurrent.futures import Executor as FuturesExecutor
+from autoqubo.cache import QuboCache, fingerprint
+from autoqubo.executors import Executor, get_executor
+from autoqubo.memo import EvaluationMemo, MemoizedExecutor, memo_key
+from autoqubo.instrumentation import Instrumentation, _Timed
 from autoqubo.penalty_weights import generate_penalty
+from autoqubo.utils import Utils, issparse
+
+
+DEFAULT_BATCH_SIZE = 1024
+
+DiscoveryReport = namedtuple('DiscoveryReport', 'evaluations full_evaluations saved_evaluations')
+
+TruthTableReport = namedtuple('TruthTableReport', 'quadratic degree num_higher_order_terms higher_order_terms')
+
+# the truth table of 2^MAX_TRUTH_TABLE_SIZE float64 values takes 8 GiB
+MAX_TRUTH_TABLE_SIZE = 30
+
+VerificationReport = namedtuple(
+    'VerificationReport', 'passed num_samples max_error failing_samples failure_rate_bound'
+)
+
+
+class _Residual:
+    """
+    Difference between a fitness function and the energy of a QUBO, picklable for multiprocessing.
+    """
+
+    def __init__(self, fitness_function, qubo_matrix, offset, vectorized):
+        self.fitness_function = fitness_function
+        self.qubo_matrix = qubo_matrix
+        self.offset = offset
+        self.vectorized = vectorized
+
+    def __call__(self, x):
+        if self.vectorized:
+            return np.asarray(self.fitness_function(x)) - Utils.energies(self.qubo_matrix, x, self.offset)
+        return self.fitness_function(x) - Utils.energy(self.qubo_matrix, np.asarray(x), self.offset)
+
+
+class _RowWise:
+    """
+    Evaluates a fitness function on each row of a 2-D batch, picklable for multiprocessing.
+    """
+
+    def __init__(self, fitness_function):
+        self.fitness_function = fitness_function
+
+    @property
+    def memo_key(self):
+        return memo_key(self.fitness_function)
+
+    def __call__(self, batch):
+        return [self.fitness_function(sample) for sample in batch.tolist()]
+
+
+class _LocalTerms:
+    """
+    Compiles additive terms over their own variables, picklable for multiprocessing.
+    Items are (position of the term function, number of variables).
+    """
+
+    def __init__(self, functions, vectorized, batch_size, memo=None):
+        self.functions = functions
+        self.vectorized = vectorized
+        self.batch_size = batch_size
+        self.memo = memo
+
+    def __call__(self, term):
+        position, size = term
+        return SamplingCompiler._generate_qubo_coefficients(
+            self.functions[position], size, SamplingCompiler._executor(False, None, self.memo), self.vectorized,
+            self.batch_size,
+        )
+
+
+class _InExecutor:
+    """
+    Calls a synchronous function on an executor of the running event loop, so it does not block the loop.
+    """
+
+    def __init__(self, function, executor=None):
+        self.function = function
+        self.executor = executor
+
+    @property
+    def memo_key(self):
+        return memo_key(self.function)
+
+    async def __call__(self, *args):
+        value = await asyncio.get_event_loop().run_in_executor(self.executor, self.function, *args)
+        if inspect.isawaitable(value):
+            value = await value
+        return value
+
+
+class _AsyncTimed:
+    """
+    Awaits a (coroutine) function and counts the call in the instrumentation.
+    """
+
+    def __init__(self, function, instrumentation):
+        self.function = function
+        self.instrumentation = instrumentation
+
+    @property
+    def memo_key(self):
+        return memo_key(self.function)
+
+    async def __call__(self, item):
+        start = time.perf_counter()
+        value = self.function(item)
+        if inspect.isawaitable(value):
+            value = await value
+        # concurrent calls overlap, so their time is not excluded from enclosing phases
+        self.instrumentation.call(
+            start, time.perf_counter() - start, len(value) if np.ndim(value) else 1, wall=0.0
+        )
+        return value
 
 
 class SamplingCompiler:
@@ -30,6 +153,68 @@ class SamplingCompiler:
             sample[i] = 1
         return sample
 
+    @staticmethod
+    def _num_training_samples(input_size):
+        return 1 + input_size + input_size * (input_size - 1) // 2
+
+    @staticmethod
+    def _pair_indices(input_size, pair_number):
+        """
+        Inverts the row-major enumeration of the upper triangle (i < j) used by _indices_iterator.
+        :param input_size: int
+        :param pair_number: np.ndarray
+            zero-based positions within the enumeration of pairs
+        :return: i, j
+        """
+        p = np.asarray(pair_number, dtype=np.int64)
+        m = 2 * input_size - 1
+
+        def row_offset(i):
+            return i * (m - i) // 2
+
+        i = np.floor((m - np.sqrt(np.maximum(m * m - 8.0 * p, 0))) / 2).astype(np.int64)
+        # correct floating point rounding
+        i = np.where(row_offset(i) > p, i - 1, i)
+        i = np.where(row_offset(i + 1) <= p, i + 1, i)
+        j = p - row_offset(i) + i + 1
+        return i, j
+
+    @staticmethod
+    def _index_arrays(input_size, start, stop):
+        """
+        Vectorized counterpart of _indices_iterator for the training samples start..stop-1.
+        :return: first, second
+            positions of the first and second one-hot bit of each sample, -1 where absent
+        """
+        k = np.arange(start, stop, dtype=np.int64)
+        first = np.full(k.shape, -1, dtype=np.int64)
+        second = np.full(k.shape, -1, dtype=np.int64)
+        single = (k >= 1) & (k <= input_size)
+        first[single] = k[single] - 1
+        pair = k > input_size
+        first[pair], second[pair] = SamplingCompiler._pair_indices(input_size, k[pair] - input_size - 1)
+        return first, second
+
+    @staticmethod
+    def _training_batch(input_size, start, stop):
+        """
+        Training samples start..stop-1 as a 2-D array of shape (stop - start, input_size).
+        """
+        first, second = SamplingCompiler._index_arrays(input_size, start, stop)
+        batch = np.zeros((stop - start, input_size), dtype=int)
+        rows = np.arange(stop - start)
+        batch[rows[first >= 0], first[first >= 0]] = 1
+        batch[rows[second >= 0], second[second >= 0]] = 1
+        return batch
+
+    @staticmethod
+    def _get_training_batches(input_size, batch_size, start=0):
+        total = SamplingCompiler._num_training_samples(input_size)
+        return (
+            SamplingCompiler._training_batch(input_size, k, min(k + batch_size, total))
+            for k in range(start, total, batch_size)
+        )
+
     @staticmethod
     def _new_test_sample(input_size):
         sample = tuple(np.random.randint(2, size=(input_size,)))
@@ -42,29 +227,175 @@ class SamplingCompiler:
             for idx in SamplingCompiler._indices_iterator(input_size)
         )
 
+    @staticmethod
+    def _max_test_samples(input_size):
+        return 2**input_size - (1 + input_size * (input_size + 1) // 2)
+
+    @staticmethod
+    def _packed_test_samples(input_size, num_test_samples):
+        """
+        Draws distinct random test samples with at least 3 ones, packed with np.packbits (one row per sample).
+        """
+        max_test_samples = SamplingCompiler._max_test_samples(input_size)
+        num_test_samples = min(num_test_samples, max_test_samples)
+        if input_size <= 20 and 2 * num_test_samples >= max_test_samples:
+            # dense request on a small input, choose from all candidates
+            states = np.arange(2**input_size)
+            bits = ((states[:, None] >> np.arange(input_size)) & 1).astype(np.uint8)
+            # We know that the training set contains 0-hot, 1-hot and 2-hot examples.
+            # Hence all samples with at least 3 ones cannot be in the training set
+            bits = bits[bits.sum(axis=1) > 2]
+            bits = bits[np.random.permutation(len(bits))[:num_test_samples]]
+            return np.packbits(bits, axis=1)
+
+        packed = np.zeros((0, (input_size + 7) // 8), dtype=np.uint8)
+        while len(packed) < num_test_samples:
+            draw = max(2 * (num_test_samples - len(packed)), 64)
+            bits = np.random.randint(2, size=(draw, input_size)).astype(np.uint8)
+            bits = bits[bits.sum(axis=1) > 2]
+            packed = np.unique(np.concatenate([packed, np.packbits(bits, axis=1)]), axis=0)
+        return packed[np.random.permutation(len(packed))[:num_test_samples]]
+
     @staticmethod
     def _get_test_samples(input_size, num_test_samples):
         # Compute maximum number of testing samples and adjust
-        max_test_samples = 2**input_size - (1 + input_size * (input_size + 1) // 2)
+        max_test_samples = SamplingCompiler._max_test_samples(input_size)
         if num_test_samples > max_test_samples:
             print(
                 f"*** Warning, requested test size is {num_test_samples}, which is larger than the maximum of {max_test_samples}"
             )
             num_test_samples = max_test_samples
 
-        # Compute the test samples
-        test_samples = set()
-        while len(test_samples) < num_test_samples:
-            sample = SamplingCompiler._new_test_sample(input_size)
-            # We know that the training set contains 0-hot, 1-hot and 2-hot examples.
-            # Hence all samples with at least 3 ones cannot be in the training set
-            if sum(sample) > 2:
-                test_samples.add(sample)
+        packed = SamplingCompiler._packed_test_samples(input_size, num_test_samples)
+        return set(map(tuple, np.unpackbits(packed, axis=1, count=input_size).tolist()))
+
+    @staticmethod
+    def required_test_samples(max_failure_rate: float, confidence: float = 0.95) -> int:
+        """
+        Number of random test samples needed so that, if none of them fails, the fraction of failing inputs is
+        at most max_failure_rate with the given confidence.
+        :param max_failure_rate: float
+        :param confidence: float
+        :return: int
+        """
+        return int(np.ceil(np.log(1 - confidence) / np.log1p(-max_failure_rate)))
+
+    @staticmethod
+    def _failure_rate_bound(num_failures, num_samples, confidence):
+        """
+        Upper confidence bound on the fraction of failing inputs: exact for zero failures,
+        Hoeffding's inequality otherwise.
+        """
+        if num_samples == 0:
+            return 1.0
+        if num_failures == 0:
+            return float(1 - (1 - confidence) ** (1 / num_samples))
+        return float(min(1.0, num_failures / num_samples + np.sqrt(np.log(1 / (1 - confidence)) / (2 * num_samples))))
+
+    @staticmethod
+    def _map(function, items, executor, chunksize=1, instrumentation=None):
+        """
+        Lazily applies function to the items in order, on the given executor.
+
+        :param executor:
+            see executors.get_executor
+        :param chunksize: int
+            Suggested number of items sent to a worker at a time, the chunksize of the executor takes precedence.
+        :param instrumentation: Instrumentation, optional
+            Measures the generation of the items and the calls of the function.
+        :return: generator
+            The function values.
+        """
+        executor = get_executor(executor)
+        if isinstance(executor, MemoizedExecutor):
+            inner = executor.executor
+            window = max(256, chunksize * (inner.workers or 1) * 4)
+            yield from executor.memo.map(
+                function, items,
+                lambda f, missing: SamplingCompiler._map(f, missing, inner, chunksize, instrumentation),
+                window, None if instrumentation is None else instrumentation.advance,
+            )
+            return
+        if instrumentation is not None:
+            items = instrumentation.samples(items, concurrent=executor.workers is not None)
+            function = _Timed(function)
+        results = executor.map(function, items, chunksize)
+        if instrumentation is not None:
+            results = instrumentation.results(results, workers=executor.workers)
+        yield from results
+
+    @staticmethod
+    def _executor(use_multiprocessing, executor=None, memo=None):
+        """
+        Resolves the use_multiprocessing, executor and memo arguments of the public methods into one Executor.
+        """
+        executor = get_executor(use_multiprocessing if executor is None else executor)
+        return executor if memo is None else MemoizedExecutor(executor, memo)
+
+    @staticmethod
+    def _phase(instrumentation, name):
+        return nullcontext() if instrumentation is None else instrumentation.phase(name)
+
+    @staticmethod
+    def _evaluate_batches(fitness_function, batches, executor=True, instrumentation=None):
+        """
+        Evaluate a vectorized fitness function on 2-D batches of samples.
 
-        return test_samples
+        :param fitness_function: callable
+            Vectorized fitness function mapping a (batch, input_size) array to a 1-D array of values.
+        :param batches: iterable
+            2-D arrays of samples.
+        :param executor: optional
+            Executor evaluating the batches, see executors.get_executor.
+        :param instrumentation: Instrumentation, optional
+        :return: np.ndarray
+            1-D array containing the fitness values for each sample.
+        """
+        results = [
+            np.asarray(r).reshape(-1)
+            for r in SamplingCompiler._map(fitness_function, batches, executor, 1, instrumentation)
+        ]
+        if not results:
+            return np.zeros(0)
+        return np.concatenate(results)
+
+    @staticmethod
+    def _evaluate_samples(
+        fitness_function,
+        samples,
+        executor=True,
+        vectorized=False,
+        batch_size=DEFAULT_BATCH_SIZE,
+        instrumentation=None,
+    ):
+        """
+        Evaluate the fitness function on an arbitrary 2-D array of samples, or on an iterable of such arrays
+        which are generated lazily.
+
+        :return: np.ndarray
+            1-D array containing the fitness values for each sample.
+        """
+        batches = [samples] if isinstance(samples, np.ndarray) else samples
+        if vectorized:
+            return SamplingCompiler._evaluate_batches(
+                fitness_function,
+                (batch[k:k + batch_size] for batch in batches for k in range(0, len(batch), batch_size)),
+                executor,
+                instrumentation,
+            )
+        rows = (row for batch in batches for row in batch.tolist())
+        results = list(SamplingCompiler._map(fitness_function, rows, executor, 64, instrumentation))
+        return SamplingCompiler._as_numeric(results)
 
     @staticmethod
-    def _generate_training_output(fitness_function, input_size, use_multiprocessing=True):
+    def _generate_training_output(
+        fitness_function,
+        input_size,
+        executor=True,
+        vectorized=False,
+        batch_size=DEFAULT_BATCH_SIZE,
+        instrumentation=None,
+    ):
         """
         Gather and evaluate fitness function for training samples.
 
@@ -72,66 +403,311 @@ class SamplingCompiler:
             The fitness function to be evaluated.
         :param input_size: int
             The size of the input for the fitness function.
-        :param use_multiprocessing: bool, optional
-            Flag to enable/disable multiprocessing for generating training output.
+        :param executor: optional
+            Executor evaluating the training samples, see executors.get_executor.
+        :param vectorized: bool, optional
+            If True, the fitness function is called with 2-D arrays of shape (batch, input_size)
+            and must return a 1-D array of values.
+        :param batch_size: int, optional
+            Number of samples per call of a vectorized fitness function.
+        :param instrumentation: Instrumentation, optional
         :return: list
             List containing the fitness values for each training sample.
         """
-        if use_multiprocessing is False:
-            results = (
-                fitness_function(sample)
-                for sample in SamplingCompiler._get_training_samples(input_size)
+        if vectorized:
+            return SamplingCompiler._evaluate_batches(
+                fitness_function,
+                SamplingCompiler._get_training_batches(input_size, batch_size),
+                executor,
+                instrumentation,
             )
-        else:
-            if "ipykernel" in sys.modules:
-                msg = "Multiprocessing is enabled by default, but not available in interactive sessions such as jupyter notebooks. Sampling is done without multiprocessing."
-                warnings.warn(msg, UserWarning)
-                return SamplingCompiler._generate_training_output(
-                    fitness_function, input_size, use_multiprocessing=False
+        samples = SamplingCompiler._get_training_samples(input_size)
+        executor = get_executor(executor)
+        if executor.workers is None:
+            return SamplingCompiler._map(fitness_function, samples, executor, instrumentation=instrumentation)
+        # same chunks as Pool.map
+        chunksize = max(1, -(-SamplingCompiler._num_training_samples(input_size) // (executor.workers * 4)))
+        return list(SamplingCompiler._map(fitness_function, samples, executor, chunksize, instrumentation))
+
+    @staticmethod
+    def _as_numeric(values):
+        """
+        Converts an array of fitness values to float, keeping the object dtype if the values are symbolic.
+        """
+        values = np.asarray(values)
+        if values.dtype != object:
+            return values
+        try:  # try to convert to float array
+            return values.astype(np.float64)
+        except TypeError as e:
+            # keep object dtype if values are symbolic
+            if "symbol" in str(e) or "expression" in str(e):
+                return values
+            raise
+
+    @staticmethod
+    def _coefficients_from_outputs(outputs, input_size):
+        """
+        Applies inclusion-exclusion to the training outputs (in _indices_iterator order):
+        c = f(0), Q_ii = f(e_i) - f(0) and Q_ij = f(e_i + e_j) - f(e_i) - f(e_j) + f(0).
+        The pairs are processed one row of the upper triangle at a time, so only O(input_size) temporaries are used.
+        """
+        coefficients = SamplingCompiler._as_numeric(outputs)
+        # bool and integer outputs would not survive the in-place subtraction
+        coefficients = np.array(coefficients, dtype=object if coefficients.dtype == object else np.float64)
+        f0 = coefficients[0]
+        linear = coefficients[1:input_size + 1]
+        linear -= f0
+        start = input_size + 1
+        for i in range(input_size - 1):
+            stop = start + input_size - 1 - i
+            coefficients[start:stop] -= linear[i] + linear[i + 1:] + f0
+            start = stop
+        return coefficients
+
+    @staticmethod
+    def _iter_training_output(
+        fitness_function,
+        input_size,
+        executor=True,
+        vectorized=False,
+        batch_size=DEFAULT_BATCH_SIZE,
+        start=0,
+        instrumentation=None,
+    ):
+        """
+        Lazily evaluates the training samples in _indices_iterator order, beginning with sample number start.
+        Non-vectorized functions are mapped over the rows of each batch, so only one batch is pickled per task.
+
+        :return: generator
+            1-D arrays holding the fitness values of consecutive batches of at most batch_size training samples.
+        """
+        batches = SamplingCompiler._get_training_batches(input_size, batch_size, start)
+        evaluate = fitness_function if vectorized else _RowWise(fitness_function)
+        for result in SamplingCompiler._map(evaluate, batches, executor, 1, instrumentation):
+            yield SamplingCompiler._as_numeric(result).reshape(-1)
+
+    @staticmethod
+    def _qubo_rows(output_chunks, input_size):
+        """
+        Applies inclusion-exclusion to consecutive chunks of training outputs (in _indices_iterator order).
+        Only the linear coefficients and the outputs of an unfinished row of the upper triangle are kept in memory.
+
+        :return: generator
+            (f0, linear coefficients) first, then (i, Q[i, i + 1:]) for every row i of the upper triangle.
+        """
+        pending = np.zeros(0)
+        f0, linear = None, None
+        row = 0
+        for chunk in output_chunks:
+            pending = np.concatenate([pending, chunk.astype(np.float64)])
+            if linear is None:
+                if len(pending) < input_size + 1:
+                    continue
+                f0, linear = pending[0], pending[1:input_size + 1] - pending[0]
+                yield f0, linear
+                pending = pending[input_size + 1:]
+            while row < input_size - 1 and len(pending) >= input_size - 1 - row:
+                k = input_size - 1 - row
+                yield row, pending[:k] - linear[row] - linear[row + 1:] - f0
+                pending = pending[k:]
+                row += 1
+
+    @staticmethod
+    def _stream_qubo_matrix(output_chunks, input_size, path):
+        """
+        Assembles the QUBO matrix from consecutive chunks of training outputs into a memory-mapped .npy file.
+        """
+        qubo = np.lib.format.open_memmap(path, mode="w+", dtype=np.float64, shape=(input_size, input_size))
+        rows = SamplingCompiler._qubo_rows(output_chunks, input_size)
+        f0, linear = next(rows)
+        diagonal = np.arange(input_size)
+        qubo[diagonal, diagonal] = linear
+        for row, couplings in rows:
+            qubo[row, row + 1:] = couplings
+        qubo.flush()
+        return qubo, f0.item()
+
+    @staticmethod
+    def _stream_sparse_qubo_matrix(output_chunks, input_size):
+        """
+        Assembles an upper-triangular CSR QUBO matrix from consecutive chunks of training outputs, keeping only the
+        non-zero coefficients.
+        """
+        from scipy.sparse import csr_matrix
+
+        rows = SamplingCompiler._qubo_rows(output_chunks, input_size)
+        f0, linear = next(rows)
+        indptr = np.zeros(input_size + 1, dtype=np.int64)
+        indices, data = [], []
+        for row, couplings in rows:
+            nonzero = np.flatnonzero(couplings)
+            diagonal = [row] if linear[row] != 0 else []
+            indices += [np.array(diagonal, dtype=np.int64), nonzero + row + 1]
+            data += [linear[diagonal], couplings[nonzero]]
+            indptr[row + 1] = len(diagonal) + len(nonzero)
+        if input_size and linear[-1] != 0:
+            indices.append(np.array([input_size - 1]))
+            data.append(linear[-1:])
+            indptr[input_size] = 1
+        qubo = csr_matrix(
+            (
+                np.concatenate([np.zeros(0)] + data),
+                np.concatenate([np.zeros(0, dtype=np.int64)] + indices),
+                np.cumsum(indptr),
+            ),
+            shape=(input_size, input_size),
+        )
+        return qubo, f0.item()
+
+    @staticmethod
+    def _checkpointed_training_output(
+        fitness_function, input_size, executor, vectorized, batch_size, checkpoint, interval, key,
+        instrumentation=None,
+    ):
+        """
+        Evaluates the training samples while persisting the completed prefix of outputs to the checkpoint directory,
+        resuming from an earlier, interrupted run with the same key.
+
+        :return: np.memmap
+            1-D array containing the fitness values for all training samples.
+        """
+        total = SamplingCompiler._num_training_samples(input_size)
+        outputs_path = os.path.join(checkpoint, "outputs.npy")
+        progress_path = os.path.join(checkpoint, "progress.json")
+        os.makedirs(checkpoint, exist_ok=True)
+        if os.path.exists(progress_path):
+            with open(progress_path) as f:
+                progress = json.load(f)
+            if progress["key"] != key:
+                raise ValueError(
+                    f"Checkpoint {checkpoint} belongs to a different function or input size, remove it to start over"
                 )
-            samples = list(SamplingCompiler._get_training_samples(input_size))
-            with Pool() as pool:
-                results = pool.map(fitness_function, samples)
-        return results
+            outputs = np.load(outputs_path, mmap_mode="r+")
+        else:
+            progress = {"key": key, "completed": 0}
+            outputs = np.lib.format.open_memmap(outputs_path, mode="w+", dtype=np.float64, shape=(total,))
+
+        def save():
+            outputs.flush()
+            tmp = progress_path + ".tmp"
+            with open(tmp, "w") as f:
+                json.dump(progress, f)
+            os.replace(tmp, progress_path)
+
+        last_save = time.monotonic()
+        completed = progress["completed"]
+        if instrumentation is not None:
+            instrumentation.advance(completed)
+        for chunk in SamplingCompiler._iter_training_output(
+            fitness_function, input_size, executor, vectorized, batch_size, completed, instrumentation
+        ):
+            outputs[completed:completed + len(chunk)] = chunk
+            completed += len(chunk)
+            if time.monotonic() - last_save >= interval:
+                progress["completed"] = completed
+                save()
+                last_save = time.monotonic()
+        progress["completed"] = completed
+        save()
+        return outputs
 
     @classmethod
     def _generate_qubo_coefficients(
-        cls, fitness_function, input_size, use_multiprocessing = True
+        cls,
+        fitness_function,
+        input_size,
+        executor=True,
+        vectorized=False,
+        batch_size=DEFAULT_BATCH_SIZE,
+        instrumentation=None,
     ):
-        coefficients = []
-        for output, index in zip(
-            cls._generate_training_output(
-                fitness_function, input_size, use_multiprocessing
-            ),
-            cls._indices_iterator(input_size),
-        ):
-            coefficients.append(
-                output
-                - (0 if len(index) < 2 else sum(coefficients[i + 1] for i in index))
-                - (0 if index == tuple() else coefficients[0])
-            )
-        return coefficients
+        outputs = cls._generate_training_output(
+            fitness_function, input_size, executor, vectorized, batch_size, instrumentation
+        )
+        if not isinstance(outputs, np.ndarray):
+            outputs = list(outputs)
+        with cls._phase(instrumentation, "assembly"):
+            return cls._coefficients_from_outputs(outputs, input_size)
 
     @staticmethod
     def _qubo_matrix(coefficients, input_size):
-        # use general purpose object dtype first
-        qubo = np.zeros((input_size, input_size), dtype="object")
-        k = 0
-        for idx in SamplingCompiler._indices_iterator(input_size):
-            if len(idx) == 1:
-                qubo[idx[0], idx[0]] = coefficients[k]
-            if len(idx) == 2:
-                qubo[idx[0], idx[1]] = coefficients[k]
-            k += 1
-        try:  # try to convert to float array
-            qubo = qubo.astype(np.float64)
-        except TypeError as e:
-            # keep object dtype if qubo is symbolic
-            if "symbol" in str(e) or "expression" in str(e):
-                pass
+        coefficients = SamplingCompiler._as_numeric(coefficients)
+        # object dtype is kept for symbolic coefficients
+        dtype = object if coefficients.dtype == object else np.float64
+        qubo = np.zeros((input_size, input_size), dtype=dtype)
+        diagonal = np.arange(input_size)
+        qubo[diagonal, diagonal] = coefficients[1:input_size + 1]
+        start = input_size + 1
+        for i in range(input_size - 1):
+            stop = start + input_size - 1 - i
+            qubo[i, i + 1:] = coefficients[start:stop]
+            start = stop
+        offset = coefficients[0]
+        return qubo, (offset if dtype == object else offset.item())
+
+    @staticmethod
+    def _sparse_qubo_matrix(coefficients, input_size):
+        from scipy.sparse import coo_matrix
+
+        coefficients = SamplingCompiler._as_numeric(coefficients)
+        if coefficients.dtype == object:
+            raise TypeError("Sparse QUBO matrices do not support symbolic coefficients")
+        diagonal = coefficients[1:input_size + 1]
+        nonzero = np.flatnonzero(diagonal)
+        rows, cols, data = [nonzero], [nonzero], [diagonal[nonzero]]
+        start = input_size + 1
+        for i in range(input_size - 1):
+            stop = start + input_size - 1 - i
+            row = coefficients[start:stop]
+            nonzero = np.flatnonzero(row)
+            rows.append(np.full(len(nonzero), i))
+            cols.append(nonzero + i + 1)
+            data.append(row[nonzero])
+            start = stop
+        qubo = coo_matrix(
+            (np.concatenate(data).astype(np.float64), (np.concatenate(rows), np.concatenate(cols))),
+            shape=(input_size, input_size),
+        )
+        return qubo.tocsr(), coefficients[0].item()
+
+    @classmethod
+    def _compile_training_samples(
+        cls, fitness_function, input_size, executor, vectorized, batch_size, sparse, out,
+        checkpoint, checkpoint_interval, checkpoint_key, instrumentation,
+    ):
+        """
+        Evaluates the training samples and assembles the QUBO matrix, see generate_qubo_matrix.
+        """
+        outputs = None
+        if checkpoint is not None:
+            outputs = cls._checkpointed_training_output(
+                fitness_function, input_size, executor, vectorized, batch_size,
+                checkpoint, checkpoint_interval, checkpoint_key, instrumentation,
+            )
+
+        if out is not None or sparse:
+            # streamed, so neither a dense matrix nor all training outputs are held in memory
+            if outputs is not None:
+                output_chunks = (outputs[k:k + batch_size] for k in range(0, len(outputs), batch_size))
             else:
-                raise
-        return qubo, coefficients[0]
+                output_chunks = cls._iter_training_output(
+                    fitness_function, input_size, executor, vectorized, batch_size,
+                    instrumentation=instrumentation,
+                )
+            with cls._phase(instrumentation, "assembly"):
+                if out is not None:
+                    return cls._stream_qubo_matrix(output_chunks, input_size, out)
+                return cls._stream_sparse_qubo_matrix(output_chunks, input_size)
+        if outputs is not None:
+            with cls._phase(instrumentation, "assembly"):
+                coefficients = cls._coefficients_from_outputs(outputs, input_size)
+        else:
+            coefficients = cls._generate_qubo_coefficients(
+                fitness_function, input_size, executor, vectorized, batch_size, instrumentation
+            )
+        with cls._phase(instrumentation, "assembly"):
+            return cls._qubo_matrix(coefficients, input_size)
 
     @classmethod
     def generate_qubo_matrix(
@@ -140,6 +716,17 @@ class SamplingCompiler:
         input_size: int,
         use_multiprocessing: bool = True,
         searchspace: Optional["SearchSpace"] = None,
+        vectorized: bool = False,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        sparse: bool = False,
+        cache: Union[None, str, QuboCache] = None,
+        out: Optional[str] = None,
+        checkpoint: Optional[str] = None,
+        checkpoint_interval: float = 60.0,
+        integer_sampling: bool = False,
+        instrumentation: Optional[Instrumentation] = None,
+        executor: Union[None, str, Executor, FuturesExecutor] = None,
+        memo: Optional[EvaluationMemo] = None,
     ) -> Tuple[np.array, int]:
         """
         Generates a QUBO matrix for a given function.
@@ -151,116 +738,1516 @@ class SamplingCompiler:
             Flag to enable/disable multiprocessing for generating training output.
         :param searchspace: SearchSpace
             Optional parameter describing the arguments of the function.
+        :param vectorized: bool, optional
+            If True, the function is evaluated on 2-D arrays of shape (batch, input_size) and must return
+            a 1-D array of values. Together with a searchspace, each argument is passed as an array over the batch.
+        :param batch_size: int, optional
+            Number of samples per call of a vectorized function.
+        :param sparse: bool, optional
+            If True, Q is returned as an upper-triangular scipy.sparse CSR matrix and no dense matrix is built.
+            Requires scipy.
+        :param cache: QuboCache or str, optional
+            Cache (or cache directory) for compiled QUBOs. The key covers the function code, the data it closes
+            over or references, the searchspace, input_size, sparse, vectorized and integer_sampling. Hits are
+            returned memory-mapped read-only.
+        :param out: str, optional
+            Path of a .npy file. If given, the training outputs are streamed into a memory-mapped float64 QUBO
+            matrix one row of the upper triangle at a time, keeping only O(input_size) values in memory,
+            and the np.memmap is returned. Open it lazily later with np.load(out, mmap_mode="r").
+            Cache hits are copied to out.
+        :param checkpoint: str, optional
+            Checkpoint directory. The outputs of completed training samples are persisted there at least every
+            checkpoint_interval seconds; a later call with the same directory and function resumes from the last
+            persisted sample. Requires numeric function values.
+        :param checkpoint_interval: float, optional
+            Seconds between checkpoint writes.
+        :param integer_sampling: bool, optional
+            If True, the function is sampled at the level of the searchspace variables, see integer_qubo_matrix.
+            Requires a searchspace with affine types, cannot be combined with out or checkpoint.
+        :param instrumentation: Instrumentation, optional
+            Reports progress and collects evaluation counts and a timing breakdown, see Instrumentation.
+        :param executor: optional
+            Executor evaluating the function: "serial", "thread", "process" (shared persistent pools), an Executor
+            from autoqubo.executors or a concurrent.futures.Executor. Takes precedence over use_multiprocessing.
+        :param memo: EvaluationMemo, optional
+            Memo of function values shared between calls, e.g. with generate_qubo and test_qubo_matrix;
+            only samples without a stored value are evaluated. The function must be deterministic.
         :return: Q, c
             Q: QUBO matrix
             c: offset / constant term
         """
-        if searchspace is None:
-            return cls._qubo_matrix(
-                cls._generate_qubo_coefficients(
-                    fitness_function, input_size, use_multiprocessing
-                ),
-                input_size,
+        executor = cls._executor(use_multiprocessing, executor, memo)
+        if out is not None and sparse:
+            raise ValueError("out is only supported for dense QUBO matrices")
+        cache = QuboCache.from_argument(cache)
+        if cache is not None:
+            key = cache.key(
+                "generate_qubo_matrix", fitness_function, input_size, searchspace, sparse, vectorized, integer_sampling
             )
-        else:
-            return cls._qubo_matrix(
-                cls._generate_qubo_coefficients(
-                    searchspace.wrap_binary(fitness_function),
-                    input_size,
-                    use_multiprocessing,
-                ),
-                input_size,
+            hit = cache.get(key)
+            if hit is not None and out is not None:
+                qubo = np.lib.format.open_memmap(out, mode="w+", dtype=np.float64, shape=hit[0].shape)
+                qubo[:] = hit[0]
+                qubo.flush()
+                return qubo, hit[1]
+            if hit is not None:
+                return hit
+        if integer_sampling:
+            if searchspace is None or out is not None or checkpoint is not None:
+                raise ValueError("integer_sampling requires a searchspace and does not support out or checkpoint")
+            qubo, offset = cls.integer_qubo_matrix(
+                fitness_function, searchspace, executor, vectorized, batch_size,
+                instrumentation=instrumentation,
+            )
+            if sparse:
+                from scipy.sparse import csr_matrix
+
+                qubo = csr_matrix(qubo)
+            if cache is not None:
+                cache.put(key, qubo, offset)
+            return qubo, offset
+        checkpoint_key = None
+        if checkpoint is not None:
+            checkpoint_key = fingerprint(fitness_function, input_size, searchspace)
+        if searchspace is not None:
+            fitness_function = searchspace.wrap_binary(fitness_function, vectorized=vectorized)
+        if instrumentation is not None:
+            instrumentation.begin(cls._num_training_samples(input_size))
+        try:
+            qubo, offset = cls._compile_training_samples(
+                fitness_function, input_size, executor, vectorized, batch_size, sparse, out,
+                checkpoint, checkpoint_interval, checkpoint_key, instrumentation,
             )
+        finally:
+            if instrumentation is not None:
+                instrumentation.end()
+        if cache is not None:
+            cache.put(key, qubo, offset)
+        return qubo, offset
 
     @classmethod
-    def test_qubo_matrix(
+    def _expand_variable_polynomial(cls, outputs, W, p, q, has_second):
+        """
+        Recovers the quadratic polynomial in the variable values from the integer-level samples of
+        integer_qubo_matrix and expands it into a bit-level QUBO, W maps the bits to the variable values.
+        """
+        m = len(p)
+        outputs = outputs.astype(np.float64)
+        c0 = outputs[0]
+        at_p = outputs[1:m + 1] - c0
+        at_q = outputs[m + 1:m + 1 + len(q)] - c0
+
+        # g(t) = c0 + sum_i alpha_i t_i + sum_i,j B_ij t_i t_j, with t_i the value of component i minus its offset
+        beta = np.zeros(m)
+        beta[has_second] = (at_q / q - at_p[has_second] / p[has_second]) / (q - p[has_second])
+        alpha = at_p / p - beta * p
+        B = np.diag(beta)
+        num_pairs = m * (m - 1) // 2
+        if num_pairs:
+            i, j = cls._pair_indices(m, np.arange(num_pairs))
+            B[i, j] = (outputs[m + 1 + len(q):] - at_p[i] - at_p[j] - c0) / (p[i] * p[j]) / 2
+            B[j, i] = B[i, j]
+
+        # substitute t = W x, and x_k^2 = x_k
+        M = W.T @ B @ W
+        qubo = 2 * np.triu(M, 1) + np.diag(np.diag(M) + W.T @ alpha)
+        return qubo, c0.item()
+
+    @classmethod
+    def integer_qubo_matrix(
         cls,
         fitness_function: Callable,
-        qubo_matrix: np.array,
-        offset: float,
-        search_space: Optional["SearchSpace"] = None,
+        searchspace: "SearchSpace",
+        use_multiprocessing: bool = True,
+        vectorized: bool = False,
+        batch_size: int = DEFAULT_BATCH_SIZE,
         num_test_samples: int = -1,
         epsilon: float = 1e-8,
-    ) -> bool:
+        instrumentation: Optional[Instrumentation] = None,
+        executor: Union[None, str, Executor, FuturesExecutor] = None,
+        memo: Optional[EvaluationMemo] = None,
+    ) -> Tuple[np.array, float]:
         """
-        Performs a test to see whether the qubification process was successful.
-        The process is not successful if the function is not quadratic
+        Generates a QUBO matrix for a function that is quadratic in the decoded variables of an affine searchspace
+        (every type provides Type.affine). The function is sampled once with all variables at their zero-bit value,
+        at two values of every variable and at every pair of variables, i.e. O(m^2) evaluations for m (scalar)
+        variables instead of O(input_size^2). The polynomial in the variables is then expanded into the bit-level
+        QUBO using the bit weights of each encoding, and checked with verify_qubo_matrix; a warning is issued if the
+        function turns out not to be quadratic in the variables.
         :param fitness_function: Callable
-            Function to be compiled.
-        :param qubo_matrix: np.array
-            The QUBO being tested
-        :param offset: float
-            The constant term
-        :param search_space: Optional['SearchSpace']
-            Optional parameter describing the arguments of the function.
+            Function to be compiled, called with the decoded variables.
+        :param searchspace: SearchSpace
+            Description of the arguments of the function, all types must be affine.
+        :param use_multiprocessing: bool, optional
+            Flag to enable/disable multiprocessing for evaluating the function.
+        :param vectorized: bool, optional
+            If True, the function is evaluated with batched arguments, see generate_qubo_matrix.
+        :param batch_size: int, optional
+            Number of samples per call of a vectorized function.
         :param num_test_samples: int
-            number of test points to use to test the correctness of the QUBO.
-            If set to -1, will use n testing point
+            number of bit-level test samples, see verify_qubo_matrix
         :param epsilon: float
-            precision of comparison between function value and qubo value
-        :return: bool
-            True if the test succeeded (meaning function is quadratic, False if it failed(
+            precision of comparison between function value and qubo value in the verification
+        :param instrumentation: Instrumentation, optional
+            see generate_qubo_matrix
+        :param executor: optional
+            see generate_qubo_matrix
+        :param memo: EvaluationMemo, optional
+            see generate_qubo_matrix
+        :return: Q, c
+            Q: QUBO matrix
+            c: offset / constant term
         """
+        executor = cls._executor(use_multiprocessing, executor, memo)
+        input_size = searchspace.size
+        # scalar components (elements of vector types count separately): bit positions and weights
+        components = []
+        for (label, _, size), (start, weights, _) in zip(searchspace.desc, searchspace._plan):
+            if weights is None:
+                raise ValueError(f"Integer-level sampling requires affine types, variable {label} is not affine")
+            weights = np.asarray(weights).reshape(size, -1)
+            for column in weights.T:
+                nonzero = np.flatnonzero(column)
+                if len(nonzero):
+                    components.append((start + nonzero, column[nonzero].astype(np.float64)))
+        m = len(components)
+        W = np.zeros((m, input_size))
+        for c, (bits, weights) in enumerate(components):
+            W[c, bits] = weights
 
-        if search_space is None:
-            binary_func = fitness_function
-        else:
-            binary_func = search_space.wrap_binary(fitness_function)
+        # every sample point is reachable by setting one or two bits of a component:
+        # value p sets its first bit, value q a second bit as well (or alone, if p + w1 == 0)
+        first = np.array([bits[0] for bits, _ in components], dtype=np.int64)
+        p = np.array([weights[0] for _, weights in components])
+        if len(set(first.tolist())) < m:
+            raise ValueError("Integer-level sampling requires variables with disjoint bits")
+        has_second = np.array([len(bits) > 1 for bits, _ in components], dtype=bool)
+        second_bits, q = [], []
+        for bits, weights in (components[c] for c in np.flatnonzero(has_second)):
+            if weights[0] + weights[1] != 0:
+                second_bits.append(bits[:2])
+                q.append(weights[0] + weights[1])
+            else:
+                second_bits.append(bits[1:2])
+                q.append(weights[1])
+        q = np.array(q)
+        num_pairs = m * (m - 1) // 2
 
-        input_size = qubo_matrix.shape[0]
-        num_test_samples = input_size if num_test_samples < 0 else num_test_samples
-        test_samples = cls._get_test_samples(input_size, num_test_samples)
+        def batches():
+            batch = np.zeros((1 + m + len(second_bits), input_size), dtype=int)
+            batch[np.arange(1, m + 1), first] = 1
+            for row, bits in enumerate(second_bits):
+                batch[1 + m + row, bits] = 1
+            yield batch
+            for k in range(0, num_pairs, batch_size):
+                i, j = cls._pair_indices(m, np.arange(k, min(k + batch_size, num_pairs)))
+                batch = np.zeros((len(i), input_size), dtype=int)
+                batch[np.arange(len(i)), first[i]] = 1
+                batch[np.arange(len(i)), first[j]] = 1
+                yield batch
+
+        binary_func = searchspace.wrap_binary(fitness_function, vectorized=vectorized)
+        if instrumentation is not None:
+            instrumentation.begin(1 + m + len(second_bits) + num_pairs)
+        try:
+            outputs = cls._evaluate_samples(
+                binary_func, batches(), executor, vectorized, batch_size, instrumentation
+            )
+            with cls._phase(instrumentation, "assembly"):
+                qubo, offset = cls._expand_variable_polynomial(outputs, W, p, q, has_second)
+        finally:
+            if instrumentation is not None:
+                instrumentation.end()
+
+        report = cls.verify_qubo_matrix(
+            fitness_function, qubo, offset, searchspace, num_test_samples, epsilon, vectorized, batch_size,
+            executor, instrumentation=instrumentation,
+        )
+        if not report.passed:
+            msg = f"The function is not quadratic in the searchspace variables, the QUBO has a maximum error of {report.max_error}."
+            warnings.warn(msg, UserWarning)
+        return qubo, offset
+
+    @staticmethod
+    def _truth_table_batches(input_size, batch_size):
+        """
+        All 2^input_size inputs in batches, input k has x_i = bit i of k.
+        """
+        bits = np.arange(input_size)
+        for start in range(0, 1 << input_size, batch_size):
+            k = np.arange(start, min(start + batch_size, 1 << input_size), dtype=np.int64)
+            yield (k[:, None] >> bits) & 1
 
-        for sample in test_samples:
-            target = binary_func(sample)
-            actual = sample @ qubo_matrix @ sample + offset
-            if abs(actual - target) > epsilon:
-                return False
+    @staticmethod
+    def _mobius_transform(values):
+        """
+        In-place fast Moebius transform of a truth table, in O(n 2^n) operations: afterwards values[k] is the
+        coefficient of the monomial of the variables in the bitmask k of the multilinear polynomial.
+        """
+        input_size = len(values).bit_length() - 1
+        for i in range(input_size):
+            blocks = values.reshape(-1, 2, 1 << i)
+            blocks[:, 1] -= blocks[:, 0]
+        return values
 
-        return True
+    @staticmethod
+    def _monomial_degrees(input_size):
+        """
+        Number of variables of the monomial of every bitmask below 2^input_size.
+        """
+        degrees = np.zeros(1, dtype=np.uint8)
+        for _ in range(input_size):
+            degrees = np.concatenate([degrees, degrees + 1])
+        return degrees
 
     @classmethod
-    def generate_qubo(
+    def truth_table_qubo_matrix(
         cls,
-        cost: Callable,
-        constraints: Callable,
+        fitness_function: Callable,
         input_size: int,
-        penalty_method: Optional[Literal["sum", "pnform", "verma_lewis"]] = "sum",
-        penalty_weight: Optional[float] = None,
         use_multiprocessing: bool = False,
         searchspace: Optional["SearchSpace"] = None,
-    ) -> Tuple[np.array, int]:
+        vectorized: bool = False,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        sparse: bool = False,
+        epsilon: float = 1e-8,
+        max_terms: int = 100,
+        instrumentation: Optional[Instrumentation] = None,
+        executor: Union[None, str, Executor, FuturesExecutor] = None,
+        memo: Optional[EvaluationMemo] = None,
+    ) -> Tuple[np.array, float, TruthTableReport]:
         """
-        Generates a combined QUBO matrix for given cost and constraints.
-        :param cost: Callable
-            cost function
-        :param constraints: Callable
-            all problem constraints in one function
+        Generates a QUBO matrix from the complete truth table of the function, for small input sizes.
+        The function is evaluated on all 2^input_size inputs and the full pseudo-Boolean polynomial is recovered
+        with a fast Moebius transform, which gives an exact verdict whether the function is quadratic together with
+        its higher-order terms, instead of sampling and random verification.
+        :param fitness_function: Callable
+            Function to be compiled, with numeric values.
         :param input_size: int
-            number of binary variables in the function input.
-        :param penalty_method: Literal
-            optional choice of how to generate penalty weight
-        :param penalty_weight: int
-            optional custom penalty weights
+            number of binary variables in the function input, at most MAX_TRUTH_TABLE_SIZE.
         :param use_multiprocessing: bool, optional
-            Flag to enable/disable multiprocessing for generating training output.
+            Flag to enable/disable multiprocessing for evaluating the function.
         :param searchspace: SearchSpace
             Optional parameter describing the arguments of the function.
-        :return: Q, c
-            Q: QUBO matrixp cost
+        :param vectorized: bool, optional
+            If True, the function is evaluated on 2-D arrays of samples, see generate_qubo_matrix.
+        :param batch_size: int, optional
+            Number of inputs per batch.
+        :param sparse: bool, optional
+            If True, Q is returned as an upper-triangular scipy.sparse CSR matrix.
+        :param epsilon: float
+            coefficients of higher-order terms up to epsilon (in absolute value) are considered zero
+        :param max_terms: int
+            maximum number of higher-order terms listed in the report, the largest in absolute value
+        :param instrumentation: Instrumentation, optional
+            see generate_qubo_matrix
+        :param executor: optional
+            see generate_qubo_matrix
+        :param memo: EvaluationMemo, optional
+            see generate_qubo_matrix
+        :return: Q, c, report
+            Q: QUBO matrix of the linear and quadratic terms
             c: offset / constant term
+            report: TruthTableReport, quadratic is True if no higher-order term exceeds epsilon, degree is the degree
+                of the polynomial, higher_order_terms maps tuples of variable indices to their coefficients
         """
-        cost_qubo, cost_offset = cls.generate_qubo_matrix(
-            cost, input_size, use_multiprocessing, searchspace
+        executor = cls._executor(use_multiprocessing, executor, memo)
+        if input_size > MAX_TRUTH_TABLE_SIZE:
+            raise ValueError(f"Truth tables are limited to {MAX_TRUTH_TABLE_SIZE} variables, got {input_size}")
+        if searchspace is not None:
+            fitness_function = searchspace.wrap_binary(fitness_function, vectorized=vectorized)
+        evaluate = fitness_function if vectorized else _RowWise(fitness_function)
+
+        total = 1 << input_size
+        coefficients = np.empty(total, dtype=np.float64)
+        if instrumentation is not None:
+            instrumentation.begin(total)
+        try:
+            k = 0
+            batches = cls._truth_table_batches(input_size, batch_size)
+            for result in cls._map(evaluate, batches, executor, 1, instrumentation):
+                result = np.asarray(result, dtype=np.float64).reshape(-1)
+                coefficients[k:k + len(result)] = result
+                k += len(result)
+            with cls._phase(instrumentation, "assembly"):
+                cls._mobius_transform(coefficients)
+                degrees = cls._monomial_degrees(input_size)
+                higher = np.flatnonzero((degrees > 2) & (np.abs(coefficients) > epsilon))
+                largest = higher[np.argsort(-np.abs(coefficients[higher]), kind="stable")[:max_terms]]
+                terms = {
+                    tuple(int(i) for i in np.flatnonzero((mask >> np.arange(input_size)) & 1)): coefficients[mask].item()
+                    for mask in largest
+                }
+                nonzero = np.flatnonzero(np.abs(coefficients) > epsilon)
+                report = TruthTableReport(
+                    quadratic=len(higher) == 0,
+                    degree=int(degrees[nonzero].max()) if len(nonzero) else 0,
+                    num_higher_order_terms=len(higher),
+                    higher_order_terms=terms,
+                )
+
+                i, j = np.triu_indices(input_size, 1)
+                diagonal = np.arange(input_size)
+                qubo = np.zeros((input_size, input_size), dtype=np.float64)
+                qubo[diagonal, diagonal] = coefficients[1 << diagonal]
+                qubo[i, j] = coefficients[(1 << i) | (1 << j)]
+                if sparse:
+                    from scipy.sparse import csr_matrix
+
+                    qubo = csr_matrix(qubo)
+        finally:
+            if instrumentation is not None:
+                instrumentation.end()
+        return qubo, coefficients[0].item(), report
+
+    @classmethod
+    def generate_additive_qubo_matrix(
+        cls,
+        terms: Iterable[Tuple[Callable, Iterable[int]]],
+        input_size: int,
+        use_multiprocessing: bool = True,
+        vectorized: bool = False,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        sparse: bool = False,
+        instrumentation: Optional[Instrumentation] = None,
+        executor: Union[None, str, Executor, FuturesExecutor] = None,
+        memo: Optional[EvaluationMemo] = None,
+    ) -> Tuple[np.array, float]:
+        """
+        Generates a QUBO matrix for a sum of terms that each depend on a few variables only, e.g. the one-hot
+        constraints of a tsp or the clauses of a max-sat problem. Every term is compiled over its own k variables
+        with 1 + k + k(k-1)/2 samples, and the local QUBOs are added into the global QUBO. Terms with the same
+        function and number of variables are compiled only once, the terms are distributed over the executor.
+        :param terms: iterable of (term_function, variable_indices)
+            term_function is called with the values of the variables at variable_indices, in this order
+            (a list of k bits, or a (batch, k) array if vectorized); the indices must be distinct.
+        :param input_size: int
+            number of binary variables of the global QUBO.
+        :param use_multiprocessing: bool, optional
+            Flag to enable/disable multiprocessing for compiling the terms.
+        :param vectorized: bool, optional
+            If True, the term functions are evaluated on 2-D arrays of local samples, see generate_qubo_matrix.
+        :param batch_size: int, optional
+            Number of samples per call of a vectorized term function.
+        :param sparse: bool, optional
+            If True, Q is returned as an upper-triangular scipy.sparse CSR matrix and no dense matrix is built.
+        :param instrumentation: Instrumentation, optional
+            see generate_qubo_matrix, one call is one compiled term
+        :param executor: optional
+            see generate_qubo_matrix
+        :param memo: EvaluationMemo, optional
+            see generate_qubo_matrix; the values of a term function are keyed by its local samples, worker
+            processes evaluate with their own copy of the memo.
+        :return: Q, c
+            Q: QUBO matrix
+            c: offset / constant term
+        """
+        executor = cls._executor(use_multiprocessing, executor)
+        terms = [(function, np.asarray(indices, dtype=np.int64).reshape(-1)) for function, indices in terms]
+        for _, indices in terms:
+            if len(np.unique(indices)) < len(indices) or np.any((indices < 0) | (indices >= input_size)):
+                raise ValueError(f"Variable indices of a term must be distinct and below {input_size}, got {indices}")
+
+        # terms with the same function and number of variables share their local QUBO
+        positions, functions, local = {}, [], []
+        for function, indices in terms:
+            key = (memo_key(function), len(indices))
+            if key not in positions:
+                positions[key] = len(local)
+                local.append((len(functions), len(indices)))
+                functions.append(function)
+        chunksize = max(1, -(-len(local) // ((executor.workers or 1) * 4)))
+        if instrumentation is not None:
+            instrumentation.begin(sum(cls._num_training_samples(size) for _, size in local))
+        try:
+            coefficients = list(cls._map(
+                _LocalTerms(functions, vectorized, batch_size, memo), local, executor, chunksize, instrumentation
+            ))
+            with cls._phase(instrumentation, "assembly"):
+                offset = 0
+                rows, cols, data = [np.zeros(0, dtype=np.int64)], [np.zeros(0, dtype=np.int64)], [np.zeros(0)]
+                for function, indices in terms:
+                    size = len(indices)
+                    q, c = cls._qubo_matrix(coefficients[positions[(memo_key(function), size)]], size)
+                    offset += c
+                    i, j = np.triu_indices(size)
+                    rows.append(np.minimum(indices[i], indices[j]))
+                    cols.append(np.maximum(indices[i], indices[j]))
+                    data.append(q[i, j])
+                rows, cols, data = np.concatenate(rows), np.concatenate(cols), np.concatenate(data)
+                if sparse:
+                    from scipy.sparse import coo_matrix
+
+                    if data.dtype == object:
+                        raise TypeError("Sparse QUBO matrices do not support symbolic coefficients")
+                    qubo = coo_matrix((data, (rows, cols)), shape=(input_size, input_size)).tocsr()
+                    qubo.eliminate_zeros()
+                else:
+                    qubo = np.zeros((input_size, input_size), dtype=object if data.dtype == object else np.float64)
+                    np.add.at(qubo, (rows, cols), data)
+        finally:
+            if instrumentation is not None:
+                instrumentation.end()
+        return qubo, offset
+
+    @staticmethod
+    def _orbits(images, size):
+        """
+        Orbits of the group generated by maps of range(size) onto itself, each given as an array of images.
+        :return: np.ndarray
+            the smallest element of the orbit of every element
+        """
+        labels = np.arange(size)
+        while True:
+            new = labels.copy()
+            for image in images:
+                np.minimum.at(new, image, labels)
+                new = np.minimum(new, labels[image])
+            new = new[new]
+            if (new == labels).all():
+                return labels
+            labels = new
+
+    @classmethod
+    def symmetric_qubo_matrix(
+        cls,
+        fitness_function: Callable,
+        input_size: int,
+        generators: Iterable[Iterable[int]],
+        use_multiprocessing: bool = True,
+        searchspace: Optional["SearchSpace"] = None,
+        vectorized: bool = False,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        sparse: bool = False,
+        num_test_samples: int = 0,
+        epsilon: float = 1e-8,
+        instrumentation: Optional[Instrumentation] = None,
+        executor: Union[None, str, Executor, FuturesExecutor] = None,
+        memo: Optional[EvaluationMemo] = None,
+    ) -> Tuple[np.array, float, DiscoveryReport]:
+        """
+        Generates a QUBO matrix for a function that is invariant under permutations of its variables, e.g. swapping
+        two cities or two time steps of a tsp. Only one 1-hot sample per orbit of variables and one 2-hot sample per
+        orbit of pairs under the group generated by the given permutations is evaluated; all other coefficients
+        are filled in by symmetry.
+        :param fitness_function: Callable
+            Function to be compiled, f(x[p]) == f(x) for every generator p.
+        :param input_size: int
+            number of binary variables in the function input.
+        :param generators: iterable of permutations
+            Each a permutation of range(input_size), as a sequence of indices.
+        :param use_multiprocessing: bool, optional
+            Flag to enable/disable multiprocessing for evaluating the function.
+        :param searchspace: SearchSpace
+            Optional parameter describing the arguments of the function.
+        :param vectorized: bool, optional
+            If True, the function is evaluated on 2-D arrays of samples, see generate_qubo_matrix.
+        :param batch_size: int, optional
+            Number of samples per call of a vectorized function.
+        :param sparse: bool, optional
+            If True, Q is returned as an upper-triangular scipy.sparse CSR matrix.
+        :param num_test_samples: int
+            If non-zero, the QUBO is spot-checked with verify_qubo_matrix and a warning is issued if the function
+            is not quadratic or not symmetric; -1 uses input_size test samples.
+        :param epsilon: float
+            precision of comparison between function value and qubo value in the spot-check
+        :param instrumentation: Instrumentation, optional
+            see generate_qubo_matrix
+        :param executor: optional
+            see generate_qubo_matrix
+        :param memo: EvaluationMemo, optional
+            see generate_qubo_matrix
+        :return: Q, c, report
+            Q: QUBO matrix
+            c: offset / constant term
+            report: DiscoveryReport with the number of evaluations performed and saved
+        """
+        executor = cls._executor(use_multiprocessing, executor, memo)
+        generators = [np.asarray(g, dtype=np.int64).reshape(-1) for g in generators]
+        for g in generators:
+            if len(g) != input_size or not (np.sort(g) == np.arange(input_size)).all():
+                raise ValueError(f"Generators must be permutations of range({input_size})")
+        binary_func = fitness_function
+        if searchspace is not None:
+            binary_func = searchspace.wrap_binary(fitness_function, vectorized=vectorized)
+
+        # a generator maps the pair (i, j) to the pair (g[i], g[j]), pairs are numbered as in _indices_iterator
+        first, second = np.triu_indices(input_size, 1)
+        m = 2 * input_size - 1
+
+        def pair_number(i, j):
+            i, j = np.minimum(i, j), np.maximum(i, j)
+            return i * (m - i) // 2 + j - i - 1
+
+        variable_orbits = cls._orbits(generators, input_size)
+        pair_orbits = cls._orbits([pair_number(g[first], g[second]) for g in generators], len(first))
+        variables = np.unique(variable_orbits)
+        pairs = np.unique(pair_orbits)
+
+        def batches():
+            batch = np.zeros((1 + len(variables), input_size), dtype=int)
+            batch[np.arange(1, len(variables) + 1), variables] = 1
+            yield batch
+            for k in range(0, len(pairs), batch_size):
+                chunk = pairs[k:k + batch_size]
+                rows = np.arange(len(chunk))
+                batch = np.zeros((len(chunk), input_size), dtype=int)
+                batch[rows, first[chunk]] = 1
+                batch[rows, second[chunk]] = 1
+                yield batch
+
+        evaluations = 1 + len(variables) + len(pairs)
+        if instrumentation is not None:
+            instrumentation.begin(evaluations)
+        try:
+            outputs = cls._evaluate_samples(binary_func, batches(), executor, vectorized, batch_size, instrumentation)
+            with cls._phase(instrumentation, "assembly"):
+                outputs = outputs.astype(np.float64)
+                f0 = outputs[0]
+                linear = np.zeros(input_size)
+                linear[variables] = outputs[1:len(variables) + 1] - f0
+                linear = linear[variable_orbits]
+                at_pairs = np.zeros(len(first))
+                at_pairs[pairs] = outputs[len(variables) + 1:]
+                couplings = at_pairs[pair_orbits] - linear[first] - linear[second] - f0
+                diagonal = np.arange(input_size)
+                if sparse:
+                    from scipy.sparse import coo_matrix
+
+                    qubo = coo_matrix(
+                        (np.concatenate([linear, couplings]),
+                         (np.concatenate([diagonal, first]), np.concatenate([diagonal, second]))),
+                        shape=(input_size, input_size),
+                    ).tocsr()
+                    qubo.eliminate_zeros()
+                else:
+                    qubo = np.zeros((input_size, input_size))
+                    qubo[diagonal, diagonal] = linear
+                    qubo[first, second] = couplings
+        finally:
+            if instrumentation is not None:
+                instrumentation.end()
+
+        if num_test_samples:
+            report = cls.verify_qubo_matrix(
+                fitness_function, qubo, f0.item(), searchspace, num_test_samples, epsilon, vectorized, batch_size,
+                instrumentation=instrumentation, executor=executor,
+            )
+            if not report.passed:
+                msg = f"The function is not quadratic or not invariant under the generators, the QUBO has a maximum error of {report.max_error}."
+                warnings.warn(msg, UserWarning)
+        full_evaluations = cls._num_training_samples(input_size)
+        return qubo, f0.item(), DiscoveryReport(evaluations, full_evaluations, full_evaluations - evaluations)
+
+    @classmethod
+    def discover_qubo_matrix(
+        cls,
+        fitness_function: Callable,
+        input_size: int,
+        use_multiprocessing: bool = True,
+        searchspace: Optional["SearchSpace"] = None,
+        vectorized: bool = False,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        sparse: bool = False,
+        epsilon: float = 1e-12,
+        executor: Union[None, str, Executor, FuturesExecutor] = None,
+        memo: Optional[EvaluationMemo] = None,
+        num_test_samples: int = -1,
+        num_patterns: int = 1,
+    ) -> Tuple[np.array, float, DiscoveryReport]:
+        """
+        Generates a QUBO matrix by group testing instead of sampling every 2-hot sample.
+        Starting from a random base sample z, the variables of disjoint blocks A and B of consecutive variables are
+        flipped; for a quadratic function f(z ^ A ^ B) - f(z ^ A) - f(z ^ B) + f(z) is the sum of all couplings
+        between A and B, each with the random sign of its two flips. The two halves of every block of a bisection
+        are tested from num_patterns base samples, and pairs of blocks are bisected only while a sum is non-zero,
+        so individual pairs are sampled (with 2-hot samples) only where an interaction was detected.
+        Integer couplings cancel in all sums with a probability of about 2^-num_patterns; the result is checked with
+        verify_qubo_matrix and missed couplings are searched for in the difference between the function and the
+        QUBO with new base samples and shuffled variables. Once discovery has needed as many evaluations as
+        sampling, e.g. for a function that is not quadratic, the function is compiled with generate_qubo_matrix.
+        :param fitness_function: Callable
+            Function to be compiled.
+        :param input_size: int
+            number of binary variables in the function input.
+        :param use_multiprocessing: bool, optional
+            Flag to enable/disable multiprocessing for evaluating each round of group tests.
+        :param searchspace: SearchSpace
+            Optional parameter describing the arguments of the function.
+        :param vectorized: bool, optional
+            If True, the function is evaluated on 2-D arrays of samples, see generate_qubo_matrix.
+        :param batch_size: int, optional
+            Number of samples per call of a vectorized function.
+        :param sparse: bool, optional
+            If True, Q is returned as an upper-triangular scipy.sparse CSR matrix.
+        :param epsilon: float
+            group tests with an absolute value up to epsilon are considered free of interactions
+        :param executor: optional
+            see generate_qubo_matrix
+        :param memo: EvaluationMemo, optional
+            see generate_qubo_matrix
+        :param num_test_samples: int
+            number of test samples per check with verify_qubo_matrix, -1 for n; 0 disables the check, the search
+            for missed couplings and the fallback
+        :param num_patterns: int
+            number of random base samples every group test is evaluated from
+        :return: Q, c, report
+            Q: QUBO matrix
+            c: offset / constant term
+            report: DiscoveryReport with the number of samples evaluated (including test samples and a fallback)
+            and saved compared to generate_qubo_matrix
+        """
+        executor = cls._executor(use_multiprocessing, executor, memo)
+        if searchspace is not None:
+            fitness_function = searchspace.wrap_binary(fitness_function, vectorized=vectorized)
+        full_evaluations = cls._num_training_samples(input_size)
+        evaluations = 0
+
+        def key(*blocks):
+            # the flipped variables as sorted, disjoint ranges, adjacent ranges are merged
+            merged = []
+            for lo, hi in sorted(blocks):
+                if merged and merged[-1][1] == lo:
+                    merged[-1] = (merged[-1][0], hi)
+                else:
+                    merged.append((lo, hi))
+            return tuple(merged)
+
+        def evaluate(function, values, base, keys, order=None):
+            nonlocal evaluations
+            keys = [k for k in dict.fromkeys(keys) if k not in values]
+            if not keys:
+                return
+            samples = np.zeros((len(keys), input_size), dtype=int)
+            for row, blocks in enumerate(keys):
+                if base is not None:
+                    samples[row] = base
+                for lo, hi in blocks:
+                    samples[row, slice(lo, hi) if order is None else order[lo:hi]] ^= 1
+            evaluations += len(keys)
+            for k, value in zip(keys, cls._evaluate_samples(function, samples, executor, vectorized, batch_size)):
+                values[k] = value
+
+        def couplings_of(function, values, order=None):
+            """
+            couplings of function detected from num_patterns random base samples, with the blocks taken from the
+            variables in the given order; values holds the 0-hot to 2-hot values of function
+            """
+            bases = np.random.randint(2, size=(num_patterns, input_size))
+            tested = [{} for _ in range(num_patterns)]
+
+            def measure(tests):
+                for base, values_at_base in zip(bases, tested):
+                    evaluate(function, values_at_base, base, [
+                        k for a, b in tests for k in (key(), key(a), key(b), key(a, b))
+                    ], order)
+                return [
+                    np.array([t[key(a, b)] - t[key(a)] - t[key(b)] + t[key()] for t in tested], dtype=np.float64)
+                    for a, b in tests
+                ]
+
+            # a test is a pair of disjoint blocks (lo, hi), starting with the halves of every block of a bisection
+            tests, blocks = [], [(0, input_size)]
+            while blocks:
+                lo, hi = blocks.pop()
+                if hi - lo > 1:
+                    mid = (lo + hi) // 2
+                    tests.append(((lo, mid), (mid, hi)))
+                    blocks += [(lo, mid), (mid, hi)]
+            pending = list(zip(tests, measure(tests)))
+            found = []
+            while pending:
+                # the test of the first half of a split block is measured, the sums of the second half follow
+                splits = []
+                for (a, b), interactions in pending:
+                    if np.all(np.abs(interactions) <= epsilon):
+                        continue
+                    (a0, a1), (b0, b1) = a, b
+                    if a1 - a0 == 1 and b1 - b0 == 1:
+                        found.append((a0, b0) if order is None else tuple(sorted((order[a0], order[b0]))))
+                    elif a1 - a0 >= b1 - b0:
+                        mid = (a0 + a1) // 2
+                        splits.append((((a0, mid), b), ((mid, a1), b), interactions))
+                    else:
+                        mid = (b0 + b1) // 2
+                        splits.append(((a, (b0, mid)), (a, (mid, b1)), interactions))
+                pending = []
+                for (first, second, interactions), measured in zip(splits, measure([first for first, _, _ in splits])):
+                    pending += [(first, measured), (second, interactions - measured)]
+
+            # the couplings of the detected pairs are sampled as in generate_qubo_matrix
+            pairs = [(key((i, i + 1)), key((j, j + 1)), key((i, i + 1), (j, j + 1))) for i, j in found]
+            evaluate(function, values, None, [key()] + [k for pair in pairs for k in pair])
+            couplings = {}
+            for (i, j), (first, second, both) in zip(found, pairs):
+                coupling = values[both] - values[first] - values[second] + values[key()]
+                if abs(coupling) > epsilon:
+                    couplings[(i, j)] = coupling
+            return couplings
+
+        def assemble():
+            rows = np.array([i for i, _ in couplings], dtype=np.int64)
+            cols = np.array([j for _, j in couplings], dtype=np.int64)
+            data = np.array(list(couplings.values()), dtype=np.float64)
+            diagonal = np.arange(input_size)
+            if sparse:
+                from scipy.sparse import coo_matrix
+
+                nonzero = np.flatnonzero(linear)
+                qubo = coo_matrix(
+                    (np.concatenate([linear[nonzero], data]),
+                     (np.concatenate([nonzero, rows]), np.concatenate([nonzero, cols]))),
+                    shape=(input_size, input_size),
+                ).tocsr()
+            else:
+                qubo = np.zeros((input_size, input_size), dtype=np.float64)
+                qubo[diagonal, diagonal] = linear
+                qubo[rows, cols] = data
+            return qubo
+
+        values = {}
+        # 0-hot and 1-hot samples are always needed
+        evaluate(fitness_function, values, None, [key()] + [key((i, i + 1)) for i in range(input_size)])
+        f0 = float(values[key()])
+        linear = np.array([values[key((i, i + 1))] - f0 for i in range(input_size)], dtype=np.float64)
+        couplings = couplings_of(fitness_function, values) if input_size > 1 else {}
+        qubo = assemble()
+
+        while num_test_samples and input_size > 1:
+            check = cls.verify_qubo_matrix(
+                fitness_function, qubo, f0, None, num_test_samples, vectorized=vectorized, batch_size=batch_size,
+                executor=executor,
+            )
+            evaluations += check.num_samples
+            if check.passed:
+                break
+            if evaluations >= full_evaluations:
+                msg = f"Group testing missed couplings or the function is not quadratic (maximum error {check.max_error}), falling back to generate_qubo_matrix."
+                warnings.warn(msg, UserWarning)
+                qubo, f0 = cls.generate_qubo_matrix(
+                    fitness_function, input_size, vectorized=vectorized, batch_size=batch_size, sparse=sparse,
+                    executor=executor,
+                )
+                evaluations += full_evaluations
+                break
+            # couplings that always share their group tests cancel together, so the variables are shuffled
+            missed = couplings_of(
+                _Residual(fitness_function, qubo, f0, vectorized), {}, np.random.permutation(input_size)
+            )
+            for pair, coupling in missed.items():
+                couplings[pair] = couplings.get(pair, 0.0) + coupling
+            qubo = assemble()
+        report = DiscoveryReport(evaluations, full_evaluations, full_evaluations - evaluations)
+        return qubo, f0, report
+
+    @classmethod
+    def changed_variables(
+        cls,
+        fitness_function: Callable,
+        qubo_matrix: np.array,
+        offset: float,
+        use_multiprocessing: bool = True,
+        searchspace: Optional["SearchSpace"] = None,
+        vectorized: bool = False,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        epsilon: float = 1e-8,
+        executor: Union[None, str, Executor, FuturesExecutor] = None,
+        memo: Optional[EvaluationMemo] = None,
+    ) -> np.ndarray:
+        """
+        Checks an existing QUBO against a (possibly modified) function and returns the variables whose linear or
+        coupling coefficients changed. The difference between the function and the QUBO energy is compiled with
+        discover_qubo_matrix, so unchanged regions cost only a few group tests; if the result fails a check with
+        verify_qubo_matrix, the difference is compiled completely.
+        :param fitness_function: Callable
+            The current version of the function.
+        :param qubo_matrix: np.array
+            QUBO compiled from an earlier version of the function, dense or scipy.sparse
+        :param offset: float
+            The constant term of the earlier QUBO
+        :param use_multiprocessing: bool, optional
+            Flag to enable/disable multiprocessing for evaluating the function.
+        :param searchspace: SearchSpace
+            Optional parameter describing the arguments of the function.
+        :param vectorized: bool, optional
+            If True, the function is evaluated on 2-D arrays of samples, see generate_qubo_matrix.
+        :param batch_size: int, optional
+            Number of samples per call of a vectorized function.
+        :param epsilon: float
+            coefficients differing by at most epsilon are considered unchanged
+        :param executor: optional
+            see generate_qubo_matrix
+        :param memo: EvaluationMemo, optional
+            see generate_qubo_matrix
+        :return: np.ndarray
+            sorted indices of the changed variables
+        """
+        executor = cls._executor(use_multiprocessing, executor, memo)
+        if searchspace is not None:
+            fitness_function = searchspace.wrap_binary(fitness_function, vectorized=vectorized)
+        residual = _Residual(fitness_function, qubo_matrix, offset, vectorized)
+        input_size = qubo_matrix.shape[0]
+        delta, delta_offset, _ = cls.discover_qubo_matrix(
+            residual, input_size, executor, None, vectorized, batch_size, True, epsilon, num_test_samples=0
+        )
+        # changes that cancel within a group test leave no trace in delta, spot-check it on random inputs
+        report = cls.verify_qubo_matrix(
+            residual, delta, delta_offset, None, -1, epsilon, vectorized, batch_size, executor=executor
         )
-        constraint_qubo, constraint_offset = cls.generate_qubo_matrix(
-            constraints, input_size, use_multiprocessing, searchspace
+        if not report.passed:
+            delta, _ = cls.generate_qubo_matrix(
+                residual, input_size, vectorized=vectorized, batch_size=batch_size, sparse=True, executor=executor
+            )
+        delta = delta.tocoo()
+        changed = np.abs(delta.data) > epsilon
+        return np.union1d(delta.row[changed], delta.col[changed])
+
+    @classmethod
+    def update_qubo_matrix(
+        cls,
+        fitness_function: Callable,
+        qubo_matrix: np.array,
+        offset: float,
+        changed: Optional[Iterable[int]] = None,
+        use_multiprocessing: bool = True,
+        searchspace: Optional["SearchSpace"] = None,
+        vectorized: bool = False,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        executor: Union[None, str, Executor, FuturesExecutor] = None,
+        memo: Optional[EvaluationMemo] = None,
+    ) -> Tuple[np.array, float]:
+        """
+        Incrementally recompiles a QUBO after the behaviour of some variables changed. Only the 1-hot and 2-hot
+        samples that touch a changed variable and the 0-hot sample for the offset are evaluated; all other
+        coefficients are kept.
+        Dense matrices are patched in place (read-only matrices, e.g. cache hits, are copied first), sparse
+        matrices are rebuilt.
+        :param fitness_function: Callable
+            The current version of the function.
+        :param qubo_matrix: np.array
+            QUBO compiled from an earlier version of the function, dense or scipy.sparse
+        :param offset: float
+            The constant term of the earlier QUBO
+        :param changed: iterable of int, optional
+            Indices of the input variables whose behaviour may have changed. If None, they are determined with
+            changed_variables.
+        :param use_multiprocessing: bool, optional
+            Flag to enable/disable multiprocessing for evaluating the function.
+        :param searchspace: SearchSpace
+            Optional parameter describing the arguments of the function.
+        :param vectorized: bool, optional
+            If True, the function is evaluated on 2-D arrays of samples, see generate_qubo_matrix.
+        :param batch_size: int, optional
+            Number of samples per call of a vectorized function.
+        :param executor: optional
+            see generate_qubo_matrix
+        :param memo: EvaluationMemo, optional
+            see generate_qubo_matrix
+        :return: Q, c
+            Q: updated QUBO matrix
+            c: offset / constant term
+        """
+        executor = cls._executor(use_multiprocessing, executor, memo)
+        if changed is None:
+            changed = cls.changed_variables(
+                fitness_function, qubo_matrix, offset, executor, searchspace, vectorized, batch_size
+            )
+        if searchspace is not None:
+            fitness_function = searchspace.wrap_binary(fitness_function, vectorized=vectorized)
+        input_size = qubo_matrix.shape[0]
+        changed = np.unique(np.asarray(list(changed), dtype=np.int64))
+        if len(changed) == 0:
+            f0 = cls._evaluate_samples(
+                fitness_function, np.zeros((1, input_size), dtype=int), executor, vectorized, batch_size
+            )
+            return qubo_matrix, float(f0[0])
+        is_changed = np.zeros(input_size, dtype=bool)
+        is_changed[changed] = True
+
+        # every pair touching a changed variable, pairs of two changed variables once
+        first, second = [], []
+        for i in changed:
+            others = np.flatnonzero(~is_changed | (np.arange(input_size) > i))
+            others = others[others != i]
+            first.append(np.full(len(others), i))
+            second.append(others)
+        first, second = np.concatenate(first), np.concatenate(second)
+
+        def batches():
+            batch = np.zeros((len(changed) + 1, input_size), dtype=int)
+            batch[np.arange(1, len(changed) + 1), changed] = 1
+            yield batch
+            for k in range(0, len(first), batch_size):
+                rows = np.arange(min(batch_size, len(first) - k))
+                batch = np.zeros((len(rows), input_size), dtype=int)
+                batch[rows, first[k:k + batch_size]] = 1
+                batch[rows, second[k:k + batch_size]] = 1
+                yield batch
+
+        outputs = cls._evaluate_samples(fitness_function, batches(), executor, vectorized, batch_size)
+        offset = float(outputs[0])
+        linear = np.array(qubo_matrix.diagonal(), dtype=np.float64)
+        linear[changed] = outputs[1:len(changed) + 1] - offset
+        couplings = outputs[len(changed) + 1:] - linear[first] - linear[second] - offset
+        rows, cols = np.minimum(first, second), np.maximum(first, second)
+
+        if issparse(qubo_matrix):
+            from scipy.sparse import coo_matrix
+
+            old = qubo_matrix.tocoo()
+            keep = ~(is_changed[old.row] | is_changed[old.col])
+            qubo_matrix = coo_matrix(
+                (
+                    np.concatenate([old.data[keep], linear[changed], couplings]),
+                    (np.concatenate([old.row[keep], changed, rows]), np.concatenate([old.col[keep], changed, cols])),
+                ),
+                shape=qubo_matrix.shape,
+            ).tocsr()
+            qubo_matrix.eliminate_zeros()
+        else:
+            if not qubo_matrix.flags.writeable:
+                qubo_matrix = np.array(qubo_matrix)
+            qubo_matrix[changed, changed] = linear[changed]
+            qubo_matrix[rows, cols] = couplings
+        return qubo_matrix, offset
+
+    @classmethod
+    def _draw_test_samples(cls, input_size, num_test_samples, confidence, max_failure_rate):
+        """
+        Packed test samples for verify_qubo_matrix, resolving num_test_samples=-1.
+        """
+        if num_test_samples < 0:
+            if max_failure_rate is not None:
+                num_test_samples = cls.required_test_samples(max_failure_rate, confidence)
+            else:
+                num_test_samples = input_size
+        return cls._packed_test_samples(input_size, num_test_samples)
+
+    @staticmethod
+    def _test_batches(packed, qubo_matrix, offset, batch_size, energies):
+        """
+        Unpacks the test samples batch by batch, appending their QUBO energies to the list energies.
+        """
+        input_size = qubo_matrix.shape[0]
+        for k in range(0, len(packed), batch_size):
+            batch = np.unpackbits(packed[k:k + batch_size], axis=1, count=input_size).astype(int)
+            energies.append(Utils.energies(qubo_matrix, batch, offset))
+            yield batch
+
+    @classmethod
+    def _verification_report(cls, packed, input_size, energies, targets, epsilon, confidence):
+        errors = np.abs(energies - targets)
+        failing = errors > epsilon
+        return VerificationReport(
+            passed=not failing.any(),
+            num_samples=len(packed),
+            max_error=float(errors.max()) if len(errors) else 0.0,
+            failing_samples=np.unpackbits(packed[failing], axis=1, count=input_size).astype(int),
+            failure_rate_bound=cls._failure_rate_bound(int(failing.sum()), len(packed), confidence),
+        )
+
+    @classmethod
+    def verify_qubo_matrix(
+        cls,
+        fitness_function: Callable,
+        qubo_matrix: np.array,
+        offset: float,
+        search_space: Optional["SearchSpace"] = None,
+        num_test_samples: int = -1,
+        epsilon: float = 1e-8,
+        vectorized: bool = False,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        use_multiprocessing: bool = False,
+        confidence: float = 0.95,
+        max_failure_rate: Optional[float] = None,
+        instrumentation: Optional[Instrumentation] = None,
+        executor: Union[None, str, Executor, FuturesExecutor] = None,
+        memo: Optional[EvaluationMemo] = None,
+    ) -> VerificationReport:
+        """
+        Compares the function with the QUBO energy on random inputs that are not part of the training set.
+        Test samples are drawn in bulk as a packed bit matrix and all QUBO energies are computed in batches.
+        :param fitness_function: Callable
+            Function that was compiled.
+        :param qubo_matrix: np.array
+            The QUBO being tested, dense or scipy.sparse
+        :param offset: float
+            The constant term
+        :param search_space: Optional['SearchSpace']
+            Optional parameter describing the arguments of the function.
+        :param num_test_samples: int
+            number of test points to use to test the correctness of the QUBO.
+            If set to -1, will use n testing point, unless max_failure_rate is given
+        :param epsilon: float
+            precision of comparison between function value and qubo value
+        :param vectorized: bool, optional
+            If True, the function is evaluated on 2-D arrays of test samples, see generate_qubo_matrix.
+        :param batch_size: int, optional
+            Number of test samples per batch.
+        :param use_multiprocessing: bool, optional
+            Flag to enable/disable multiprocessing for evaluating the function.
+        :param confidence: float
+            confidence level of the reported failure rate bound
+        :param max_failure_rate: float, optional
+            If given and num_test_samples is -1, enough samples are drawn to bound the failure rate by this value
+            when no sample fails, see required_test_samples.
+        :param instrumentation: Instrumentation, optional
+            see generate_qubo_matrix; the QUBO energies of the test samples count as sample generation
+        :param executor: optional
+            see generate_qubo_matrix
+        :param memo: EvaluationMemo, optional
+            see generate_qubo_matrix
+        :return: VerificationReport
+            passed, num_samples, max_error, failing_samples (2-D array) and failure_rate_bound
+        """
+        executor = cls._executor(use_multiprocessing, executor, memo)
+        if search_space is None:
+            binary_func = fitness_function
+        else:
+            binary_func = search_space.wrap_binary(fitness_function, vectorized=vectorized)
+
+        packed = cls._draw_test_samples(qubo_matrix.shape[0], num_test_samples, confidence, max_failure_rate)
+        energies = [np.zeros(0)]
+        if instrumentation is not None:
+            instrumentation.begin(len(packed))
+        try:
+            targets = cls._evaluate_samples(
+                binary_func, cls._test_batches(packed, qubo_matrix, offset, batch_size, energies),
+                executor, vectorized, batch_size, instrumentation,
+            )
+        finally:
+            if instrumentation is not None:
+                instrumentation.end()
+        return cls._verification_report(
+            packed, qubo_matrix.shape[0], np.concatenate(energies), targets, epsilon, confidence
         )
+
+    @classmethod
+    def test_qubo_matrix(
+        cls,
+        fitness_function: Callable,
+        qubo_matrix: np.array,
+        offset: float,
+        search_space: Optional["SearchSpace"] = None,
+        num_test_samples: int = -1,
+        epsilon: float = 1e-8,
+        vectorized: bool = False,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        instrumentation: Optional[Instrumentation] = None,
+        executor: Union[None, str, Executor, FuturesExecutor] = None,
+        memo: Optional[EvaluationMemo] = None,
+    ) -> bool:
+        """
+        Performs a test to see whether the qubification process was successful.
+        The process is not successful if the function is not quadratic
+        :param fitness_function: Callable
+            Function to be compiled.
+        :param qubo_matrix: np.array
+            The QUBO being tested, dense or scipy.sparse
+        :param offset: float
+            The constant term
+        :param search_space: Optional['SearchSpace']
+            Optional parameter describing the arguments of the function.
+        :param num_test_samples: int
+            number of test points to use to test the correctness of the QUBO.
+            If set to -1, will use n testing point
+        :param epsilon: float
+            precision of comparison between function value and qubo value
+        :param vectorized: bool, optional
+            If True, the function is evaluated on 2-D arrays of test samples, see generate_qubo_matrix.
+        :param batch_size: int, optional
+            Number of samples per call of a vectorized function.
+        :param instrumentation: Instrumentation, optional
+            see generate_qubo_matrix
+        :param executor: optional
+            see generate_qubo_matrix
+        :param memo: EvaluationMemo, optional
+            see generate_qubo_matrix
+        :return: bool
+            True if the test succeeded (meaning function is quadratic, False if it failed(
+        """
+        return cls.verify_qubo_matrix(
+            fitness_function, qubo_matrix, offset, search_space, num_test_samples, epsilon, vectorized, batch_size,
+            instrumentation=instrumentation, executor=executor, memo=memo,
+        ).passed
+
+    @staticmethod
+    def _combine(cost_qubo, cost_offset, constraint_qubo, constraint_offset, penalty_method, penalty_weight):
         # only generate penalty weight if none is given
         if not penalty_weight:
             penalty_weight = generate_penalty(
                 penalty_method, cost_qubo, constraint_qubo
             )
-        Q = cost_qubo + penalty_weight * constraint_qubo
-        offset = cost_offset + constraint_offset
+        return cost_qubo + penalty_weight * constraint_qubo, cost_offset + constraint_offset
+
+    @classmethod
+    def generate_qubo(
+        cls,
+        cost: Callable,
+        constraints: Callable,
+        input_size: int,
+        penalty_method: Optional[Literal["sum", "pnform", "verma_lewis"]] = "sum",
+        penalty_weight: Optional[float] = None,
+        use_multiprocessing: bool = False,
+        searchspace: Optional["SearchSpace"] = None,
+        vectorized: bool = False,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        sparse: bool = False,
+        cache: Union[None, str, QuboCache] = None,
+        instrumentation: Optional[Instrumentation] = None,
+        executor: Union[None, str, Executor, FuturesExecutor] = None,
+        memo: Optional[EvaluationMemo] = None,
+    ) -> Tuple[np.array, int]:
+        """
+        Generates a combined QUBO matrix for given cost and constraints.
+        :param cost: Callable
+            cost function
+        :param constraints: Callable
+            all problem constraints in one function
+        :param input_size: int
+            number of binary variables in the function input.
+        :param penalty_method: Literal
+            optional choice of how to generate penalty weight
+        :param penalty_weight: int
+            optional custom penalty weights
+        :param use_multiprocessing: bool, optional
+            Flag to enable/disable multiprocessing for generating training output.
+        :param searchspace: SearchSpace
+            Optional parameter describing the arguments of the function.
+        :param vectorized: bool, optional
+            If True, cost and constraints are evaluated on 2-D arrays of samples, see generate_qubo_matrix.
+        :param batch_size: int, optional
+            Number of samples per call of a vectorized function.
+        :param sparse: bool, optional
+            If True, Q is returned as an upper-triangular scipy.sparse CSR matrix. Requires scipy.
+        :param cache: QuboCache or str, optional
+            Cache (or cache directory) for compiled QUBOs, see generate_qubo_matrix. The combined QUBO is keyed
+            additionally by the penalty method and weight.
+        :param instrumentation: Instrumentation, optional
+            see generate_qubo_matrix, covers both compilations and the penalty weight (as assembly)
+        :param executor: optional
+            see generate_qubo_matrix
+        :param memo: EvaluationMemo, optional
+            see generate_qubo_matrix
+        :return: Q, c
+            Q: QUBO matrixp cost
+            c: offset / constant term
+        """
+        executor = cls._executor(use_multiprocessing, executor, memo)
+        cache = QuboCache.from_argument(cache)
+        if cache is not None:
+            key = cache.key(
+                "generate_qubo", cost, constraints, input_size, penalty_method, penalty_weight, searchspace, sparse,
+                vectorized,
+            )
+            hit = cache.get(key)
+            if hit is not None:
+                return hit
+        if instrumentation is not None:
+            instrumentation.begin(0)
+        try:
+            cost_qubo, cost_offset = cls.generate_qubo_matrix(
+                cost, input_size, executor, searchspace, vectorized, batch_size, sparse, cache,
+                instrumentation=instrumentation,
+            )
+            constraint_qubo, constraint_offset = cls.generate_qubo_matrix(
+                constraints, input_size, executor, searchspace, vectorized, batch_size, sparse, cache,
+                instrumentation=instrumentation,
+            )
+            with cls._phase(instrumentation, "assembly"):
+                Q, offset = cls._combine(
+                    cost_qubo, cost_offset, constraint_qubo, constraint_offset, penalty_method, penalty_weight
+                )
+        finally:
+            if instrumentation is not None:
+                instrumentation.end()
+        if cache is not None:
+            cache.put(key, Q, offset)
+        return Q, offset
+
+    @staticmethod
+    async def _call_async(function, item, retries, retry_delay, timeout):
+        """
+        Calls function on item and awaits the result if it is awaitable. Failed calls (including timeouts) are
+        retried with exponential backoff, cancellation is never retried.
+        """
+        for attempt in range(retries + 1):
+            try:
+                value = function(item)
+                if inspect.isawaitable(value):
+                    value = await asyncio.wait_for(value, timeout)
+                return value
+            except asyncio.CancelledError:
+                # a subclass of Exception before Python 3.8
+                raise
+            except Exception:
+                if attempt == retries:
+                    raise
+                await asyncio.sleep(retry_delay * 2 ** attempt)
+
+    @staticmethod
+    async def _evaluate_async(function, items, concurrency, retries=0, retry_delay=0.1, timeout=None):
+        """
+        Evaluates a (coroutine) function on the items with at most concurrency calls in flight.
+        The items are generated lazily. If a call fails after its retries, or the evaluation is cancelled,
+        all calls in flight are cancelled before the exception propagates.
+
+        :return: list
+            The function values in the order of the items.
+        """
+        if concurrency < 1:
+            raise ValueError("concurrency must be at least 1")
+        items = enumerate(items)
+        results = {}
+
+        async def worker():
+            for k, item in items:
+                results[k] = await SamplingCompiler._call_async(function, item, retries, retry_delay, timeout)
+
+        workers = [asyncio.ensure_future(worker()) for _ in range(concurrency)]
+        try:
+            await asyncio.gather(*workers)
+        finally:
+            for w in workers:
+                w.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+        return [results[k] for k in range(len(results))]
+
+    @staticmethod
+    def _asynchronous(fitness_function, executor=None):
+        """
+        Returns a coroutine function unchanged, and runs any other function on executor (the default executor of
+        the event loop if None), so that the async entry points never call it on the event loop.
+        """
+        if inspect.iscoroutinefunction(fitness_function) or inspect.iscoroutinefunction(
+            getattr(fitness_function, "__call__", None)
+        ):
+            return fitness_function
+        return _InExecutor(fitness_function, executor)
+
+    @classmethod
+    async def _evaluate_samples_async(
+        cls, fitness_function, samples, vectorized, memo=None, instrumentation=None, **options
+    ):
+        """
+        Async counterpart of _evaluate_samples, samples is an iterable of 2-D arrays (vectorized) or of samples.
+        """
+        if instrumentation is not None:
+            fitness_function = _AsyncTimed(fitness_function, instrumentation)
+            samples = instrumentation.samples(samples)
+        if memo is not None:
+            fitness_function = memo.wrap_async(
+                fitness_function, vectorized, None if instrumentation is None else instrumentation.advance
+            )
+        outputs = await cls._evaluate_async(fitness_function, samples, **options)
+        if not vectorized:
+            return cls._as_numeric(outputs)
+        if not outputs:
+            return np.zeros(0)
+        return np.concatenate([np.asarray(o).reshape(-1) for o in outputs])
+
+    @classmethod
+    async def generate_qubo_matrix_async(
+        cls,
+        fitness_function: Callable,
+        input_size: int,
+        searchspace: Optional["SearchSpace"] = None,
+        vectorized: bool = False,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        sparse: bool = False,
+        cache: Union[None, str, QuboCache] = None,
+        concurrency: int = 100,
+        retries: int = 0,
+        retry_delay: float = 0.1,
+        timeout: Optional[float] = None,
+        memo: Optional[EvaluationMemo] = None,
+        executor: Optional[FuturesExecutor] = None,
+        instrumentation: Optional[Instrumentation] = None,
+    ) -> Tuple[np.array, int]:
+        """
+        Async variant of generate_qubo_matrix for I/O-bound fitness functions, e.g. remote simulators.
+        The function may be a coroutine function (or return awaitables); up to concurrency samples (or batches,
+        if vectorized) are evaluated concurrently in the running event loop. A plain function is called on executor
+        instead, so it does not block the event loop. Cancelling the call cancels all evaluations in flight.
+        :param fitness_function: Callable
+            Function to be compiled, a coroutine function or a plain function.
+        :param input_size: int
+            number of binary variables in the function input.
+        :param searchspace: SearchSpace
+            Optional parameter describing the arguments of the function.
+        :param vectorized: bool, optional
+            see generate_qubo_matrix
+        :param batch_size: int, optional
+            Number of samples per call of a vectorized function.
+        :param sparse: bool, optional
+            see generate_qubo_matrix
+        :param cache: QuboCache or str, optional
+            see generate_qubo_matrix
+        :param concurrency: int, optional
+            Maximum number of evaluations in flight.
+        :param retries: int, optional
+            Number of times a failed evaluation is retried before the compilation fails.
+        :param retry_delay: float, optional
+            Seconds before the first retry, doubled for every further retry.
+        :param timeout: float, optional
+            Seconds after which an evaluation is cancelled and counts as failed.
+        :param memo: EvaluationMemo, optional
+            see generate_qubo_matrix; only samples without a stored value are sent to the function.
+        :param executor: concurrent.futures.Executor, optional
+            Executor running a plain (not coroutine) function, by default the default executor of the event loop.
+            A ProcessPoolExecutor requires a picklable function.
+        :param instrumentation: Instrumentation, optional
+            see generate_qubo_matrix; evaluation is the summed time of the calls in flight.
+        :return: Q, c
+            Q: QUBO matrix
+            c: offset / constant term
+        """
+        cache = QuboCache.from_argument(cache)
+        if cache is not None:
+            key = cache.key(
+                "generate_qubo_matrix", fitness_function, input_size, searchspace, sparse, vectorized, False
+            )
+            hit = cache.get(key)
+            if hit is not None:
+                return hit
+        fitness_function = cls._asynchronous(fitness_function, executor)
+        if searchspace is not None:
+            fitness_function = searchspace.wrap_binary(fitness_function, vectorized=vectorized)
+        if vectorized:
+            samples = cls._get_training_batches(input_size, batch_size)
+        else:
+            samples = cls._get_training_samples(input_size)
+        if instrumentation is not None:
+            instrumentation.begin(cls._num_training_samples(input_size))
+        try:
+            outputs = await cls._evaluate_samples_async(
+                fitness_function, samples, vectorized, memo, instrumentation,
+                concurrency=concurrency, retries=retries, retry_delay=retry_delay, timeout=timeout,
+            )
+            with cls._phase(instrumentation, "assembly"):
+                coefficients = cls._coefficients_from_outputs(outputs, input_size)
+                qubo_matrix = cls._sparse_qubo_matrix if sparse else cls._qubo_matrix
+                qubo, offset = qubo_matrix(coefficients, input_size)
+        finally:
+            if instrumentation is not None:
+                instrumentation.end()
+        if cache is not None:
+            cache.put(key, qubo, offset)
+        return qubo, offset
+
+    @classmethod
+    async def verify_qubo_matrix_async(
+        cls,
+        fitness_function: Callable,
+        qubo_matrix: np.array,
+        offset: float,
+        search_space: Optional["SearchSpace"] = None,
+        num_test_samples: int = -1,
+        epsilon: float = 1e-8,
+        vectorized: bool = False,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        confidence: float = 0.95,
+        max_failure_rate: Optional[float] = None,
+        concurrency: int = 100,
+        retries: int = 0,
+        retry_delay: float = 0.1,
+        timeout: Optional[float] = None,
+        memo: Optional[EvaluationMemo] = None,
+        executor: Optional[FuturesExecutor] = None,
+        instrumentation: Optional[Instrumentation] = None,
+    ) -> VerificationReport:
+        """
+        Async variant of verify_qubo_matrix, see generate_qubo_matrix_async for concurrency, retries,
+        retry_delay, timeout, memo, executor and instrumentation.
+        """
+        fitness_function = cls._asynchronous(fitness_function, executor)
+        if search_space is not None:
+            fitness_function = search_space.wrap_binary(fitness_function, vectorized=vectorized)
+        packed = cls._draw_test_samples(qubo_matrix.shape[0], num_test_samples, confidence, max_failure_rate)
+        energies = [np.zeros(0)]
+        batches = cls._test_batches(packed, qubo_matrix, offset, batch_size, energies)
+        if not vectorized:
+            batches = (row for batch in batches for row in batch.tolist())
+        if instrumentation is not None:
+            instrumentation.begin(len(packed))
+        try:
+            targets = await cls._evaluate_samples_async(
+                fitness_function, batches, vectorized, memo, instrumentation,
+                concurrency=concurrency, retries=retries, retry_delay=retry_delay, timeout=timeout,
+            )
+        finally:
+            if instrumentation is not None:
+                instrumentation.end()
+        return cls._verification_report(
+            packed, qubo_matrix.shape[0], np.concatenate(energies), targets, epsilon, confidence
+        )
+
+    @classmethod
+    async def test_qubo_matrix_async(
+        cls,
+        fitness_function: Callable,
+        qubo_matrix: np.array,
+        offset: float,
+        search_space: Optional["SearchSpace"] = None,
+        num_test_samples: int = -1,
+        epsilon: float = 1e-8,
+        vectorized: bool = False,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        **options,
+    ) -> bool:
+        """
+        Async variant of test_qubo_matrix, options (concurrency, retries, retry_delay, timeout, memo, executor,
+        instrumentation) are passed to verify_qubo_matrix_async.
+        :return: bool
+            True if the function agrees with the QUBO on all test samples
+        """
+        report = await cls.verify_qubo_matrix_async(
+            fitness_function, qubo_matrix, offset, search_space, num_test_samples, epsilon, vectorized, batch_size,
+            **options,
+        )
+        return report.passed
+
+    @classmethod
+    async def generate_qubo_async(
+        cls,
+        cost: Callable,
+        constraints: Callable,
+        input_size: int,
+        penalty_method: Optional[Literal["sum", "pnform", "verma_lewis"]] = "sum",
+        penalty_weight: Optional[float] = None,
+        searchspace: Optional["SearchSpace"] = None,
+        vectorized: bool = False,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        sparse: bool = False,
+        cache: Union[None, str, QuboCache] = None,
+        **options,
+    ) -> Tuple[np.array, int]:
+        """
+        Async variant of generate_qubo, cost and constraints are compiled concurrently, each with its own
+        concurrency limit. options (concurrency, retries, retry_delay, timeout, memo, executor, instrumentation) are
+        passed to generate_qubo_matrix_async.
+        :return: Q, c
+            Q: QUBO matrix
+            c: offset / constant term
+        """
+        cache = QuboCache.from_argument(cache)
+        if cache is not None:
+            key = cache.key(
+                "generate_qubo", cost, constraints, input_size, penalty_method, penalty_weight, searchspace, sparse,
+                vectorized,
+            )
+            hit = cache.get(key)
+            if hit is not None:
+                return hit
+        (cost_qubo, cost_offset), (constraint_qubo, constraint_offset) = await asyncio.gather(*(
+            cls.generate_qubo_matrix_async(
+                function, input_size, searchspace, vectorized, batch_size, sparse, cache, **options
+            )
+            for function in (cost, constraints)
+        ))
+        Q, offset = cls._combine(
+            cost_qubo, cost_offset, constraint_qubo, constraint_offset, penalty_method, penalty_weight
+        )
+        if cache is not None:
+            cache.put(key, Q, offset)
         return Q, offset
@@ -1,3 +1,26 @@
+import numpy as np
+from autoqubo.memo import memo_key
+
+
+class _BinaryFunction:
+    """
+    Picklable wrapper calling f with the decoded arguments of a bitstring (or of a 2-D batch of bitstrings).
+    """
+    def __init__(self, searchspace, f, vectorized):
+        self.searchspace = searchspace
+        self.f = f
+        self.vectorized = vectorized
+
+    @property
+    def memo_key(self):
+        return memo_key(self.f), self.searchspace
+
+    def __call__(self, x):
+        if self.vectorized:
+            return self.searchspace.call_binary_batch(self.f, x)
+        return self.searchspace.call_binary(self.f, x)
+
+
 class SearchSpace:
     """
     Provides methods for describing a search space that is not binary. Provides methods for transforming elements of
@@ -6,17 +29,30 @@ class SearchSpace:
     def __init__(self, desc=None):
         self.desc = []
         self.size = 0
+        # batch decoding plan, one (start, weights, offset) per variable; weights is None for non-affine types
+        self._plan = []
         if desc is not None:
             self.add_all(desc)
 
-    def add(self, label, var_type, var_size):
+    def add(self, label, var_type, var_size=None):
         """
         Add a new decision variable to the search space.
         :param label:
         :param var_type:
-        :param var_size:
+        :param var_size: number of bits, may be omitted for types that know their size
         :return:
         """
+        type_size = getattr(var_type, "size", None)
+        if var_size is None:
+            if type_size is None:
+                raise ValueError(f"The number of bits of variable {label} is required")
+            var_size = type_size
+        elif type_size is not None and var_size != type_size:
+            raise ValueError(f"Variable {label} needs {type_size} bits, got {var_size}")
+        weights, offset = None, 0
+        if getattr(var_type, "affine", None) is not None:
+            weights, offset = var_type.affine(var_size)
+        self._plan.append((self.size, weights, offset))
         self.desc.append((label, var_type, var_size))
         self.size += var_size
 
@@ -55,6 +91,44 @@ class SearchSpace:
             k += size
         return values
 
+    def decode_batch(self, xs):
+        """
+        Decode a 2-D array of bitstrings, one per row, e.g. all samples of a solver response.
+        Affine types are decoded with one matrix product per variable, other types row by row.
+        :param xs:
+        :return: list with one array per variable, holding the decoded values of all rows
+        """
+        xs = np.asarray(xs)
+        values = []
+        for (label, decoding, size), (start, weights, offset) in zip(self.desc, self._plan):
+            bits = xs[:, start:start + size]
+            if weights is not None:
+                values.append(bits @ weights + offset)
+            else:
+                values.append(np.array([decoding.decode(x) for x in bits.tolist()]))
+        return values
+
+    def decode_dict_batch(self, xs):
+        """
+        Decode a 2-D array of bitstrings into a dict that maps each label to an array of decoded values.
+        :param xs:
+        :return:
+        """
+        return {label: values for (label, _, _), values in zip(self.desc, self.decode_batch(xs))}
+
+    def decode_structured(self, xs):
+        """
+        Decode a 2-D array of bitstrings into a structured array with one record per row and one field per label.
+        :param xs:
+        :return:
+        """
+        decoded = self.decode_dict_batch(xs)
+        dtype = [(str(label), values.dtype, values.shape[1:]) for label, values in decoded.items()]
+        records = np.zeros(len(xs), dtype=dtype)
+        for label, values in decoded.items():
+            records[str(label)] = values
+        return records
+
     def encode(self, values):
         """
         Encode a member of the search space into a bitstring.
@@ -66,6 +140,20 @@ class SearchSpace:
             bitstring += decoding.encode(values[label], size)
         return bitstring
 
+    def encode_batch(self, values):
+        """
+        Encode many members of the search space into a 2-D array of bitstrings, one per row.
+        :param values: dict that maps each label to a sequence of values
+        :return:
+        """
+        blocks = []
+        for label, decoding, size in self.desc:
+            if getattr(decoding, "encode_batch", None) is not None:
+                blocks.append(np.asarray(decoding.encode_batch(values[label], size)).reshape(-1, size))
+            else:
+                blocks.append(np.array([decoding.encode(value, size) for value in values[label]]).reshape(-1, size))
+        return np.concatenate(blocks, axis=1)
+
     def call_binary(self, f, x):
         """
         Call a function using a binary input.
@@ -75,12 +163,27 @@ class SearchSpace:
         """
         return f(*self.decode(x))
 
-    def wrap_binary(self, f):
+    def call_binary_batch(self, f, xs):
+        """
+        Call a vectorized function using a 2-D array of bitstrings, one per row. Each argument of the function is
+        passed as an array holding the decoded values of all rows.
+        :param f:
+        :param xs:
+        :return:
+        """
+        return f(*self.decode_batch(xs))
+
+    def wrap_binary(self, f, vectorized=False, memo=None):
         """
         Get a function that accepts binary input.
         :param f:
+        :param vectorized: if True, the returned function accepts a 2-D array of bitstrings and f is called once
+            with batched arguments
+        :param memo: EvaluationMemo, if given the returned function only calls f on bitstrings without a stored
+            value; the values are shared with the SamplingCompiler methods using the same memo
         :return:
         """
-        def binary(x):
-            return self.call_binary(f, x)
-        return binary
+        function = _BinaryFunction(self, f, vectorized)
+        if memo is not None:
+            return memo.wrap(function, vectorized)
+        return function
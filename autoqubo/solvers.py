@@ -0,0 +1,344 @@
+"""
+native QUBO solvers: simulated annealing and tabu search over
+batches of replicas, with per-variable local fields, and exact
+enumeration in Gray-code order for small problems
+"""
+
+import time
+from multiprocessing import Pool
+from typing import Optional, Tuple
+import numpy as np
+from autoqubo.utils import issparse, nonzero_entries
+
+
+def _couplings(q):
+    """
+    Splits E(x) = x @ q @ x into linear terms h and symmetric couplings A without diagonal, such that
+    E(x) = h @ x + x @ A @ x / 2. A is returned as CSR arrays (indptr, indices, data).
+    """
+    n = q.shape[0]
+    if issparse(q):
+        q = q.tocsr().astype(np.float64)
+        h = q.diagonal()
+        a = (q + q.T).tocoo()
+        keep = a.row != a.col
+        rows, cols, data = a.row[keep], a.col[keep], a.data[keep]
+        order = np.lexsort((cols, rows))
+        rows, cols, data = rows[order], cols[order], data[order]
+    else:
+        q = np.asarray(q, dtype=np.float64)
+        h = np.diag(q).copy()
+        a = q + q.T
+        np.fill_diagonal(a, 0)
+        rows, cols, data = nonzero_entries(a)
+    indptr = np.searchsorted(rows, np.arange(n + 1))
+    return h, (indptr, cols.astype(np.int64), data)
+
+
+def _local_fields(couplings, x):
+    """A @ x for every replica (row) of x"""
+    indptr, indices, data = couplings
+    n = len(indptr) - 1
+    row_of = np.repeat(np.arange(n), np.diff(indptr))
+    fields = np.zeros(x.shape)
+    np.add.at(fields.T, row_of, data[:, None] * x[:, indices].T)
+    return fields
+
+
+def _default_beta_range(h, couplings):
+    """
+    Inverse temperatures at which the largest possible energy change is accepted with probability 1/2 at the start,
+    and the smallest coefficient with probability 1/100 at the end.
+    """
+    indptr, _, data = couplings
+    max_delta = np.abs(h) + np.add.reduceat(np.abs(np.append(data, 0)), indptr[:-1]) * (np.diff(indptr) > 0)
+    coefficients = np.abs(np.concatenate([h, data]))
+    coefficients = coefficients[coefficients > 0]
+    if len(coefficients) == 0:
+        return 1.0, 1.0
+    return np.log(2) / max(max_delta.max(), 1e-12), np.log(100) / coefficients.min()
+
+
+def _budget_exhausted(energies, target, deadline):
+    if target is not None and energies.min() <= target:
+        return True
+    return deadline is not None and time.perf_counter() > deadline
+
+
+def _anneal(q, num_reads, seed, target, timeout, num_sweeps, beta_range):
+    deadline = None if timeout is None else time.perf_counter() + timeout
+    rng = np.random.default_rng(seed)
+    h, couplings = _couplings(q)
+    indptr, indices, data = couplings
+    n = len(h)
+    if beta_range is None:
+        beta_range = _default_beta_range(h, couplings)
+    betas = np.geomspace(beta_range[0], beta_range[1], num_sweeps)
+
+    x = rng.integers(0, 2, size=(num_reads, n)).astype(np.float64)
+    fields = _local_fields(couplings, x)
+    energies = x @ h + np.einsum("ri,ri->r", x, fields) / 2
+    neighbours = []
+    for i in range(n):
+        idx, values = indices[indptr[i]:indptr[i + 1]], data[indptr[i]:indptr[i + 1]]
+        if len(idx) > n // 4:
+            # slicing is cheaper than fancy indexing for dense rows
+            row = np.zeros(n)
+            row[idx] = values
+            idx, values = slice(None), row
+        neighbours.append((idx, values))
+    for beta in betas:
+        if _budget_exhausted(energies, target, deadline):
+            break
+        # a flip is accepted if its energy change is at most -log(u) / beta, u uniform in (0, 1]
+        thresholds = -np.log1p(-rng.random((n, num_reads))) / beta
+        for i in range(n):
+            sign = 1 - 2 * x[:, i]
+            delta = sign * (h[i] + fields[:, i])
+            accepted = delta <= thresholds[i]
+            if not accepted.any():
+                continue
+            step = sign * accepted
+            x[:, i] += step
+            energies += delta * accepted
+            idx, values = neighbours[i]
+            fields[:, idx] += step[:, None] * values
+    return x.astype(np.int8), energies
+
+
+def _tabu(q, num_reads, seed, target, timeout, num_steps, tenure):
+    deadline = None if timeout is None else time.perf_counter() + timeout
+    rng = np.random.default_rng(seed)
+    h, couplings = _couplings(q)
+    indptr, indices, data = couplings
+    n = len(h)
+    if tenure is None:
+        tenure = max(1, min(20, n // 4))
+    tenure = min(tenure, n - 1)
+
+    x = rng.integers(0, 2, size=(num_reads, n)).astype(np.float64)
+    fields = _local_fields(couplings, x)
+    energies = x @ h + np.einsum("ri,ri->r", x, fields) / 2
+    best, best_energies = x.copy(), energies.copy()
+    tabu_until = np.zeros((num_reads, n), dtype=np.int64)
+    replicas = np.arange(num_reads)
+    for step in range(num_steps):
+        if _budget_exhausted(best_energies, target, deadline):
+            break
+        delta = (1 - 2 * x) * (h + fields)
+        # tabu moves are allowed if they lead to a new best solution (aspiration)
+        allowed = (tabu_until <= step) | (energies[:, None] + delta < best_energies[:, None])
+        flip = np.argmin(np.where(allowed, delta, np.inf), axis=1)
+        sign = 1 - 2 * x[replicas, flip]
+        x[replicas, flip] += sign
+        energies += delta[replicas, flip]
+        tabu_until[replicas, flip] = step + tenure + 1
+
+        # scatter the coupling rows of the flipped variables into the local fields
+        counts = indptr[flip + 1] - indptr[flip]
+        owner = np.repeat(replicas, counts)
+        positions = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts) + np.repeat(indptr[flip], counts)
+        np.add.at(fields, (owner, indices[positions]), np.repeat(sign, counts) * data[positions])
+
+        improved = energies < best_energies
+        best[improved] = x[improved]
+        best_energies[improved] = energies[improved]
+    return best.astype(np.int8), best_energies
+
+
+def _run(solver, q, num_reads, num_processes, seed, target, timeout, *options):
+    """runs the solver, splitting the replicas across processes with independent random streams"""
+    if num_processes is None or num_processes <= 1:
+        return solver(q, num_reads, seed, target, timeout, *options)
+    seeds = np.random.SeedSequence(seed).spawn(num_processes)
+    reads = [len(part) for part in np.array_split(np.arange(num_reads), num_processes) if len(part)]
+    jobs = [(q, r, s, target, timeout, *options) for r, s in zip(reads, seeds)]
+    with Pool(len(jobs)) as pool:
+        results = pool.starmap(solver, jobs)
+    return np.concatenate([r[0] for r in results]), np.concatenate([r[1] for r in results])
+
+
+def simulated_annealing(
+    q,
+    num_reads: int = 16,
+    num_sweeps: int = 1000,
+    beta_range: Optional[Tuple[float, float]] = None,
+    seed: Optional[int] = None,
+    target: Optional[float] = None,
+    timeout: Optional[float] = None,
+    num_processes: int = 1,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Simulated annealing with a geometric inverse temperature schedule. All replicas are updated together, one
+    variable at a time; the local field of every variable is kept up to date, so a flip costs O(degree).
+    :param q:
+        QUBO matrix, dense or scipy.sparse
+    :param num_reads:
+        number of independent replicas
+    :param num_sweeps:
+        number of sweeps over all variables
+    :param beta_range:
+        initial and final inverse temperature, derived from the coefficients of q if None
+    :param seed:
+        seed of the random number generator, results are reproducible for a fixed seed and num_processes
+    :param target:
+        stop as soon as a replica reaches this energy (without offset)
+    :param timeout:
+        stop after this many seconds
+    :param num_processes:
+        number of processes the replicas are split across
+    :return: samples, energies
+        samples: (num_reads, n) array of final states
+        energies: their energies x @ q @ x
+    """
+    return _run(_anneal, q, num_reads, num_processes, seed, target, timeout, num_sweeps, beta_range)
+
+
+def tabu_search(
+    q,
+    num_reads: int = 16,
+    num_steps: Optional[int] = None,
+    tenure: Optional[int] = None,
+    seed: Optional[int] = None,
+    target: Optional[float] = None,
+    timeout: Optional[float] = None,
+    num_processes: int = 1,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Tabu search from random starting points. In every step each replica makes the best flip that is not tabu,
+    or that leads to a new best solution; flipped variables stay tabu for tenure steps.
+    :param q:
+        QUBO matrix, dense or scipy.sparse
+    :param num_reads:
+        number of independent replicas
+    :param num_steps:
+        number of steps, 100 * n if None
+    :param tenure:
+        number of steps a flipped variable stays tabu, min(20, n // 4) if None
+    :param seed:
+        see simulated_annealing
+    :param target:
+        see simulated_annealing
+    :param timeout:
+        see simulated_annealing
+    :param num_processes:
+        see simulated_annealing
+    :return: samples, energies
+        samples: (num_reads, n) array of the best states found by each replica
+        energies: their energies x @ q @ x
+    """
+    if num_steps is None:
+        num_steps = 100 * q.shape[0]
+    return _run(_tabu, q, num_reads, num_processes, seed, target, timeout, num_steps, tenure)
+
+
+def _dense_couplings(q):
+    q = q.toarray() if issparse(q) else np.asarray(q)
+    q = q.astype(np.float64)
+    a = q + q.T
+    np.fill_diagonal(a, 0)
+    return np.diag(q).copy(), a
+
+
+def _low_block(h, a, low_bits):
+    """energies of all assignments of the first low_bits variables (the others 0), state j has bit k = (j >> k) & 1"""
+    energies = np.zeros(1)
+    for k in range(low_bits):
+        states = (np.arange(len(energies))[:, None] >> np.arange(k)) & 1
+        # doubling: the states with bit k set add its linear term and couplings to the lower bits
+        energies = np.concatenate([energies, energies + h[k] + states @ a[:k, k]])
+    return energies, ((np.arange(len(energies))[:, None] >> np.arange(low_bits)) & 1).astype(np.float64)
+
+
+def _gray_bits(index, size):
+    return ((index ^ (index >> 1)) >> np.arange(size)) & 1
+
+
+def _enumerate(q, k, low_bits, start, stop, batch_size):
+    """top k of all states whose high bits are Gray codes start ... stop - 1, as (low index, high gray code, energy)"""
+    h, a = _dense_couplings(q)
+    high_bits = len(h) - low_bits
+    low_energies, low_states = _low_block(h, a, low_bits)
+    # [states, energies, 1] @ [couplings; 1; high energies] evaluates a batch with a single matrix product
+    low_block = np.hstack([low_states, low_energies[:, None], np.ones((len(low_energies), 1))])
+    a_low_high, a_high, h_high = a[:low_bits, low_bits:], a[low_bits:, low_bits:], h[low_bits:]
+
+    y = _gray_bits(start, high_bits).astype(np.float64)
+    coupling = a_low_high @ y
+    high_fields = a_high @ y
+    high_energy = h_high @ y + y @ high_fields / 2
+
+    best_low, best_high, best = np.zeros(0, np.int64), np.zeros(0, np.int64), np.zeros(0)
+    for batch_start in range(start, stop, batch_size):
+        batch = range(batch_start, min(batch_start + batch_size, stop))
+        high_block = np.ones((low_bits + 2, len(batch)))
+        for column, t in enumerate(batch):
+            high_block[:low_bits, column] = coupling
+            high_block[-1, column] = high_energy
+            if t + 1 < stop:
+                # the next Gray code differs in the lowest set bit of t + 1
+                b = ((t + 1) & -(t + 1)).bit_length() - 1
+                sign = 1 - 2 * y[b]
+                y[b] += sign
+                high_energy += sign * (h_high[b] + high_fields[b])
+                high_fields += sign * a_high[:, b]
+                coupling += sign * a_low_high[:, b]
+        energies = (low_block @ high_block).ravel()
+        if len(best) < k:
+            candidates = np.argpartition(energies, min(k, len(energies)) - 1)[:k]
+        else:
+            candidates = np.flatnonzero(energies < best[-1])
+        low, column = np.divmod(candidates, len(batch))
+        best_low = np.concatenate([best_low, low])
+        best_high = np.concatenate([best_high, np.asarray(batch)[column]])
+        best = np.concatenate([best, energies[candidates]])
+        order = np.argsort(best, kind="stable")[:k]
+        best_low, best_high, best = best_low[order], best_high[order], best[order]
+    return best_low, best_high, best
+
+
+def brute_force(
+    q,
+    k: int = 1,
+    num_processes: int = 1,
+    low_bits: Optional[int] = None,
+    batch_size: int = 64,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Exact solver that enumerates all 2^n states, practical up to n of about 32; useful as a ground truth for
+    compiled QUBOs. The energies of all assignments of the first low_bits variables are computed once; the other
+    variables are walked in Gray-code order with O(n) incremental updates, and the states of batch_size Gray-code
+    steps are evaluated with a single matrix product.
+    :param q:
+        QUBO matrix, dense or scipy.sparse
+    :param k:
+        number of solutions to return
+    :param num_processes:
+        number of processes the Gray-code range is split across
+    :param low_bits:
+        number of variables enumerated in a block, min(n, 16) if None
+    :param batch_size:
+        number of Gray-code steps per matrix product
+    :return: samples, energies
+        samples: (k, n) array of the k states with the lowest energies, ordered by energy
+        energies: their energies x @ q @ x
+    """
+    n = q.shape[0]
+    low_bits = min(n, 16) if low_bits is None else min(n, low_bits)
+    num_high = 2 ** (n - low_bits)
+    bounds = np.linspace(0, num_high, min(max(num_processes, 1), num_high) + 1).astype(np.int64)
+    jobs = [(q, k, low_bits, int(start), int(stop), batch_size) for start, stop in zip(bounds[:-1], bounds[1:])]
+    if len(jobs) == 1:
+        results = [_enumerate(*jobs[0])]
+    else:
+        with Pool(len(jobs)) as pool:
+            results = pool.starmap(_enumerate, jobs)
+    low, high, energies = (np.concatenate([r[i] for r in results]) for i in range(3))
+    order = np.argsort(energies, kind="stable")[:k]
+    samples = np.concatenate(
+        [(low[order, None] >> np.arange(low_bits)) & 1, _gray_bits(high[order, None], n - low_bits)], axis=1
+    ).astype(np.int8)
+    # recompute, the incremental updates accumulate rounding errors
+    from autoqubo.utils import Utils
+
+    return samples, Utils.energies(q, samples.astype(np.float64))
@@ -5,7 +5,7 @@ such that sampling works fine out-of-the-box
 as if we're using proper numeric values
 """
 
-from sympy import symbols
+from sympy import Basic, expand, lambdify, symbols
 import numpy as np
 
 
@@ -21,12 +21,24 @@ def symbolic_matrix(n_rows, m_cols, positive=False):
     symbolic_array = []
     for row in range(n_rows):
         # indices are seperated by whitespace, e.g. "s0 2"
-        row = symbols([f"s{row}\ {j}" for j in range(m_cols)], positive=positive)
+        row = symbols([rf"s{row}\ {j}" for j in range(m_cols)], positive=positive)
         symbolic_array.append(row)
     symbolic_array = np.array(symbolic_array)
     return symbolic_array
 
 
+def symbol_position(symbol):
+    """position (i, j) of a variable created by symbolic_matrix
+    Args:
+        symbol(sympy.core.symbol.Symbol): variable named "si j"
+    Returns:
+        tuple(int, int): row and column in the source matrix
+    """
+    # assume var indices are seperated by whitespace
+    i, j = [int(k) for k in symbol.name[1:].split(" ")]
+    return i, j
+
+
 def formula_wise_substitution(expression, source_matrix):
     """inserts numeric values from source matrix into
     all symbolic variables present in sympy expression
@@ -40,9 +52,7 @@ def formula_wise_substitution(expression, source_matrix):
         free_vars = list(expression.free_symbols)
         sub_dir = {}
         for var in free_vars:
-            # assume var indices are seperated by whitespace
-            i, j = [int(k) for k in var.name[1:].split(" ")]
-            sub_dir[var] = source_matrix[i, j]
+            sub_dir[var] = source_matrix[symbol_position(var)]
         result = expression.subs(sub_dir)
         return result
     # don't do anything if there are no symbols
@@ -54,3 +64,100 @@ def formula_wise_substitution(expression, source_matrix):
 def insert_values(qubo, source_matrix):
     vec_func = np.vectorize(lambda x: formula_wise_substitution(x, source_matrix))
     return vec_func(qubo)
+
+
+def _is_linear_term(term):
+    return term == 1 or term.is_Symbol
+
+
+class QuboTemplate:
+    """symbolic QUBO compiled once for fast numeric instantiation
+
+    Every entry (and the offset) is split into a constant plus a linear
+    combination of the variables of symbolic_matrix, stored as a sparse
+    coefficient matrix, so instantiating a batch of source matrices is a
+    single matrix product. Entries that are not linear in the variables
+    are compiled with sympy.lambdify and evaluated on the whole batch.
+    """
+
+    def __init__(self, qubo, offset=0, shape=None):
+        """
+        Args:
+            qubo(np.ndarray): symbolic (object dtype) or numeric QUBO matrix
+            offset: symbolic or numeric constant term
+            shape(tuple): shape of the source matrices, inferred from the variables if omitted
+        """
+        qubo = np.asarray(qubo, dtype=object)
+        self.size = qubo.shape[0]
+        # the offset is handled as one more entry after the flattened matrix
+        entries = list(qubo.flat) + [offset]
+        variables = set()
+        for entry in entries:
+            if isinstance(entry, Basic):
+                variables |= entry.free_symbols
+        variables = sorted(variables, key=symbol_position)
+        positions = [symbol_position(var) for var in variables]
+        if shape is None:
+            shape = tuple(max(p[k] for p in positions) + 1 for k in range(2)) if positions else (0, 0)
+        self.shape = tuple(shape)
+        parameter = {var: i * self.shape[1] + j for var, (i, j) in zip(variables, positions)}
+
+        self._constant = np.zeros(len(entries))
+        rows, cols, coefficients, nonlinear = [], [], [], []
+        for k, entry in enumerate(entries):
+            if not isinstance(entry, Basic):
+                self._constant[k] = float(entry)
+                continue
+            terms = entry.as_coefficients_dict()
+            if not all(_is_linear_term(term) for term in terms):
+                terms = expand(entry).as_coefficients_dict()
+            if not all(_is_linear_term(term) for term in terms):
+                nonlinear.append((k, entry))
+                continue
+            for term, coefficient in terms.items():
+                if term == 1:
+                    self._constant[k] += float(coefficient)
+                else:
+                    rows.append(k)
+                    cols.append(parameter[term])
+                    coefficients.append(float(coefficient))
+
+        num_parameters = self.shape[0] * self.shape[1]
+        try:
+            from scipy.sparse import csr_matrix
+
+            self._linear = csr_matrix((coefficients, (rows, cols)), shape=(len(entries), num_parameters))
+        except ImportError:
+            self._linear = np.zeros((len(entries), num_parameters))
+            np.add.at(self._linear, (rows, cols), coefficients)
+
+        self._nonlinear_index = np.array([k for k, _ in nonlinear], dtype=np.int64)
+        self._nonlinear_parameters = [parameter[var] for var in variables]
+        self._nonlinear = lambdify(variables, [entry for _, entry in nonlinear], "numpy") if nonlinear else None
+
+    def instantiate(self, source_matrices):
+        """inserts numeric values into the template
+        Args:
+            source_matrices(np.ndarray): one source matrix, or a stack of
+                source matrices of shape (batch, rows, cols)
+        Returns:
+            Q, c: float QUBO matrix and offset, or a (batch, n, n) stack of
+                QUBO matrices and a (batch,) array of offsets
+        """
+        source = np.asarray(source_matrices, dtype=np.float64)
+        single = source.ndim == 2
+        source = source.reshape((-1,) + source.shape[-2:])[:, :self.shape[0], :self.shape[1]]
+        parameters = source.reshape(len(source), -1)
+
+        values = np.asarray(self._linear @ parameters.T).T + self._constant
+        if self._nonlinear is not None:
+            results = self._nonlinear(*(parameters[:, p] for p in self._nonlinear_parameters))
+            values[:, self._nonlinear_index] = np.stack(
+                [np.broadcast_to(np.asarray(r, dtype=np.float64), (len(parameters),)) for r in results], axis=1
+            )
+
+        qubos = values[:, :-1].reshape(len(values), self.size, self.size)
+        offsets = values[:, -1]
+        if single:
+            return qubos[0], float(offsets[0])
+        return qubos, offsets
@@ -1,4 +1,33 @@
-from itertools import product
+import numpy as np
+
+
+def issparse(q):
+    """
+    Returns True if q is a scipy.sparse matrix. scipy is an optional dependency.
+    """
+    try:
+        from scipy.sparse import issparse as scipy_issparse
+    except ImportError:
+        return False
+    return scipy_issparse(q)
+
+
+def nonzero_entries(q, start=0, stop=None):
+    """
+    Returns the non-zero entries of rows start ... stop - 1 of a QUBO matrix as (rows, columns, values) arrays,
+    in row-major order.
+    :param q:
+        QUBO matrix, dense, memory-mapped or scipy.sparse
+    """
+    stop = q.shape[0] if stop is None else stop
+    if issparse(q):
+        block = q[start:stop].tocoo()
+        order = np.lexsort((block.col, block.row))
+        keep = order[block.data[order] != 0]
+        return block.row[keep].astype(np.int64) + start, block.col[keep].astype(np.int64), block.data[keep]
+    block = np.asarray(q[start:stop])
+    rows, cols = np.nonzero(block)
+    return rows.astype(np.int64) + start, cols.astype(np.int64), block[rows, cols]
 
 
 class Utils:
@@ -7,26 +36,41 @@ class Utils:
         """
         Calculate the QUBO energy for a given binary solution.
         :param q:
+            QUBO matrix, dense or scipy.sparse
         :param x:
         :param offset:
         :return:
         """
+        if issparse(q):
+            x = np.asarray(x)
+            return x @ (q @ x) + offset
         return x @ q @ x + offset
 
+    @staticmethod
+    def energies(q, xs, offset=0):
+        """
+        Calculate the QUBO energies for a 2-D array of binary solutions, one per row.
+        :param q:
+            QUBO matrix, dense or scipy.sparse
+        :param xs:
+        :param offset:
+        :return:
+            1-D array of energies
+        """
+        xs = np.asarray(xs)
+        return np.einsum("bi,bi->b", xs, np.asarray(q @ xs.T).T) + offset
+
     @staticmethod
     def get_matrix_dict_repr(q):
         """
         Returns dict representation of a QUBO matrix.
         :param q:
-            QUBO matrix
+            QUBO matrix, dense or scipy.sparse
         :return:
             the input matrix as a dict object
         """
-        dict_repr = {}
-        for i, j in product(range(len(q)), repeat=2):
-            if q[i, j] != 0:
-                dict_repr[(i, j)] = q[i, j]
-        return dict_repr
+        rows, cols, values = nonzero_entries(q)
+        return dict(zip(zip(rows.tolist(), cols.tolist()), values.tolist()))
 
     @staticmethod
     def get_solution_vector_repr(d):
@@ -40,17 +84,42 @@ class Utils:
         return [d[i] for i in range(len(d))]
 
     @staticmethod
-    def solve(q, offset=0, target=None, timeout=60):
+    def solve(q, offset=0, target=None, timeout=60, method="sa", **kwargs):
         """
         Returns solutions to a given QUBO problem.
         :param q:
-            QUBO matrix
+            QUBO matrix, dense or scipy.sparse
         :param offset:
             offset
          : param target:
              target energy as stopping criterion
+        :param timeout:
+            maximum run time in seconds
+        :param method:
+            "sa" (simulated annealing), "tabu" or "exact" (enumeration of all states, target and timeout are
+            ignored) from autoqubo.solvers, or "qbsolv" for the deprecated dwave_qbsolv package
+        :param kwargs:
+            options of the solver, e.g. num_reads, seed or num_processes
         :return: solutions, energies
+            distinct solutions ordered by energy
         """
+        if method == "qbsolv":
+            return Utils._solve_qbsolv(q, offset, target, timeout)
+        from autoqubo.solvers import brute_force, simulated_annealing, tabu_search
+
+        solvers = {"sa": simulated_annealing, "tabu": tabu_search}
+        if method == "exact":
+            samples, energies = brute_force(q, **kwargs)
+        elif method in solvers:
+            samples, energies = solvers[method](q, target=target, timeout=timeout, **kwargs)
+        else:
+            raise ValueError(f"Unknown method {method}, use one of {sorted(solvers) + ['exact', 'qbsolv']}")
+        samples, index = np.unique(samples, axis=0, return_index=True)
+        order = np.argsort(energies[index], kind="stable")
+        return samples[order].tolist(), (energies[index][order] + offset).tolist()
+
+    @staticmethod
+    def _solve_qbsolv(q, offset, target, timeout):
         from dwave_qbsolv import QBSolv
         import warnings
 
@@ -0,0 +1,135 @@
+"""
+parameterized versions of the examples (tsp, portfolio, weighted_max_sat)
+used by the benchmark suite; every problem provides a fitness function for
+single bitstrings and a vectorized one for 2-D batches
+"""
+
+from collections import namedtuple
+import numpy as np
+from autoqubo import Binarization, SearchSpace
+from autoqubo.symbolic import symbolic_matrix
+
+# fitness: f(x), fitness_batch: f(xs) for a 2-D batch, constraint/constraint_batch: None if unconstrained
+Problem = namedtuple(
+    'Problem',
+    'name size input_size fitness fitness_batch cost cost_batch constraint constraint_batch searchspace',
+)
+
+
+class TourLength:
+    """tsp tour length for a distance matrix, see examples/tsp.py"""
+    def __init__(self, distances):
+        self.distances = distances
+        self.n = len(distances)
+
+    def __call__(self, x):
+        x = np.asarray(x).reshape(self.n, self.n)
+        return np.einsum("ki,ij,kj->", x, self.distances, np.roll(x, -1, axis=0))
+
+    def batch(self, xs):
+        xs = np.asarray(xs).reshape(-1, self.n, self.n)
+        return np.einsum("bki,ij,bkj->b", xs, self.distances, np.roll(xs, -1, axis=1))
+
+
+class TwoWayOneHot:
+    """row and column one-hot constraint of the tsp permutation matrix"""
+    def __init__(self, n):
+        self.n = n
+
+    def __call__(self, x):
+        return self.batch(np.asarray(x)[None])[0]
+
+    def batch(self, xs):
+        xs = np.asarray(xs).reshape(-1, self.n, self.n)
+        return ((1 - xs.sum(axis=1)) ** 2).sum(axis=1) + ((1 - xs.sum(axis=2)) ** 2).sum(axis=1)
+
+
+class Weighted:
+    """a * cost + b * constraint, with optional vectorized parts"""
+    def __init__(self, cost, constraint, b):
+        self.cost, self.constraint, self.b = cost, constraint, b
+
+    def __call__(self, x):
+        return self.cost(x) + self.b * self.constraint(x)
+
+    def batch(self, xs):
+        return self.cost.batch(xs) + self.b * self.constraint.batch(xs)
+
+
+def tsp(cities, seed=0):
+    rng = np.random.default_rng(seed)
+    points = rng.random((cities, 2))
+    distances = np.linalg.norm(points[:, None] - points[None], axis=-1)
+    cost, constraint = TourLength(distances), TwoWayOneHot(cities)
+    fitness = Weighted(cost, constraint, distances.max() * cities)
+    return Problem(
+        "tsp", cities, cities ** 2, fitness, fitness.batch, cost, cost.batch, constraint, constraint.batch, None
+    )
+
+
+def symbolic_tsp(cities):
+    """tour length with symbolic distances, for QuboTemplate benchmarks"""
+    distances = symbolic_matrix(cities, cities, positive=True)
+
+    def tour_length(x):
+        x = np.asarray(x).reshape(cities, cities)
+        total = 0
+        for k, i in zip(*np.nonzero(x)):
+            for j in np.flatnonzero(x[(k + 1) % cities]):
+                total += distances[i, j]
+        return total
+
+    return tour_length
+
+
+class Portfolio:
+    """mean-variance portfolio over uint holdings with a budget constraint, see examples/portfolio.py"""
+    def __init__(self, cov, mean, budget, penalty):
+        self.cov, self.mean, self.budget, self.penalty = cov, mean, budget, penalty
+
+    def __call__(self, x):
+        return self.batch(np.asarray(x)[None])[0]
+
+    def batch(self, x):
+        x = np.asarray(x)
+        return (
+            np.einsum("bi,ij,bj->b", x, self.cov, x) - x @ self.mean
+            + self.penalty * (x.sum(axis=1) - self.budget) ** 2
+        )
+
+
+def portfolio(assets, bits=3, seed=0):
+    rng = np.random.default_rng(seed)
+    factors = rng.integers(0, 5, size=(assets, assets))
+    cov = factors @ factors.T
+    mean = rng.integers(0, 20, size=assets)
+    s = SearchSpace([('x', Binarization.get_uint_vector_type(bits, assets))])
+    fitness = Portfolio(cov, mean, assets, 100)
+    return Problem("portfolio", assets, s.size, fitness, fitness.batch, None, None, None, None, s)
+
+
+class WeightedMaxSat:
+    """negated total weight of satisfied 2-literal clauses, see examples/weighted_max_sat.py"""
+    def __init__(self, variables, negated, weights):
+        self.variables, self.negated, self.weights = variables, negated, weights
+
+    def __call__(self, x):
+        return self.batch(np.asarray(x)[None])[0]
+
+    def batch(self, xs):
+        literals = np.abs(np.asarray(xs)[:, self.variables] - self.negated)
+        satisfied = literals.any(axis=-1)
+        return -(satisfied * self.weights).sum(axis=1)
+
+
+def weighted_max_sat(variables, clauses_per_variable=4, seed=0):
+    rng = np.random.default_rng(seed)
+    num_clauses = variables * clauses_per_variable
+    clause_variables = np.array([rng.choice(variables, 2, replace=False) for _ in range(num_clauses)])
+    negated = rng.integers(0, 2, size=(num_clauses, 2))
+    weights = rng.integers(1, 10, size=num_clauses)
+    fitness = WeightedMaxSat(clause_variables, negated, weights)
+    return Problem("weighted_max_sat", variables, variables, fitness, fitness.batch, None, None, None, None, None)
+
+
+PROBLEMS = {"tsp": tsp, "portfolio": portfolio, "weighted_max_sat": weighted_max_sat}
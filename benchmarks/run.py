@@ -0,0 +1,256 @@
+"""
+benchmark suite for compilation, verification, penalty weights, symbolic
+templates and solving; writes machine-readable JSON results that can be
+compared across versions
+
+    python benchmarks/run.py --preset small --output results.json
+    python benchmarks/run.py --preset small --compare results.json
+"""
+
+import argparse
+import importlib.util
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from autoqubo import SamplingCompiler, Utils  # noqa: E402
+from autoqubo._package_info import __version__  # noqa: E402
+from autoqubo.executors import ProcessExecutor  # noqa: E402
+from autoqubo.penalty_weights import generate_penalty  # noqa: E402
+from autoqubo.symbolic import QuboTemplate  # noqa: E402
+from problems import PROBLEMS, symbolic_tsp  # noqa: E402
+
+# problem sizes (cities, assets, variables) per preset, from tens to thousands of binary variables
+PRESETS = {
+    "quick": {"tsp": [4], "portfolio": [5], "weighted_max_sat": [20], "symbolic": [3]},
+    "small": {"tsp": [4, 6, 10], "portfolio": [5, 20, 60], "weighted_max_sat": [20, 100, 300], "symbolic": [3, 4]},
+    "large": {
+        "tsp": [4, 10, 20, 30],
+        "portfolio": [5, 20, 100, 400],
+        "weighted_max_sat": [20, 100, 500, 2000],
+        "symbolic": [3, 4, 5],
+    },
+}
+
+BENCHMARKS = ["compile", "compile_vectorized", "compile_mp", "verify", "penalty", "symbolic", "solve"]
+
+# calling a scalar fitness function O(n^2) times is too slow beyond this size
+MAX_SCALAR_INPUT_SIZE = 300
+MAX_EXACT_INPUT_SIZE = 20
+
+
+class Counted:
+    """counts the number of bitstrings a fitness function is evaluated on"""
+    def __init__(self, f, vectorized=False):
+        self.f, self.vectorized, self.count = f, vectorized, 0
+
+    def __call__(self, *args):
+        self.count += len(args[0]) if self.vectorized else 1
+        return self.f(*args)
+
+
+def worker_counts():
+    """1, 2, 4, ... worker processes up to the number of CPUs"""
+    cpus = os.cpu_count() or 1
+    counts = [1 << k for k in range(cpus.bit_length()) if 1 << k < cpus]
+    return counts + [cpus]
+
+
+def measure(run, repeat, memory):
+    """minimum wall time over repeat runs, and the peak traced memory of one additional run"""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = run()
+        times.append(time.perf_counter() - start)
+    peak = None
+    if memory:
+        tracemalloc.start()
+        run()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return result, min(times), peak
+
+
+def record(benchmark, problem, size, input_size, wall_time, peak_memory, evaluations=None, variant=None, **extra):
+    return {
+        "benchmark": benchmark,
+        "variant": variant,
+        "problem": problem,
+        "size": size,
+        "input_size": input_size,
+        "wall_time": wall_time,
+        "evaluations": evaluations,
+        "peak_memory": peak_memory,
+        **extra,
+    }
+
+
+def compile_benchmarks(p, benchmarks, repeat, memory):
+    results = []
+    scalar = p.input_size <= MAX_SCALAR_INPUT_SIZE
+    serial_time = None
+    if "compile" in benchmarks and scalar:
+        f = Counted(p.fitness)
+        _, wall, peak = measure(
+            lambda: SamplingCompiler.generate_qubo_matrix(f, p.input_size, False, p.searchspace), repeat, memory
+        )
+        serial_time = wall
+        results.append(record("compile", p.name, p.size, p.input_size, wall, peak, f.count // (repeat + memory)))
+    # the factory types of a SearchSpace are closures, which only cloudpickle can send to the process pool
+    if "compile_mp" in benchmarks and scalar and (p.searchspace is None or importlib.util.find_spec("cloudpickle")):
+        for workers in worker_counts():
+            # the pool is started in the first run, the minimum over the repeats excludes the start-up
+            with ProcessExecutor(max_workers=workers) as executor:
+                _, wall, peak = measure(
+                    lambda: SamplingCompiler.generate_qubo_matrix(
+                        p.fitness, p.input_size, searchspace=p.searchspace, executor=executor
+                    ),
+                    repeat, False,
+                )
+            speedup = None if serial_time is None else serial_time / wall
+            results.append(record(
+                "compile_mp", p.name, p.size, p.input_size, wall, peak, variant=f"{workers}_workers",
+                processes=workers, speedup=speedup,
+            ))
+
+    f = Counted(p.fitness_batch, vectorized=True)
+    (qubo, offset), wall, peak = measure(
+        lambda: SamplingCompiler.generate_qubo_matrix(
+            f, p.input_size, False, p.searchspace, vectorized=True
+        ),
+        repeat, memory,
+    )
+    if "compile_vectorized" in benchmarks:
+        results.append(
+            record("compile_vectorized", p.name, p.size, p.input_size, wall, peak, f.count // (repeat + memory))
+        )
+
+    if "verify" in benchmarks:
+        f = Counted(p.fitness_batch, vectorized=True)
+        passed, wall, peak = measure(
+            lambda: SamplingCompiler.test_qubo_matrix(f, qubo, offset, p.searchspace, vectorized=True), repeat, memory
+        )
+        results.append(record(
+            "verify", p.name, p.size, p.input_size, wall, peak, f.count // (repeat + memory), passed=bool(passed)
+        ))
+
+    if "penalty" in benchmarks and p.cost is not None:
+        cost_qubo, _ = SamplingCompiler.generate_qubo_matrix(p.cost_batch, p.input_size, False, vectorized=True)
+        constraint_qubo, _ = SamplingCompiler.generate_qubo_matrix(
+            p.constraint_batch, p.input_size, False, vectorized=True
+        )
+        for method in ["sum", "pnform", "verma_lewis"]:
+            weight, wall, peak = measure(
+                lambda: generate_penalty(method, cost_qubo, constraint_qubo), repeat, memory
+            )
+            results.append(record(
+                "penalty", p.name, p.size, p.input_size, wall, peak, variant=method, penalty_weight=weight
+            ))
+
+    if "solve" in benchmarks:
+        (_, energies), wall, peak = measure(
+            lambda: Utils.solve(qubo, offset, method="sa", num_reads=8, num_sweeps=100, seed=0), repeat, memory
+        )
+        results.append(record(
+            "solve", p.name, p.size, p.input_size, wall, peak, variant="sa", best_energy=energies[0]
+        ))
+        if p.input_size <= MAX_EXACT_INPUT_SIZE:
+            (_, energies), wall, peak = measure(lambda: Utils.solve(qubo, offset, method="exact"), repeat, memory)
+            results.append(record(
+                "solve", p.name, p.size, p.input_size, wall, peak, variant="exact", best_energy=energies[0]
+            ))
+    return results
+
+
+def symbolic_benchmarks(cities, repeat, memory, instances=100):
+    input_size = cities ** 2
+    f = Counted(symbolic_tsp(cities))
+    (qubo, offset), wall, peak = measure(
+        lambda: SamplingCompiler.generate_qubo_matrix(f, input_size, False), repeat, memory
+    )
+    results = [record("symbolic", "tsp", cities, input_size, wall, peak, f.count // (repeat + memory), variant="compile")]
+
+    template, wall, peak = measure(lambda: QuboTemplate(qubo, offset), repeat, memory)
+    results.append(record("symbolic", "tsp", cities, input_size, wall, peak, variant="template"))
+
+    distances = np.random.default_rng(0).random((instances, cities, cities))
+    _, wall, peak = measure(lambda: template.instantiate(distances), repeat, memory)
+    results.append(record("symbolic", "tsp", cities, input_size, wall, peak, variant="instantiate", instances=instances))
+    return results
+
+
+def run(preset, benchmarks, problems, repeat, memory):
+    sizes = PRESETS[preset]
+    results = []
+    for name in problems:
+        for size in sizes[name]:
+            p = PROBLEMS[name](size)
+            results += compile_benchmarks(p, benchmarks, repeat, memory)
+    if "symbolic" in benchmarks:
+        for cities in sizes["symbolic"]:
+            results += symbolic_benchmarks(cities, repeat, memory)
+    return results
+
+
+def metadata(preset, repeat):
+    return {
+        "autoqubo": __version__,
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "preset": preset,
+        "repeat": repeat,
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+    }
+
+
+def _key(r):
+    return r["benchmark"], r["variant"], r["problem"], r["size"]
+
+
+def compare(results, baseline):
+    """prints the wall time of every result relative to the matching baseline result"""
+    previous = {_key(r): r for r in baseline["results"]}
+    print(f"compared to autoqubo {baseline['metadata']['autoqubo']} ({baseline['metadata']['time']})")
+    for r in results:
+        old = previous.get(_key(r))
+        if old is not None and old["wall_time"] > 0:
+            ratio = r["wall_time"] / old["wall_time"]
+            print(f"{' '.join(str(v) for v in _key(r) if v is not None):50s} {ratio:6.2f}x")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--preset", choices=sorted(PRESETS), default="small")
+    parser.add_argument("--benchmarks", nargs="+", choices=BENCHMARKS, default=BENCHMARKS)
+    parser.add_argument("--problems", nargs="+", choices=sorted(PROBLEMS), default=sorted(PROBLEMS))
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--no-memory", action="store_true", help="skip the traced run that measures peak memory")
+    parser.add_argument("--output", help="write the results as JSON to this file")
+    parser.add_argument("--compare", help="JSON results of a previous run")
+    args = parser.parse_args(argv)
+
+    results = run(args.preset, args.benchmarks, args.problems, args.repeat, not args.no_memory)
+    for r in results:
+        name = " ".join(str(v) for v in _key(r) if v is not None)
+        print(f"{name:50s} n={r['input_size']:<6d} {r['wall_time']:10.4f}s evaluations={r['evaluations']}")
+    report = {"metadata": metadata(args.preset, args.repeat), "results": results}
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=1, default=float)
+    if args.compare:
+        with open(args.compare) as f:
+            compare(results, json.load(f))
+
+
+if __name__ == "__main__":
+    main()
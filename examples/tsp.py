@@ -1,6 +1,6 @@
 import numpy as np
 from autoqubo import SamplingCompiler
-from autoqubo.symbolic import symbolic_matrix, insert_values
+from autoqubo.symbolic import QuboTemplate, symbolic_matrix, insert_values
 
 
 def constraint(x):
@@ -14,6 +14,11 @@ def constraint(x):
     return row_violations.sum() + col_violations.sum()
 
 
+def one_hot(x):
+    """one hot term of a single row or column"""
+    return (1 - sum(x)) ** 2
+
+
 def tour_length(x, A, n):
     """tsp tour length given adjacency matrix A"""
     tour_length = 0
@@ -34,6 +39,13 @@ if __name__ == "__main__":
     cost = lambda x: tour_length(x, A, len(A))
     qubo, offset = SamplingCompiler.generate_qubo(cost, constraint, input_size=n**2)
 
+    # the constraint is a sum of one hot terms over the rows and columns, compiled term by term
+    cities = np.arange(n**2).reshape(n, n)
+    terms = [(one_hot, row) for row in cities] + [(one_hot, column) for column in cities.T]
+    constraint_qubo, constraint_offset = SamplingCompiler.generate_additive_qubo_matrix(terms, n**2)
+    print("Additive compilation returns the same constraint matrix:")
+    print(np.allclose(constraint_qubo, SamplingCompiler.generate_qubo_matrix(constraint, n**2)[0]))
+
     # symbolic sampling
     sym_mat = symbolic_matrix(n, n, positive=True)
     cost = lambda x: tour_length(x, sym_mat, n)
@@ -45,3 +57,9 @@ if __name__ == "__main__":
 
     print("Explicit Sampling returns same matrix as symbolic sampling:")
     print((qubo == qubo2).all())
+
+    # compile the template once, then instantiate it for any number of instances
+    template = QuboTemplate(sym_qubo, offset)
+    qubo3, offset3 = template.instantiate(A)
+    print("Compiled template returns same matrix as explicit sampling:")
+    print(np.allclose(qubo, qubo3))
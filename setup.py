@@ -20,14 +20,19 @@ class PackageInfo(object):
 package_info = PackageInfo(os.path.join(NAME, INFO))
 
 install_requires = [
-        'numpy>=1.14.0,<2.0.0',
+        'numpy>=1.17.0,<2.0.0',
         'sympy',
         'typing-extensions'
 ]
 
+extras_require = {
+        'sparse': ['scipy'],
+        'parallel': ['cloudpickle'],
+}
+
 packages = [NAME]
 
-python_requires = '!=3.0.*,!=3.1.*,!=3.2.*,!=3.3.*'
+python_requires = '>=3.7'
 
 setup(
     name=package_info.__package_name__,
@@ -45,14 +50,11 @@ setup(
     packages=packages,
     keywords=package_info.__keywords__,
     install_requires=install_requires,
+    extras_require=extras_require,
     include_package_data=True,
     python_requires=python_requires,
     classifiers=[
         'Programming Language :: Python :: 3',
-        'Programming Language :: Python :: 3.3',
-        'Programming Language :: Python :: 3.4',
-        'Programming Language :: Python :: 3.5',
-        'Programming Language :: Python :: 3.6',
         'Programming Language :: Python :: 3.7',
         'License :: OSI Approved :: BSD License',
     ],
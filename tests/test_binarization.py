@@ -32,6 +32,45 @@ class TestBinarizationMethods(unittest.TestCase):
             Binarization.uint.encode(4, 3)
         )
 
+    def test_affine(self):
+        weights, offset = Binarization.uint.affine(3)
+        bits = Binarization.uint.encode_batch([0, 5, 7], 3)
+        self.assertEqual(bits.tolist(), [[0, 0, 0], [1, 0, 1], [1, 1, 1]])
+        self.assertEqual((bits @ weights + offset).tolist(), [0, 5, 7])
+
+    def test_int(self):
+        int_type = Binarization.get_int_type(-3, 100)
+        self.assertEqual(int_type.size, 7)
+        for value in [-3, 0, 60, 61, 100]:
+            self.assertEqual(int_type.decode(int_type.encode(value, 7)), value)
+        # every bitstring decodes into the range
+        weights, offset = int_type.affine(7)
+        self.assertEqual((weights.sum() + offset, offset), (100, -3))
+        with self.assertRaises(ValueError):
+            int_type.encode(101, 7)
+
+        self.assertEqual(Binarization.sint.encode(-3, 4), [1, 0, 1, 1])
+        self.assertEqual(Binarization.sint.decode([1, 0, 1, 1]), -3)
+        self.assertEqual(Binarization.sint.decode([1, 1, 1, 0]), 7)
+
+    def test_one_hot_domain_wall(self):
+        one_hot = Binarization.get_one_hot_type([2, 5, 9])
+        self.assertEqual(one_hot.size, 3)
+        self.assertEqual(one_hot.encode(5, 3), [0, 1, 0])
+        self.assertEqual(one_hot.decode([0, 0, 1]), 9)
+
+        domain_wall = Binarization.get_domain_wall_type(1, 5)
+        self.assertEqual(domain_wall.size, 4)
+        self.assertEqual(domain_wall.encode(3, 4), [1, 1, 0, 0])
+        self.assertEqual(domain_wall.decode([1, 1, 1, 0]), 4)
+
+    def test_fixed_point(self):
+        fixed_point = Binarization.get_fixed_point_type(2, 3, signed=True)
+        self.assertEqual(fixed_point.size, 5)
+        self.assertEqual(fixed_point.decode(fixed_point.encode(-1.25, 5)), -1.25)
+        self.assertEqual(fixed_point.decode(fixed_point.encode(1.3, 5)), 1.25)
+        self.assertEqual(Binarization.get_fixed_point_type(1, 2).decode([1, 1, 1]), 1.75)
+
 
 if __name__ == '__main__':
     unittest.main()
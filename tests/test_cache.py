@@ -0,0 +1,138 @@
+from autoqubo.cache import QuboCache, fingerprint
+from autoqubo.sampling_compiler import SamplingCompiler
+from autoqubo.search_space import SearchSpace
+from autoqubo.binarization import Binarization
+import os
+import tempfile
+import time
+import unittest
+import numpy as np
+
+
+weights = np.array([1, 2, 3])
+
+
+def weighted(x):
+    return weights @ x + 2 * x[0] * x[2]
+
+
+def one_hot(x):
+    return (sum(x) - 1) ** 2
+
+
+def cubic(a):
+    return a ** 3
+
+
+class Scaled:
+    def __init__(self, factor):
+        self.factor = factor
+
+    def __call__(self, x):
+        return self.factor * weighted(x)
+
+
+class TestCacheMethods(unittest.TestCase):
+
+    def test_fingerprint(self):
+        global weights
+        key = fingerprint(weighted, 3)
+        self.assertEqual(key, fingerprint(weighted, 3))
+        self.assertNotEqual(key, fingerprint(weighted, 4))
+        self.assertNotEqual(key, fingerprint(one_hot, 3))
+
+        weights = np.array([1, 2, 4])
+        self.assertNotEqual(key, fingerprint(weighted, 3))
+        weights = np.array([1, 2, 3])
+
+        a, b = np.array([1.0]), np.array([2.0])
+        self.assertNotEqual(fingerprint(lambda x: a @ x), fingerprint(lambda x: b @ x))
+
+        # callable instances are described by the code of their class and their attributes
+        key = fingerprint(Scaled(2))
+        self.assertEqual(key, fingerprint(Scaled(2)))
+        self.assertNotEqual(key, fingerprint(Scaled(3)))
+        call = Scaled.__call__
+        try:
+            Scaled.__call__ = lambda self, x: self.factor * one_hot(x)
+            self.assertNotEqual(key, fingerprint(Scaled(2)))
+        finally:
+            Scaled.__call__ = call
+        self.assertEqual(key, fingerprint(Scaled(2)))
+
+        s = SearchSpace([('a', Binarization.uint, 3)])
+        t = SearchSpace([('a', Binarization.uint, 4)])
+        self.assertNotEqual(fingerprint(s), fingerprint(t))
+
+    def test_generate_qubo_matrix(self):
+        with tempfile.TemporaryDirectory() as directory:
+            qubo, offset = SamplingCompiler.generate_qubo_matrix(weighted, 3, use_multiprocessing=False, cache=directory)
+            cached, cached_offset = SamplingCompiler.generate_qubo_matrix(weighted, 3, use_multiprocessing=False, cache=directory)
+            self.assertIsInstance(cached, np.memmap)
+            self.assertTrue((cached == qubo).all())
+            self.assertEqual(cached_offset, offset)
+
+            cached, _ = SamplingCompiler.generate_qubo_matrix(
+                weighted, 3, use_multiprocessing=False, sparse=True, cache=directory
+            )
+            cached, _ = SamplingCompiler.generate_qubo_matrix(
+                weighted, 3, use_multiprocessing=False, sparse=True, cache=directory
+            )
+            self.assertTrue((cached.toarray() == qubo).all())
+
+            # a hit is copied to out
+            out = os.path.join(directory, "qubo.npy")
+            cached, _ = SamplingCompiler.generate_qubo_matrix(
+                weighted, 3, use_multiprocessing=False, cache=directory, out=out
+            )
+            self.assertTrue((np.load(out) == qubo).all())
+            self.assertTrue((cached == qubo).all())
+
+            # integer sampling gives a different QUBO for a function that is not quadratic in the variables
+            s = SearchSpace([('a', Binarization.uint, 2)])
+            sampled, _ = SamplingCompiler.generate_qubo_matrix(
+                cubic, s.size, use_multiprocessing=False, searchspace=s, integer_sampling=True, cache=directory
+            )
+            qubo, _ = SamplingCompiler.generate_qubo_matrix(cubic, s.size, use_multiprocessing=False, searchspace=s)
+            cached, _ = SamplingCompiler.generate_qubo_matrix(
+                cubic, s.size, use_multiprocessing=False, searchspace=s, cache=directory
+            )
+            self.assertFalse(np.allclose(sampled, qubo))
+            self.assertTrue((cached == qubo).all())
+
+            for penalty_method in ["sum", "verma_lewis"]:
+                qubo, offset = SamplingCompiler.generate_qubo(weighted, one_hot, 3, penalty_method, cache=directory)
+                cached, cached_offset = SamplingCompiler.generate_qubo(weighted, one_hot, 3, penalty_method, cache=directory)
+                self.assertTrue((cached == qubo).all())
+                self.assertEqual(cached_offset, offset)
+
+    def test_put_get_evict(self):
+        with tempfile.TemporaryDirectory() as directory:
+            cache = QuboCache(directory)
+            self.assertIsNone(cache.get("missing"))
+            self.assertTrue(cache.put("a", np.eye(4), 1.5))
+            self.assertFalse(cache.put("a", np.eye(4), 1.5))
+            self.assertFalse(cache.put("symbolic", np.zeros((2, 2), dtype=object), 0))
+            qubo, offset = cache.get("a")
+            self.assertTrue((qubo == np.eye(4)).all())
+            self.assertEqual(offset, 1.5)
+
+            entry_size = cache.size()
+            # room for two entries, metadata sizes differ by a few bytes
+            cache.max_size = 2 * entry_size + entry_size // 2
+            # leave room for the file system timestamp resolution
+            cache.put("b", np.eye(4), 0)
+            time.sleep(0.05)
+            cache.get("a")
+            time.sleep(0.05)
+            cache.put("c", np.eye(4), 0)
+            self.assertIsNone(cache.get("b"))
+            self.assertIsNotNone(cache.get("a"))
+            self.assertIsNotNone(cache.get("c"))
+
+            cache.clear()
+            self.assertEqual(cache.size(), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,75 @@
+from autoqubo.executors import (
+    FuturesExecutor, ProcessExecutor, SerialExecutor, ThreadExecutor, get_executor, serialize, shared_executor,
+)
+from autoqubo.sampling_compiler import SamplingCompiler
+from autoqubo.search_space import SearchSpace
+from autoqubo.binarization import Binarization
+from concurrent.futures import ThreadPoolExecutor
+import importlib.util
+import os
+import unittest
+import numpy as np
+
+
+def h(x):
+    return 1 + 3*x[1] + 1*x[0]*x[1] + 2*x[0]*x[2] + 12*x[1]*x[2]
+
+
+def pid(_):
+    return os.getpid()
+
+
+class TestExecutors(unittest.TestCase):
+
+    def test_map(self):
+        with ProcessExecutor(2, chunksize=3) as process, ThreadExecutor(2) as thread:
+            for executor in [SerialExecutor(), thread, process, FuturesExecutor(ThreadPoolExecutor(2), chunksize=4)]:
+                self.assertEqual(list(executor.map(abs, range(-20, 0), 2)), list(range(20, 0, -1)))
+                self.assertEqual(list(executor.map(abs, [])), [])
+
+    def test_get_executor(self):
+        self.assertIsInstance(get_executor(False), SerialExecutor)
+        self.assertIs(get_executor(True), shared_executor("process"))
+        self.assertIs(get_executor("thread"), get_executor("thread"))
+        with ThreadPoolExecutor(3) as pool:
+            self.assertEqual(get_executor(pool).workers, 3)
+        with self.assertRaises(ValueError):
+            get_executor("cluster")
+
+    def test_persistent_pool(self):
+        with ProcessExecutor(2) as executor:
+            first = set(executor.map(pid, range(8)))
+            second = set(executor.map(pid, range(8)))
+            self.assertTrue(second <= first)
+            self.assertNotIn(os.getpid(), first)
+
+    def test_compile(self):
+        expected, offset = SamplingCompiler.generate_qubo_matrix(h, 3, use_multiprocessing=False)
+        with ProcessExecutor(2, chunksize=2) as executor:
+            for backend in ["serial", "thread", executor]:
+                qubo, qubo_offset = SamplingCompiler.generate_qubo_matrix(h, 3, executor=backend)
+                self.assertTrue((qubo == expected).all())
+                self.assertEqual(qubo_offset, offset)
+                self.assertTrue(SamplingCompiler.test_qubo_matrix(h, qubo, offset, executor=backend))
+
+    @unittest.skipUnless(importlib.util.find_spec("cloudpickle"), "requires cloudpickle")
+    def test_closures(self):
+        s = SearchSpace([('a', Binarization.get_int_type(-2, 5)), ('b', Binarization.uint, 2)])
+        weight = 3
+        qubo, offset = SamplingCompiler.generate_qubo_matrix(
+            lambda a, b: weight * a * b - a, s.size, searchspace=s, executor="process"
+        )
+        expected, expected_offset = SamplingCompiler.generate_qubo_matrix(
+            lambda a, b: weight * a * b - a, s.size, searchspace=s, use_multiprocessing=False
+        )
+        self.assertTrue(np.allclose(qubo, expected))
+        self.assertEqual(offset, expected_offset)
+
+    def test_unpicklable(self):
+        with self.assertRaises(TypeError):
+            serialize(lambda x: x, "pickle")
+
+
+if __name__ == '__main__':
+
+    unittest.main()
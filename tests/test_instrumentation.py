@@ -0,0 +1,55 @@
+from autoqubo.instrumentation import Instrumentation
+from autoqubo.sampling_compiler import SamplingCompiler
+import json
+import os
+import pstats
+import tempfile
+import unittest
+
+
+def f(x):
+    return (sum(x) - 1) ** 2
+
+
+def f_batch(xs):
+    return (xs.sum(axis=1) - 1) ** 2
+
+
+class TestInstrumentationMethods(unittest.TestCase):
+
+    def test_counters(self):
+        progress = []
+        instrumentation = Instrumentation(progress=progress.append, progress_interval=0)
+        qubo, offset = SamplingCompiler.generate_qubo_matrix(f, 10, False, instrumentation=instrumentation)
+        self.assertEqual(instrumentation.evaluations, 56)
+        self.assertEqual(instrumentation.calls, 56)
+        self.assertEqual(progress[-1].done, 56)
+        self.assertEqual(progress[-1].total, 56)
+        self.assertEqual(progress[-1].eta, 0)
+        self.assertTrue(all(t >= 0 for t in instrumentation.timings.values()))
+
+        SamplingCompiler.generate_qubo_matrix(
+            f_batch, 10, False, vectorized=True, batch_size=10, instrumentation=instrumentation
+        )
+        self.assertEqual(instrumentation.evaluations, 112)
+        self.assertEqual(instrumentation.calls, 62)
+
+        SamplingCompiler.test_qubo_matrix(f, qubo, offset, num_test_samples=5, instrumentation=instrumentation)
+        self.assertEqual(instrumentation.evaluations, 117)
+        self.assertEqual(instrumentation.summary()["evaluations"], 117)
+
+    def test_trace_and_profile(self):
+        with tempfile.TemporaryDirectory() as directory:
+            trace, profile = os.path.join(directory, "trace.json"), os.path.join(directory, "compile.prof")
+            instrumentation = Instrumentation(trace=trace, profile=profile)
+            SamplingCompiler.generate_qubo(f, f, 6, instrumentation=instrumentation)
+            with open(trace) as file:
+                events = json.load(file)["traceEvents"]
+            names = {event["name"] for event in events}
+            self.assertEqual(names, {"sample_generation", "evaluation", "assembly"})
+            self.assertEqual(sum(event["name"] == "evaluation" for event in events), 2 * 22)
+            self.assertGreater(pstats.Stats(profile).total_calls, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,112 @@
+from autoqubo.memo import EvaluationMemo
+from autoqubo.sampling_compiler import SamplingCompiler
+from autoqubo.search_space import SearchSpace
+from autoqubo.binarization import Binarization
+import asyncio
+import unittest
+import numpy as np
+
+
+class Counted:
+    def __init__(self, vectorized=False):
+        self.vectorized = vectorized
+        self.evaluations = 0
+
+    def __call__(self, x):
+        x = np.asarray(x)
+        self.evaluations += len(x) if self.vectorized else 1
+        if self.vectorized:
+            return 1 + 3*x[:, 1] + x[:, 0]*x[:, 1] + 2*x[:, 0]*x[:, 2] + 12*x[:, 1]*x[:, 2]
+        return 1 + 3*x[1] + x[0]*x[1] + 2*x[0]*x[2] + 12*x[1]*x[2]
+
+
+class TestEvaluationMemo(unittest.TestCase):
+
+    def test_keys(self):
+        keys = EvaluationMemo.keys([[1, 0], [0, 1], [1, 0]])
+        self.assertEqual(keys[0], keys[2])
+        self.assertNotEqual(keys[0], keys[1])
+        # samples of different length differ even if their packed bits are equal
+        self.assertNotEqual(keys[0], EvaluationMemo.keys([[1, 0, 0]])[0])
+
+    def test_lru(self):
+        memo = EvaluationMemo(maxsize=2)
+        keys = EvaluationMemo.keys(np.eye(3, dtype=int))
+        memo.store("f", keys[:2], [1.0, 2.0])
+        self.assertEqual(memo.lookup("f", keys[:1]), [1.0])
+        memo.store("f", keys[2:], [3.0])
+        self.assertEqual(len(memo), 2)
+        self.assertEqual(memo.lookup("f", [keys[0], keys[2]]), [1.0, 3.0])
+        self.assertEqual(memo.info().hits, 3)
+
+    def test_shared_evaluations(self):
+        for vectorized in [False, True]:
+            memo = EvaluationMemo()
+            f = Counted(vectorized)
+            qubo, offset = SamplingCompiler.generate_qubo_matrix(
+                f, 3, use_multiprocessing=False, vectorized=vectorized, batch_size=3, memo=memo
+            )
+            self.assertEqual(f.evaluations, 7)
+            exact, exact_offset, _ = SamplingCompiler.truth_table_qubo_matrix(
+                f, 3, vectorized=vectorized, batch_size=3, memo=memo
+            )
+            # only 111 is not a training sample
+            self.assertEqual(f.evaluations, 8)
+            self.assertTrue(np.allclose(qubo, exact))
+            self.assertEqual(offset, exact_offset)
+            self.assertTrue(SamplingCompiler.test_qubo_matrix(f, qubo, offset, vectorized=vectorized, memo=memo))
+            self.assertEqual(f.evaluations, 8)
+            self.assertEqual(memo.info().misses, 8)
+
+    def test_async(self):
+        for vectorized in [False, True]:
+            memo = EvaluationMemo()
+            f = Counted(vectorized)
+
+            async def remote(x):
+                return f(x)
+
+            qubo, offset = asyncio.run(SamplingCompiler.generate_qubo_matrix_async(
+                remote, 3, vectorized=vectorized, batch_size=3, memo=memo
+            ))
+            self.assertEqual(f.evaluations, 7)
+            self.assertTrue(asyncio.run(SamplingCompiler.test_qubo_matrix_async(
+                remote, qubo, offset, num_test_samples=100, vectorized=vectorized, memo=memo
+            )))
+            # only 111 is not a training sample
+            self.assertEqual(f.evaluations, 8)
+            expected, _ = SamplingCompiler.generate_qubo_matrix(f, 3, use_multiprocessing=False, vectorized=vectorized)
+            self.assertTrue((qubo == expected).all())
+
+    def test_additive_terms(self):
+        memo = EvaluationMemo()
+        f = Counted()
+        terms = [(f, [0, 1, 2]), (f, [3, 4, 5])]
+        qubo, offset = SamplingCompiler.generate_additive_qubo_matrix(terms, 6, use_multiprocessing=False, memo=memo)
+        self.assertEqual(f.evaluations, 7)
+        SamplingCompiler.generate_additive_qubo_matrix(terms, 6, use_multiprocessing=False, memo=memo)
+        self.assertEqual(f.evaluations, 7)
+        self.assertEqual(SamplingCompiler.generate_qubo_matrix(f, 3, use_multiprocessing=False, memo=memo)[1], 1)
+        self.assertEqual(f.evaluations, 7)
+        self.assertEqual(offset, 2)
+
+    def test_wrap_binary(self):
+        memo = EvaluationMemo()
+        s = SearchSpace([('a', Binarization.uint, 2), ('b', Binarization.uint, 1)])
+        calls = []
+
+        def f(a, b):
+            calls.append((a, b))
+            return a * b
+
+        g = s.wrap_binary(f, memo=memo)
+        self.assertEqual(g([1, 1, 1]), 3)
+        SamplingCompiler.generate_qubo_matrix(f, s.size, use_multiprocessing=False, searchspace=s, memo=memo)
+        self.assertEqual(len(calls), 8)
+        self.assertEqual(g([1, 1, 0]), 0)
+        self.assertEqual(len(calls), 8)
+
+
+if __name__ == '__main__':
+
+    unittest.main()
@@ -0,0 +1,55 @@
+from autoqubo.penalty_weights import generate_penalty, pos_neg_penalty, sum_penalty, verma_lewis
+from autoqubo.symbolic import symbolic_matrix
+from scipy.sparse import csr_matrix
+import unittest
+import numpy as np
+
+
+def reference_pos_neg_penalty(C):
+    n = C.shape[0]
+    pos_cj = np.array([C[j][j] + C[:j, j][C[:j, j] < 0].sum() for j in range(n)])
+    neg_cj = np.array([C[j][j] + C[:j, j][C[:j, j] > 0].sum() for j in range(n)])
+    return float(neg_cj[neg_cj > 0].sum() - pos_cj[pos_cj < 0].sum())
+
+
+def reference_verma_lewis(C):
+    n = C.shape[0]
+    pos_sum = np.array([C[i][i] + C[i, i + 1:][C[i, i + 1:] > 0].sum() for i in range(n)])
+    neg_sum = np.array([-C[i][i] - C[i, i + 1:][C[i, i + 1:] < 0].sum() for i in range(n)])
+    return float(np.max([pos_sum, neg_sum]))
+
+
+class TestPenaltyWeightsMethods(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.C = np.triu(rng.integers(-5, 6, size=(12, 12)).astype(float))
+
+    def test_dense(self):
+        self.assertEqual(pos_neg_penalty(self.C), reference_pos_neg_penalty(self.C))
+        self.assertEqual(verma_lewis(self.C), reference_verma_lewis(self.C))
+
+    def test_sparse(self):
+        for method in ["sum", "pnform", "verma_lewis"]:
+            self.assertEqual(
+                generate_penalty(method, csr_matrix(self.C), None),
+                generate_penalty(method, self.C, None),
+            )
+
+    def test_symbolic(self):
+        s = symbolic_matrix(1, 2, positive=True)
+        a, b = s[0]
+        C = np.array([[a, -b], [0, -a]], dtype=object)
+        self.assertEqual(sum_penalty(C), 2 * a + b)
+        self.assertEqual(pos_neg_penalty(C), 2 * a + b)
+
+        C = np.array([[a, b], [0, -a]], dtype=object)
+        self.assertEqual(verma_lewis(C), a + b)
+
+        C = np.array([[a - b, 0], [0, 0]], dtype=object)
+        with self.assertRaises(TypeError):
+            pos_neg_penalty(C)
+
+
+if __name__ == '__main__':
+    unittest.main()
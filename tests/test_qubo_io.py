@@ -0,0 +1,91 @@
+from autoqubo.qubo_io import read_qubo, write_qubo, searchspace_from_metadata
+from autoqubo.search_space import SearchSpace
+from autoqubo.binarization import Binarization
+from scipy.sparse import csr_matrix, issparse
+import os
+import tempfile
+import unittest
+import numpy as np
+
+
+class TestQuboIOMethods(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.qubo = np.triu(rng.normal(size=(6, 6)))
+        self.qubo[np.abs(self.qubo) < 0.5] = 0
+        self.searchspace = SearchSpace([('a', Binarization.uint, 3), ('b', Binarization.get_int_type(-2, 5))])
+
+    def test_round_trip(self):
+        with tempfile.TemporaryDirectory() as directory:
+            for extension in ["qubo", "mtx", "npz", "aqubo"]:
+                for qubo in [self.qubo, csr_matrix(self.qubo)]:
+                    path = os.path.join(directory, f"q.{extension}")
+                    # small chunks to exercise streaming
+                    write_qubo(path, qubo, 1.5, labels=list("abcdef"), searchspace=self.searchspace, chunk_size=7)
+                    data = read_qubo(path, sparse=False)
+                    self.assertTrue((np.asarray(data.qubo) == self.qubo).all())
+                    self.assertEqual(data.offset, 1.5)
+                    self.assertEqual(data.labels, list("abcdef"))
+                    searchspace = searchspace_from_metadata(data.searchspace)
+                    self.assertEqual(searchspace.decode([1, 1, 0, 1, 0, 1]), [3, 3])
+                    self.assertTrue(issparse(read_qubo(path, sparse=True).qubo))
+
+    def test_round_trip_zero(self):
+        with tempfile.TemporaryDirectory() as directory:
+            for extension in ["qubo", "mtx", "npz", "aqubo"]:
+                path = os.path.join(directory, f"q.{extension}")
+                write_qubo(path, np.zeros((3, 3)), 2.0)
+                data = read_qubo(path, sparse=False)
+                self.assertTrue((np.asarray(data.qubo) == 0).all())
+                self.assertEqual(np.asarray(data.qubo).shape, (3, 3))
+                self.assertEqual(data.offset, 2.0)
+                self.assertEqual(read_qubo(path, sparse=True).qubo.nnz, 0)
+
+    def test_matrixmarket_qualifiers(self):
+        from scipy.io import mmread, mmwrite
+
+        symmetric = self.qubo + self.qubo.T
+        skew = self.qubo - self.qubo.T
+        x = np.array([1, 0, 1, 1, 0, 1])
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "q.mtx")
+            for matrix, symmetry in [(symmetric, "symmetric"), (skew, "skew-symmetric")]:
+                mmwrite(path, csr_matrix(matrix), symmetry=symmetry)
+                q = read_qubo(path, sparse=False).qubo
+                self.assertTrue(np.allclose(q, matrix))
+                self.assertAlmostEqual(x @ q @ x, x @ matrix @ x)
+
+            mmwrite(path, csr_matrix(symmetric), field="pattern", symmetry="symmetric")
+            q = read_qubo(path).qubo
+            self.assertTrue((q.toarray() == mmread(path).toarray()).all())
+
+            mmwrite(path, csr_matrix(self.qubo.astype(complex)))
+            with self.assertRaises(ValueError):
+                read_qubo(path)
+
+    def test_raw_memmap(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "q.aqubo")
+            write_qubo(path, self.qubo)
+            data = read_qubo(path)
+            self.assertIsInstance(data.qubo, np.memmap)
+            self.assertTrue((data.qubo == self.qubo).all())
+            self.assertIsNone(data.searchspace)
+
+    def test_qbsolv_format(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "q.qubo")
+            write_qubo(path, np.array([[1.0, -2.0], [0.0, 3.0]]), 4)
+            with open(path) as f:
+                lines = [line for line in f.read().splitlines() if not line.startswith("c")]
+            self.assertEqual(lines, ["p qubo 0 2 2 1", "0 0 1.0", "1 1 3.0", "0 1 -2.0"])
+
+            with self.assertRaises(ValueError):
+                write_qubo(os.path.join(directory, "q.txt"), self.qubo)
+            with self.assertRaises(TypeError):
+                write_qubo(path, np.zeros((2, 2), dtype=object))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,4 +1,16 @@
+from autoqubo.instrumentation import Instrumentation
+from autoqubo.memo import EvaluationMemo
 from autoqubo.sampling_compiler import SamplingCompiler
+from autoqubo.search_space import SearchSpace
+from autoqubo.binarization import Binarization, Type
+from autoqubo.utils import Utils
+from concurrent.futures import ThreadPoolExecutor
+from itertools import product
+from scipy.sparse import csr_matrix, issparse
+import asyncio
+import os
+import tempfile
+import threading
 import unittest
 import numpy as np
 
@@ -16,6 +28,24 @@ def h(x):
 def hc(x):
     return 1 + 3*x[1] + 1*x[0]*x[1]*x[2]
 
+def cost(x):
+    return 3*x[0] - 2*x[1]*x[3] + 5*x[2]*x[3] - x[1]
+
+def one_hot(x):
+    return (sum(x) - 1)**2
+
+def h_batch(x):
+    return 1 + 3*x[:, 1] + 1*x[:, 0]*x[:, 1] + 2*x[:, 0]*x[:, 2] + 12*x[:, 1]*x[:, 2]
+
+def hc_batch(x):
+    return 1 + 3*x[:, 1] + 1*x[:, 0]*x[:, 1]*x[:, 2]
+
+def interrupted(x):
+    interrupted.calls += 1
+    if interrupted.calls > interrupted.fail_after:
+        raise RuntimeError("preempted")
+    return h(x)
+
 class TestSamplingCompilerMethods(unittest.TestCase):
 
     def test_training_set(self):
@@ -39,6 +69,26 @@ class TestSamplingCompilerMethods(unittest.TestCase):
             (SamplingCompiler.generate_qubo_matrix(g, 2)[0] == np.array([[2, 4], [0, 3]])).all()
         )
 
+    def test_coefficients_from_outputs(self):
+        rng = np.random.default_rng(0)
+        for n in [1, 2, 3, 6]:
+            size = SamplingCompiler._num_training_samples(n)
+            for outputs in [rng.normal(size=size), rng.integers(-5, 5, size=size), rng.integers(0, 2, size=size) > 0]:
+                values = dict(zip(SamplingCompiler._indices_iterator(n), outputs.tolist()))
+                expected = [values[()]] + [values[(i,)] - values[()] for i in range(n)]
+                expected += [
+                    values[(i, j)] - values[(i,)] - values[(j,)] + values[()]
+                    for i in range(n) for j in range(i + 1, n)
+                ]
+                coefficients = SamplingCompiler._coefficients_from_outputs(outputs, n)
+                self.assertTrue(np.allclose(coefficients, expected))
+
+        qubo, offset = SamplingCompiler.generate_qubo_matrix(
+            lambda x: bool(x[0]) and bool(x[1]), 2, use_multiprocessing=False
+        )
+        self.assertTrue((qubo == np.array([[0, 1], [0, 0]])).all())
+        self.assertEqual(offset, 0)
+
     def test_test_set(self):
         input_size = 3
         num_test_samples = 2
@@ -57,6 +107,431 @@ class TestSamplingCompilerMethods(unittest.TestCase):
         qubo, offset = SamplingCompiler.generate_qubo_matrix(fitness_function=hc, input_size=3)
         self.assertFalse(SamplingCompiler.test_qubo_matrix(fitness_function=hc, qubo_matrix=qubo, offset=offset))
 
+    def test_vectorized(self):
+        n = 5
+        self.assertEqual(
+            SamplingCompiler._training_batch(n, 0, SamplingCompiler._num_training_samples(n)).tolist(),
+            list(SamplingCompiler._get_training_samples(n))
+        )
+
+        qubo, offset = SamplingCompiler.generate_qubo_matrix(h, 3, use_multiprocessing=False)
+        qubo_batch, offset_batch = SamplingCompiler.generate_qubo_matrix(
+            h_batch, 3, use_multiprocessing=False, vectorized=True, batch_size=2
+        )
+        self.assertTrue((qubo == qubo_batch).all())
+        self.assertEqual(offset, offset_batch)
+        self.assertTrue(SamplingCompiler.test_qubo_matrix(h_batch, qubo_batch, offset_batch, vectorized=True))
+
+        qubo, offset = SamplingCompiler.generate_qubo_matrix(
+            hc_batch, 3, use_multiprocessing=False, vectorized=True
+        )
+        self.assertFalse(SamplingCompiler.test_qubo_matrix(hc_batch, qubo, offset, vectorized=True))
+
+    def test_sparse(self):
+        qubo, offset = SamplingCompiler.generate_qubo_matrix(h, 3, use_multiprocessing=False)
+        sparse_qubo, sparse_offset = SamplingCompiler.generate_qubo_matrix(h, 3, use_multiprocessing=False, sparse=True)
+        self.assertTrue(issparse(sparse_qubo))
+        self.assertEqual(sparse_qubo.nnz, 4)
+        self.assertTrue((sparse_qubo.toarray() == qubo).all())
+        self.assertEqual(offset, sparse_offset)
+        self.assertTrue(SamplingCompiler.test_qubo_matrix(h, sparse_qubo, sparse_offset))
+        self.assertTrue(SamplingCompiler.test_qubo_matrix(h_batch, sparse_qubo, sparse_offset, vectorized=True))
+
+        for penalty_method in ["sum", "pnform", "verma_lewis"]:
+            qubo, offset = SamplingCompiler.generate_qubo(cost, one_hot, 4, penalty_method)
+            sparse_qubo, sparse_offset = SamplingCompiler.generate_qubo(cost, one_hot, 4, penalty_method, sparse=True)
+            self.assertTrue(np.allclose(sparse_qubo.toarray(), qubo))
+            self.assertEqual(offset, sparse_offset)
+
+        # the sparse matrix is streamed from small chunks of outputs, for every input size and layout of the chunks
+        rng = np.random.default_rng(0)
+        for n in [1, 2, 7]:
+            dense = np.triu(rng.integers(-2, 3, size=(n, n)).astype(float))
+            for batch_size in [1, 3, 64]:
+                sparse_qubo, sparse_offset = SamplingCompiler.generate_qubo_matrix(
+                    lambda x: np.asarray(x) @ dense @ np.asarray(x) + 1, n, use_multiprocessing=False, sparse=True,
+                    batch_size=batch_size,
+                )
+                self.assertTrue((sparse_qubo.toarray() == dense).all())
+                self.assertEqual(sparse_qubo.nnz, np.count_nonzero(dense))
+                self.assertEqual(sparse_offset, 1)
+
+    def test_discover_qubo_matrix(self):
+        def block_diagonal(x):
+            return 2 + x[0] + 4*x[0]*x[1] - 3*x[6]*x[7] + 5*x[9]*x[10]
+
+        qubo, offset = SamplingCompiler.generate_qubo_matrix(block_diagonal, 12, use_multiprocessing=False)
+        discovered, discovered_offset, report = SamplingCompiler.discover_qubo_matrix(
+            block_diagonal, 12, use_multiprocessing=False
+        )
+        self.assertTrue((discovered == qubo).all())
+        self.assertEqual(offset, discovered_offset)
+        self.assertEqual(report.full_evaluations, 79)
+        self.assertEqual(report.evaluations + report.saved_evaluations, report.full_evaluations)
+        self.assertLess(report.evaluations, report.full_evaluations)
+
+        discovered, discovered_offset, _ = SamplingCompiler.discover_qubo_matrix(
+            h_batch, 3, use_multiprocessing=False, vectorized=True, sparse=True
+        )
+        qubo, offset = SamplingCompiler.generate_qubo_matrix(h, 3, use_multiprocessing=False)
+        self.assertTrue((discovered.toarray() == qubo).all())
+
+        # the couplings cancel in the group test of the whole block
+        def cancelling(x):
+            return x[0]*x[1] - x[2]*x[3]
+
+        qubo, offset = SamplingCompiler.generate_qubo_matrix(cancelling, 4, use_multiprocessing=False)
+        discovered, discovered_offset, _ = SamplingCompiler.discover_qubo_matrix(cancelling, 4, use_multiprocessing=False)
+        self.assertTrue((discovered == qubo).all())
+        self.assertEqual(offset, discovered_offset)
+
+        # sparse +-1 couplings, as in max-sat or ising objectives
+        n = 64
+        rng = np.random.default_rng(0)
+        couplings = np.zeros((n, n))
+        for _ in range(16):
+            i, j = sorted(rng.choice(n, 2, replace=False))
+            couplings[i, j] = rng.choice([-1, 1])
+        calls = []
+
+        def ising(x):
+            calls.append(x)
+            return x @ couplings @ x
+
+        discovered, _, report = SamplingCompiler.discover_qubo_matrix(ising, n, use_multiprocessing=False)
+        self.assertTrue((discovered == couplings).all())
+        # every call is counted, including the test samples
+        self.assertEqual(report.evaluations, len(calls))
+        self.assertLess(report.evaluations, report.full_evaluations)
+
+    def test_update_qubo_matrix(self):
+        def h_changed(x):
+            return 1 + 3*x[1] + 1*x[0]*x[1] + 5*x[0]*x[2] + 12*x[1]*x[2] - x[3]
+
+        def h4(x):
+            return h(x) + 0*x[3]
+
+        qubo, offset = SamplingCompiler.generate_qubo_matrix(h4, 4, use_multiprocessing=False)
+        expected, _ = SamplingCompiler.generate_qubo_matrix(h_changed, 4, use_multiprocessing=False)
+
+        self.assertEqual(
+            list(SamplingCompiler.changed_variables(h_changed, qubo, offset, use_multiprocessing=False)), [0, 2, 3]
+        )
+        updated, updated_offset = SamplingCompiler.update_qubo_matrix(
+            h_changed, qubo.copy(), offset, changed=[0, 3], use_multiprocessing=False
+        )
+        self.assertTrue((updated == expected).all())
+        self.assertEqual(updated_offset, offset)
+
+        updated, _ = SamplingCompiler.update_qubo_matrix(
+            h_changed, csr_matrix(qubo), offset, use_multiprocessing=False
+        )
+        self.assertTrue((updated.toarray() == expected).all())
+
+        # only the constant term changed
+        def h_shifted(x):
+            return h4(x) + 7
+
+        self.assertEqual(len(SamplingCompiler.changed_variables(h_shifted, qubo, offset, use_multiprocessing=False)), 0)
+        updated, updated_offset = SamplingCompiler.update_qubo_matrix(
+            h_shifted, qubo.copy(), offset, use_multiprocessing=False
+        )
+        self.assertTrue((updated == qubo).all())
+        self.assertEqual(updated_offset, offset + 7)
+
+        # one distance increases and another decreases by the same amount
+        distances = np.triu(np.arange(30 * 30).reshape(30, 30) % 7, 1).astype(float)
+        changed_distances = distances.copy()
+        changed_distances[0, 1] += 1
+        changed_distances[2, 3] -= 1
+        qubo, offset = SamplingCompiler.generate_qubo_matrix(lambda x: x @ distances @ x, 30, use_multiprocessing=False)
+        self.assertEqual(list(SamplingCompiler.changed_variables(
+            lambda x: x @ changed_distances @ x, qubo, offset, use_multiprocessing=False
+        )), [0, 1, 2, 3])
+        updated, _ = SamplingCompiler.update_qubo_matrix(
+            lambda x: x @ changed_distances @ x, qubo, offset, use_multiprocessing=False
+        )
+        self.assertTrue((updated == changed_distances).all())
+
+    def test_out_of_core(self):
+        qubo, offset = SamplingCompiler.generate_qubo_matrix(g, 2)
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "qubo.npy")
+            streamed, streamed_offset = SamplingCompiler.generate_qubo_matrix(g, 2, out=path)
+            self.assertIsInstance(streamed, np.memmap)
+            self.assertTrue((streamed == qubo).all())
+            self.assertEqual(streamed_offset, offset)
+
+            qubo, offset = SamplingCompiler.generate_qubo_matrix(h, 3, use_multiprocessing=False)
+            SamplingCompiler.generate_qubo_matrix(
+                h_batch, 3, use_multiprocessing=False, vectorized=True, batch_size=2, out=path
+            )
+            self.assertTrue((np.load(path, mmap_mode="r") == qubo).all())
+
+    def test_checkpoint(self):
+        qubo, offset = SamplingCompiler.generate_qubo_matrix(h, 3, use_multiprocessing=False)
+        with tempfile.TemporaryDirectory() as directory:
+            interrupted.calls, interrupted.fail_after = 0, 5
+            with self.assertRaises(RuntimeError):
+                SamplingCompiler.generate_qubo_matrix(
+                    interrupted, 3, use_multiprocessing=False, batch_size=2, checkpoint=directory, checkpoint_interval=0
+                )
+
+            interrupted.calls, interrupted.fail_after = 0, 100
+            resumed, resumed_offset = SamplingCompiler.generate_qubo_matrix(
+                interrupted, 3, use_multiprocessing=False, batch_size=2, checkpoint=directory
+            )
+            self.assertEqual(interrupted.calls, 3)
+            self.assertTrue((resumed == qubo).all())
+            self.assertEqual(resumed_offset, offset)
+
+            with self.assertRaises(ValueError):
+                SamplingCompiler.generate_qubo_matrix(g, 3, use_multiprocessing=False, checkpoint=directory)
+
+    def test_verify_qubo_matrix(self):
+        qubo, offset = SamplingCompiler.generate_qubo_matrix(h, 3, use_multiprocessing=False)
+        report = SamplingCompiler.verify_qubo_matrix(h_batch, qubo, offset, vectorized=True)
+        self.assertTrue(report.passed)
+        self.assertEqual(report.num_samples, 1)
+        self.assertEqual(report.max_error, 0)
+        self.assertEqual(report.failing_samples.shape, (0, 3))
+
+        qubo, offset = SamplingCompiler.generate_qubo_matrix(hc, 3, use_multiprocessing=False)
+        report = SamplingCompiler.verify_qubo_matrix(hc, qubo, offset)
+        self.assertFalse(report.passed)
+        self.assertEqual(report.max_error, 1)
+        self.assertEqual(report.failing_samples.tolist(), [[1, 1, 1]])
+        self.assertEqual(report.failure_rate_bound, 1.0)
+
+        def cubic(x):
+            return x[0] * x[1] * x[2] * x[3] * x[4] * x[5] * x[6] * x[7] * x[8] * x[9]
+
+        qubo, offset = SamplingCompiler.generate_qubo_matrix(cubic, 10, use_multiprocessing=False)
+        num_samples = SamplingCompiler.required_test_samples(0.01)
+        self.assertEqual(num_samples, 299)
+        report = SamplingCompiler.verify_qubo_matrix(cubic, qubo, offset, max_failure_rate=0.01)
+        self.assertEqual(report.num_samples, 299)
+        self.assertEqual(len(np.unique(report.failing_samples, axis=0)), len(report.failing_samples))
+        self.assertLessEqual(len(report.failing_samples), 1)
+
+    def test_integer_sampling(self):
+        s = SearchSpace([
+            ('a', Binarization.uint, 6),
+            ('b', Binarization.get_int_type(-5, 20)),
+            ('v', Binarization.get_uint_vector_type(3, 2)),
+            ('x', Binarization.get_fixed_point_type(2, 2, signed=True)),
+        ])
+
+        def quadratic(a, b, v, x):
+            return 3 * a * a - 2 * a * b + 5 * b + v[0] * v[1] - 7 * v[1] ** 2 + a * v[0] + 2.5 * x * x - x * b + 1.5
+
+        qubo, offset = SamplingCompiler.generate_qubo_matrix(
+            quadratic, s.size, use_multiprocessing=False, searchspace=s, integer_sampling=True
+        )
+        expected, expected_offset = SamplingCompiler.generate_qubo_matrix(
+            quadratic, s.size, use_multiprocessing=False, searchspace=s
+        )
+        self.assertTrue(np.allclose(qubo, expected))
+        self.assertEqual(offset, expected_offset)
+
+        def cubic(a, b, v, x):
+            return a ** 3
+
+        with self.assertWarns(UserWarning):
+            SamplingCompiler.integer_qubo_matrix(cubic, s, use_multiprocessing=False)
+        with self.assertRaises(ValueError):
+            non_affine = SearchSpace([('a', Type(lambda bits: sum(bits), None), 3)])
+            SamplingCompiler.integer_qubo_matrix(sum, non_affine, use_multiprocessing=False)
+
+    def test_truth_table(self):
+        values = np.arange(8, dtype=np.float64) ** 2
+        coefficients = SamplingCompiler._mobius_transform(values.copy())
+        inputs = np.concatenate(list(SamplingCompiler._truth_table_batches(3, 3)))
+        masks = np.arange(8)
+        monomials = np.array([[((mask & ~k) == 0) for mask in masks] for k in masks])
+        self.assertTrue(np.allclose(monomials @ coefficients, values))
+        self.assertEqual(inputs[6].tolist(), [0, 1, 1])
+
+        qubo, offset = SamplingCompiler.generate_qubo_matrix(h, 3, use_multiprocessing=False)
+        exact, exact_offset, report = SamplingCompiler.truth_table_qubo_matrix(h, 3)
+        self.assertTrue(np.allclose(exact, qubo))
+        self.assertEqual(exact_offset, offset)
+        self.assertTrue(report.quadratic)
+        self.assertEqual(report.degree, 2)
+
+        _, _, report = SamplingCompiler.truth_table_qubo_matrix(hc_batch, 3, vectorized=True, batch_size=3, sparse=True)
+        self.assertFalse(report.quadratic)
+        self.assertEqual(report.degree, 3)
+        self.assertEqual(report.higher_order_terms, {(0, 1, 2): 1.0})
+
+    def test_additive_terms(self):
+        n = 3
+        cities = np.arange(n * n).reshape(n, n)
+        terms = [(one_hot, row) for row in cities] + [(one_hot, column) for column in cities.T]
+        expected, expected_offset = SamplingCompiler.generate_qubo_matrix(
+            lambda x: sum(one_hot(np.asarray(x)[indices]) for _, indices in terms), n * n, use_multiprocessing=False
+        )
+        qubo, offset = SamplingCompiler.generate_additive_qubo_matrix(terms, n * n, use_multiprocessing=False)
+        self.assertTrue(np.allclose(qubo, expected))
+        self.assertEqual(offset, expected_offset)
+
+        # reversed indices land in the upper triangle
+        def cost_batch(x):
+            return np.array([cost(sample) for sample in x])
+
+        terms = [(cost_batch, [3, 2, 1, 0]), (h_batch, [4, 0, 2])]
+        qubo, offset = SamplingCompiler.generate_additive_qubo_matrix(
+            terms, 5, use_multiprocessing=False, vectorized=True, sparse=True
+        )
+        x = np.array(list(product([0, 1], repeat=5)))
+        values = cost_batch(x[:, [3, 2, 1, 0]]) + h_batch(x[:, [4, 0, 2]])
+        self.assertTrue(np.allclose(Utils.energies(qubo, x, offset), values))
+        with self.assertRaises(ValueError):
+            SamplingCompiler.generate_additive_qubo_matrix([(cost, [0, 0, 1, 2])], 5, use_multiprocessing=False)
+
+    def test_symmetric_qubo_matrix(self):
+        n = 4
+        grid = np.arange(n * n).reshape(n, n)
+        swap = [1, 0] + list(range(2, n))
+        # swapping and cycling the rows and the columns of the assignment matrix
+        generators = [
+            grid[swap].ravel(), np.roll(grid, 1, axis=0).ravel(), grid[:, swap].ravel(), np.roll(grid, 1, axis=1).ravel()
+        ]
+
+        def two_way_one_hot(x):
+            x = np.asarray(x).reshape(n, n)
+            return ((1 - x.sum(axis=0)) ** 2).sum() + ((1 - x.sum(axis=1)) ** 2).sum()
+
+        expected, expected_offset = SamplingCompiler.generate_qubo_matrix(
+            two_way_one_hot, n * n, use_multiprocessing=False
+        )
+        qubo, offset, report = SamplingCompiler.symmetric_qubo_matrix(
+            two_way_one_hot, n * n, generators, use_multiprocessing=False, num_test_samples=-1
+        )
+        self.assertTrue(np.allclose(qubo, expected))
+        self.assertEqual(offset, expected_offset)
+        # the empty sample, one variable, and pairs in the same row, the same column or neither
+        self.assertEqual(report.evaluations, 5)
+
+        # without generators every sample is its own representative
+        qubo, offset, report = SamplingCompiler.symmetric_qubo_matrix(h, 3, [], use_multiprocessing=False)
+        self.assertTrue((qubo == SamplingCompiler.generate_qubo_matrix(h, 3, use_multiprocessing=False)[0]).all())
+        self.assertEqual(report.saved_evaluations, 0)
+
+        sparse_qubo, _, _ = SamplingCompiler.symmetric_qubo_matrix(
+            two_way_one_hot, n * n, generators, use_multiprocessing=False, sparse=True
+        )
+        self.assertTrue(np.allclose(sparse_qubo.toarray(), expected))
+
+        with self.assertWarns(UserWarning):
+            SamplingCompiler.symmetric_qubo_matrix(
+                lambda x: x[0], 4, [[1, 0, 2, 3]], use_multiprocessing=False, num_test_samples=100
+            )
+        with self.assertRaises(ValueError):
+            SamplingCompiler.symmetric_qubo_matrix(f, 3, [[0, 0, 1]], use_multiprocessing=False)
+
+    def test_async(self):
+        state = {"in_flight": 0, "max_in_flight": 0, "calls": 0}
+
+        async def remote_h(x):
+            state["calls"] += 1
+            state["in_flight"] += 1
+            state["max_in_flight"] = max(state["max_in_flight"], state["in_flight"])
+            await asyncio.sleep(0.001)
+            state["in_flight"] -= 1
+            # every third call fails once, as a flaky RPC would
+            if state["calls"] % 3 == 0:
+                raise ConnectionError("flaky")
+            return h(x)
+
+        qubo, offset = SamplingCompiler.generate_qubo_matrix(h, 3, use_multiprocessing=False)
+        async_qubo, async_offset = asyncio.run(
+            SamplingCompiler.generate_qubo_matrix_async(remote_h, 3, concurrency=2, retries=3, retry_delay=0)
+        )
+        self.assertTrue((qubo == async_qubo).all())
+        self.assertEqual(offset, async_offset)
+        self.assertEqual(state["max_in_flight"], 2)
+        self.assertTrue(asyncio.run(SamplingCompiler.test_qubo_matrix_async(
+            remote_h, async_qubo, async_offset, retries=3, retry_delay=0
+        )))
+
+        async def remote_h_batch(x):
+            return h_batch(x)
+
+        batch_qubo, _ = asyncio.run(SamplingCompiler.generate_qubo_matrix_async(
+            remote_h_batch, 3, vectorized=True, batch_size=2, sparse=True
+        ))
+        self.assertTrue((batch_qubo.toarray() == qubo).all())
+
+        async def remote_one_hot(x):
+            return one_hot(x)
+
+        expected, expected_offset = SamplingCompiler.generate_qubo(cost, one_hot, 4)
+        combined, combined_offset = asyncio.run(SamplingCompiler.generate_qubo_async(cost, remote_one_hot, 4))
+        self.assertTrue(np.allclose(combined, expected))
+        self.assertEqual(combined_offset, expected_offset)
+
+    def test_async_sync_function(self):
+        threads = []
+
+        def blocking_h(x):
+            threads.append(threading.get_ident())
+            return h(x)
+
+        async def compile_qubo(**options):
+            loop_thread = threading.get_ident()
+            result = await SamplingCompiler.generate_qubo_matrix_async(blocking_h, 3, **options)
+            return result, loop_thread
+
+        qubo, offset = SamplingCompiler.generate_qubo_matrix(h, 3, use_multiprocessing=False)
+        instrumentation = Instrumentation()
+        memo = EvaluationMemo()
+        (async_qubo, async_offset), loop_thread = asyncio.run(
+            compile_qubo(instrumentation=instrumentation, memo=memo)
+        )
+        self.assertTrue((qubo == async_qubo).all())
+        self.assertEqual(offset, async_offset)
+        # the plain function runs on the default executor, not on the event loop
+        self.assertEqual(len(threads), 7)
+        self.assertNotIn(loop_thread, threads)
+        self.assertEqual((instrumentation.evaluations, instrumentation.calls), (7, 7))
+        self.assertEqual((instrumentation.done, instrumentation.total), (7, 7))
+        self.assertGreater(instrumentation.timings["evaluation"], 0)
+
+        # memoized samples count as done without being evaluated
+        with ThreadPoolExecutor(2) as executor:
+            asyncio.run(compile_qubo(instrumentation=instrumentation, memo=memo, executor=executor))
+        self.assertEqual(len(threads), 7)
+        self.assertEqual(instrumentation.evaluations, 7)
+        self.assertEqual((instrumentation.done, instrumentation.total), (14, 14))
+
+    def test_async_cancellation(self):
+        started = []
+
+        async def hanging(x):
+            started.append(x)
+            await asyncio.sleep(3600)
+
+        async def failing(x):
+            raise RuntimeError("simulator down")
+
+        async def cancel_compilation():
+            task = asyncio.ensure_future(SamplingCompiler.generate_qubo_matrix_async(hanging, 10, concurrency=4))
+            await asyncio.sleep(0.01)
+            task.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await task
+            # no evaluation is left running in the event loop
+            self.assertEqual(len(asyncio.all_tasks()), 1)
+
+        asyncio.run(cancel_compilation())
+        self.assertEqual(len(started), 4)
+
+        with self.assertRaises(RuntimeError):
+            asyncio.run(SamplingCompiler.generate_qubo_matrix_async(failing, 3, retries=1, retry_delay=0))
+        with self.assertRaises(asyncio.TimeoutError):
+            asyncio.run(SamplingCompiler.generate_qubo_matrix_async(hanging, 3, timeout=0.01))
+
 if __name__ == '__main__':
 
     unittest.main()
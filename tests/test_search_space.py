@@ -1,6 +1,7 @@
 from autoqubo.search_space import SearchSpace
-from autoqubo.binarization import Binarization
+from autoqubo.binarization import Binarization, Type
 import unittest
+import numpy as np
 
 
 class TestSearchSpaceMethods(unittest.TestCase):
@@ -12,6 +13,45 @@ class TestSearchSpaceMethods(unittest.TestCase):
         self.assertEqual(b, 6)
         self.assertEqual(s.size, 6)
 
+    def test_wrap_binary_vectorized(self):
+        s = SearchSpace([('a', Binarization.uint, 3), ('b', Binarization.uint, 3)])
+        f = s.wrap_binary(lambda a, b: 2 * a + b, vectorized=True)
+        self.assertEqual(list(f(np.array([[1, 1, 0, 0, 1, 1], [0, 0, 1, 1, 0, 0]]))), [12, 9])
+
+    def test_type_size(self):
+        s = SearchSpace([('a', Binarization.get_int_type(0, 100)), ('b', Binarization.uint, 3)])
+        self.assertEqual(s.size, 10)
+        self.assertEqual(s.decode(s.encode({'a': 100, 'b': 5})), [100, 5])
+        with self.assertRaises(ValueError):
+            s.add('c', Binarization.get_int_type(0, 100), 8)
+        with self.assertRaises(ValueError):
+            s.add('d', Binarization.uint)
+
+    def test_batch(self):
+        vector = Binarization.get_uint_vector_type(2, 3)
+        parity = Type(lambda x: sum(x) % 2, lambda value, size: [value] + [0] * (size - 1))
+        s = SearchSpace([('a', Binarization.uint, 3), ('v', vector, 6), ('p', parity, 2)])
+        rows = [
+            {'a': 3, 'v': [1, 2, 3], 'p': 1},
+            {'a': 6, 'v': [0, 3, 1], 'p': 0},
+        ]
+        xs = np.array([s.encode(row) for row in rows])
+        self.assertEqual(
+            s.encode_batch({'a': [3, 6], 'v': [[1, 2, 3], [0, 3, 1]], 'p': [1, 0]}).tolist(), xs.tolist()
+        )
+
+        a, v, p = s.decode_batch(xs)
+        self.assertEqual(a.tolist(), [3, 6])
+        self.assertEqual(v.tolist(), [[1, 2, 3], [0, 3, 1]])
+        self.assertEqual(p.tolist(), [1, 0])
+        self.assertEqual(s.decode_dict_batch(xs)['v'].tolist(), v.tolist())
+
+        records = s.decode_structured(xs)
+        self.assertEqual(records['a'].tolist(), [3, 6])
+        self.assertEqual(records[1]['v'].tolist(), [0, 3, 1])
+        for x, record in zip(xs, records):
+            self.assertEqual(s.decode_dict(x)['a'], record['a'])
+
 
 if __name__ == '__main__':
     unittest.main()
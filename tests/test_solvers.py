@@ -0,0 +1,50 @@
+from autoqubo.solvers import brute_force, simulated_annealing, tabu_search
+from scipy.sparse import csr_matrix
+from itertools import product
+import unittest
+import numpy as np
+
+
+class TestSolversMethods(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.default_rng(1)
+        self.qubo = np.triu(rng.normal(size=(10, 10)))
+        self.states = np.array(list(product([0, 1], repeat=10)))
+        self.energies = np.einsum("bi,ij,bj->b", self.states, self.qubo, self.states)
+        self.optimum = self.energies.min()
+
+    def test_solvers(self):
+        for solver in [simulated_annealing, tabu_search]:
+            for qubo in [self.qubo, csr_matrix(self.qubo)]:
+                samples, energies = solver(qubo, num_reads=8, seed=0)
+                self.assertEqual(samples.shape, (8, 10))
+                self.assertTrue(np.allclose(energies, np.einsum("bi,ij,bj->b", samples, self.qubo, samples)))
+                self.assertAlmostEqual(energies.min(), self.optimum)
+
+            first, _ = solver(self.qubo, num_reads=4, seed=3)
+            second, _ = solver(self.qubo, num_reads=4, seed=3)
+            self.assertTrue((first == second).all())
+
+    def test_budget(self):
+        _, energies = tabu_search(self.qubo, num_reads=4, num_steps=10 ** 6, seed=0, target=self.optimum + 1e-9)
+        self.assertAlmostEqual(energies.min(), self.optimum)
+        samples, _ = simulated_annealing(self.qubo, num_reads=4, num_sweeps=10 ** 6, timeout=0.1)
+        self.assertEqual(samples.shape, (4, 10))
+
+    def test_multiprocessing(self):
+        samples, energies = simulated_annealing(self.qubo, num_reads=5, seed=0, num_processes=2)
+        self.assertEqual(samples.shape, (5, 10))
+        self.assertAlmostEqual(energies.min(), self.optimum)
+
+    def test_brute_force(self):
+        order = np.argsort(self.energies)[:4]
+        for low_bits, num_processes in [(None, 1), (3, 1), (3, 2)]:
+            for qubo in [self.qubo, csr_matrix(self.qubo)]:
+                samples, energies = brute_force(qubo, k=4, num_processes=num_processes, low_bits=low_bits, batch_size=3)
+                self.assertTrue((samples == self.states[order]).all())
+                self.assertTrue(np.allclose(energies, self.energies[order]))
+
+
+if __name__ == '__main__':
+    unittest.main()
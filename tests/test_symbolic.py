@@ -0,0 +1,48 @@
+from autoqubo.sampling_compiler import SamplingCompiler
+from autoqubo.symbolic import QuboTemplate, insert_values, symbolic_matrix
+import unittest
+import numpy as np
+
+
+def weighted_pairs(x, w):
+    return w[0, 0] * x[0] * x[1] + w[0, 1] * x[1] * x[2] + w[1, 0] * x[2] + 2 * w[1, 1] * x[0]
+
+
+class TestSymbolicMethods(unittest.TestCase):
+
+    def setUp(self):
+        self.w = symbolic_matrix(2, 2, positive=True)
+        self.sources = np.array([[[1, 2], [3, 4]], [[5, 0], [7, 1]], [[2, 2], [2, 2]]])
+
+    def test_instantiate(self):
+        qubo, offset = SamplingCompiler.generate_qubo_matrix(
+            lambda x: weighted_pairs(x, self.w) + 3, 3, use_multiprocessing=False
+        )
+        template = QuboTemplate(qubo, offset)
+        self.assertEqual(template.shape, (2, 2))
+
+        qubos, offsets = template.instantiate(self.sources)
+        self.assertEqual(qubos.shape, (3, 3, 3))
+        for source, instance, instance_offset in zip(self.sources, qubos, offsets):
+            expected, expected_offset = SamplingCompiler.generate_qubo_matrix(
+                lambda x: weighted_pairs(x, source) + 3, 3, use_multiprocessing=False
+            )
+            self.assertTrue((instance == expected).all())
+            self.assertEqual(instance_offset, expected_offset)
+            self.assertTrue((instance == insert_values(qubo, source).astype(float)).all())
+
+        instance, instance_offset = template.instantiate(self.sources[0])
+        self.assertTrue((instance == qubos[0]).all())
+        self.assertEqual(instance_offset, offsets[0])
+
+    def test_instantiate_nonlinear(self):
+        a, b = self.w[0]
+        qubo = np.array([[a * b, 1], [0, a ** 2 + b]], dtype=object)
+        qubos, offsets = QuboTemplate(qubo, b).instantiate(self.sources[:2, :1, :])
+        self.assertTrue((qubos[0] == np.array([[2, 1], [0, 3]])).all())
+        self.assertTrue((qubos[1] == np.array([[0, 1], [0, 25]])).all())
+        self.assertEqual(list(offsets), [2, 0])
+
+
+if __name__ == '__main__':
+    unittest.main()
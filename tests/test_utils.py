@@ -1,19 +1,62 @@
 from autoqubo.utils import Utils
+import importlib.util
 import unittest
 import numpy as np
 
+# scipy is an optional dependency (the sparse extra)
+HAS_SCIPY = importlib.util.find_spec("scipy") is not None
+
 
 class TestUtilsMethods(unittest.TestCase):
 
     def test_training_set(self):
         self.assertEqual(Utils.energy(np.array([[1, 3], [0, 4]]), np.array([1, 1])), 8)
 
+    def test_energies(self):
+        q = np.array([[1, 3], [0, 4]])
+        xs = np.array([[0, 0], [1, 0], [0, 1], [1, 1]])
+        self.assertEqual(list(Utils.energies(q, xs, offset=1)), [1, 2, 5, 9])
+
+    @unittest.skipUnless(HAS_SCIPY, "requires scipy")
+    def test_energies_sparse(self):
+        from scipy.sparse import csr_matrix
+
+        q = csr_matrix(np.array([[1, 3], [0, 4]]))
+        xs = np.array([[0, 0], [1, 0], [0, 1], [1, 1]])
+        self.assertEqual(list(Utils.energies(q, xs, offset=1)), [1, 2, 5, 9])
+        self.assertEqual(Utils.energy(q, [1, 1]), 8)
+
     def test_get_matrix_dict_repr(self):
         self.assertEqual(
             Utils.get_matrix_dict_repr(np.array([[0, 1], [0, 2]])),
             {(0, 1): 1, (1, 1): 2}
         )
 
+    @unittest.skipUnless(HAS_SCIPY, "requires scipy")
+    def test_get_matrix_dict_repr_sparse(self):
+        from scipy.sparse import csr_matrix
+
+        self.assertEqual(
+            Utils.get_matrix_dict_repr(csr_matrix(np.array([[0, 1], [0, 2]]))),
+            {(0, 1): 1, (1, 1): 2}
+        )
+
+    def test_solve(self):
+        q = np.array([[1, -3, 0], [0, 1, 2], [0, 0, -0.5]])
+        matrices = [q]
+        if HAS_SCIPY:
+            from scipy.sparse import csr_matrix
+
+            matrices.append(csr_matrix(q))
+        for method in ["sa", "tabu", "exact"]:
+            for matrix in matrices:
+                options = {"k": 3} if method == "exact" else {"num_reads": 4, "seed": 0}
+                samples, energies = Utils.solve(matrix, 2, method=method, **options)
+                self.assertEqual(samples[0], [1, 1, 0])
+                self.assertEqual(energies[0], 1)
+                self.assertEqual(energies, sorted(energies))
+                self.assertEqual(len(samples), len(set(map(tuple, samples))))
+
     def test_get_solution_vector_repr(self):
         self.assertEqual(
             Utils.get_solution_vector_repr({0: 1, 1: 4, 2: 7}),